@@ -0,0 +1,49 @@
+"""Brewlog benchmarks.
+
+Endpoint and hot path benchmarks run against generated dataset, results
+are written as JSON and compared with stored baseline::
+
+    python -m benchmarks --size 1k --output results.json
+
+Standalone scripts in this directory (autocomplete, markdown engines)
+measure single components and are run directly.
+"""
+import statistics
+import time
+from typing import Callable, Dict
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def measure(func: Callable, rounds: int, warmup: int = 10) -> Dict[str, float]:
+    """Call function repeatedly and collect latency statistics.
+
+    :param func: function to call, gets call number as argument
+    :type func: Callable
+    :param rounds: number of measured calls
+    :type rounds: int
+    :param warmup: number of calls made before measurement
+    :type warmup: int
+    :return: latency percentiles and mean in milliseconds, throughput in
+             calls per second
+    :rtype: Dict[str, float]
+    """
+    # warmup calls get numbers that do not repeat in measured calls
+    for num in range(rounds, rounds + warmup):
+        func(num)
+    timings = []
+    for num in range(rounds):
+        started = time.perf_counter()
+        func(num)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'rounds': rounds,
+        'mean_ms': round(statistics.mean(timings), 4),
+        'p50_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(percentile(timings, 95), 4),
+        'p99_ms': round(percentile(timings, 99), 4),
+        'ops_per_sec': round(rounds / (sum(timings) / 1000), 2),
+    }
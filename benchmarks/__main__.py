@@ -0,0 +1,160 @@
+"""Run benchmark suite and compare results with baseline.
+
+Baselines are kept in benchmarks/baselines, one per dataset size. Exit
+status is 1 if any benchmark median latency is worse than baseline by more
+than tolerance or if there is no baseline to compare with::
+
+    python -m benchmarks --size 1k --output results.json
+    python -m benchmarks --size 1k --save-baseline
+
+Timings depend on hardware and machine load, so baseline should be saved on
+the same machine that runs comparisons, preferably otherwise idle.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from brewlog._version import get_version
+
+from . import micro, views
+from .dataset import DEFAULT_DATA_DIR, SIZES, create_app
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# latency statistic compared with baseline
+METRIC = 'p50_ms'
+
+SUITES = {
+    'views': lambda app, opts: views.run(app, opts.rounds, opts.seed),
+    'micro': lambda app, opts: micro.run(app, opts.micro_rounds),
+}
+
+
+def baseline_path(size: str) -> str:
+    return os.path.join(BASELINE_DIR, f'{size}.json')
+
+
+def compare(
+            results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float,
+        ) -> Tuple[List[Tuple[str, float, float, float]], List[str]]:
+    """Compare results with baseline.
+
+    :param results: current results
+    :type results: Dict[str, dict]
+    :param baseline: baseline results
+    :type baseline: Dict[str, dict]
+    :param tolerance: relative change treated as noise
+    :type tolerance: float
+    :return: list of (name, baseline, current, relative change) tuples and
+             list of names of benchmarks slower than tolerance allows
+    :rtype: Tuple[List[Tuple[str, float, float, float]], List[str]]
+    """
+    rows = []
+    regressions = []
+    for name, data in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None or not base[METRIC]:
+            continue
+        change = data[METRIC] / base[METRIC] - 1
+        rows.append((name, base[METRIC], data[METRIC], change))
+        if change > tolerance:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_report(rows, regressions, tolerance: float):
+    print(f'{"benchmark":46} {"baseline":>10} {"current":>10} {"change":>8}')
+    for name, base, current, change in rows:
+        flag = ''
+        if name in regressions:
+            flag = '  SLOWER'
+        elif change < -tolerance:
+            flag = '  faster'
+        print(f'{name:46} {base:10.3f} {current:10.3f} {change:+8.1%}{flag}')
+
+
+def load_baseline(path: str) -> Optional[dict]:
+    if not os.path.isfile(path):
+        return None
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def write_json(data: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as fp:
+        json.dump(data, fp, indent=2, sort_keys=True)
+        fp.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=list(SIZES), default='1k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--suite', choices=list(SUITES), action='append',
+        help='suite to run, may be repeated (default: all)',
+    )
+    parser.add_argument('--rounds', type=int, default=100, help='requests per view')
+    parser.add_argument(
+        '--micro-rounds', type=int, default=300, help='calls per micro benchmark'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='number of suite runs, best result of each benchmark is kept',
+    )
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--output', help='results file (default: print only)')
+    parser.add_argument(
+        '--baseline', help='baseline file (default: stored baseline for size)'
+    )
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument(
+        '--save-baseline', action='store_true',
+        help='store results as baseline for size',
+    )
+    opts = parser.parse_args()
+    print(f'preparing {opts.size} dataset in {opts.data_dir}', file=sys.stderr)
+    app = create_app(opts.size, opts.seed, opts.data_dir)
+    results = {}
+    for num in range(opts.repeat):
+        for name in opts.suite or list(SUITES):
+            print(f'running {name} suite ({num + 1}/{opts.repeat})', file=sys.stderr)
+            for bench, data in SUITES[name](app, opts).items():
+                # best run is the one least disturbed by other processes
+                if bench not in results or data[METRIC] < results[bench][METRIC]:
+                    results[bench] = data
+    document = {
+        'meta': {
+            'size': opts.size,
+            'repeat': opts.repeat,
+            'seed': opts.seed,
+            'version': get_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': datetime.datetime.utcnow().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+    if opts.output:
+        write_json(document, opts.output)
+    if opts.save_baseline:
+        write_json(document, baseline_path(opts.size))
+        return
+    baseline = load_baseline(opts.baseline or baseline_path(opts.size))
+    if baseline is None:
+        for name, data in sorted(results.items()):
+            print(f'{name:46} {data[METRIC]:10.3f} ms  {data["ops_per_sec"]:10.1f}/s')
+        sys.exit(f'no baseline for {opts.size}')
+    rows, regressions = compare(results, baseline['results'], opts.tolerance)
+    print_report(rows, regressions, opts.tolerance)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
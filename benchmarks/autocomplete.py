@@ -0,0 +1,64 @@
+"""Autocomplete prefix index latency benchmark.
+
+Builds index over randomly generated names and measures lookup latency for
+random prefixes of existing names::
+
+    python benchmarks/autocomplete.py --names 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from brewlog.search.autocomplete import PrefixIndex
+
+WORDS = [
+    'pale', 'ale', 'india', 'porter', 'bałtycki', 'stout', 'imperial', 'żytnie',
+    'pszeniczne', 'koźlak', 'dubbel', 'tripel', 'saison', 'grodziskie', 'lager',
+    'pils', 'marcowe', 'witbier', 'kwas', 'wędzone', 'amber', 'brown', 'double',
+    'session', 'american', 'belgian', 'czech', 'polish', 'hoppy', 'dark',
+]
+
+
+def make_names(count, rng):
+    return [
+        (num, ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))) + f' {num}')
+        for num in range(1, count + 1)
+    ]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=20_000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+    rng = random.Random(opts.seed)
+    names = make_names(opts.names, rng)
+    started = time.perf_counter()
+    index = PrefixIndex(names)
+    build_time = time.perf_counter() - started
+    prefixes = []
+    for _ in range(opts.lookups):
+        _, name = rng.choice(names)
+        prefixes.append(name[:rng.randint(1, 6)])
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.lookup(prefix, opts.limit)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    print(f'names: {opts.names}, index build: {build_time:.2f}s')
+    print(
+        f'lookup (us): p50 {statistics.median(timings):.1f}, '
+        f'p99 {percentile(timings, 99):.1f}, max {max(timings):.1f}'
+    )
+
+
+if __name__ == '__main__':
+    main()
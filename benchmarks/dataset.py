@@ -0,0 +1,155 @@
+"""Benchmark datasets.
+
+Data is generated with model factories used by test suite and stored in
+SQLite database file, one per size, seed and database schema, so it is
+generated only once and again after models change.
+"""
+import datetime
+import hashlib
+import os
+import random
+import tempfile
+
+import factory.random
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from brewlog import make_app
+from brewlog.ext import db
+from tests.factories import (
+    BreweryFactory, BrewFactory, FermentationStepFactory, TastingNoteFactory,
+    UserFactory,
+)
+
+# dataset name -> number of brews
+SIZES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+}
+
+BREWS_PER_BREWERY = 10
+BREWERIES_PER_USER = 2
+NOTES_PER_BREW = 0.5
+STEPS_PER_BREW = 1.5
+PRIVATE_USERS = 0.1
+PRIVATE_BREWS = 0.15
+
+CHUNK_SIZE = 1000
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'brewlog-benchmarks')
+
+
+def schema_hash() -> str:
+    """Hash of DDL of all tables and indexes that dataset is created with.
+
+    :return: hex digest prefix
+    :rtype: str
+    """
+    dialect = sqlite.dialect()
+    ddl = []
+    for table in db.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            ddl.append(str(CreateIndex(index).compile(dialect=dialect)))
+    return hashlib.sha1('\n'.join(ddl).encode('utf-8')).hexdigest()[:12]
+
+
+def database_path(size: str, seed: int, data_dir: str = DEFAULT_DATA_DIR) -> str:
+    return os.path.join(data_dir, f'brewlog-{size}-{seed}-{schema_hash()}.sqlite')
+
+
+def _brew_dates(brew, rng, today):
+    # spread brews across lifecycle states
+    brewed = today - datetime.timedelta(days=rng.randint(0, 730))
+    brew.date_brewed = brewed
+    brew.fermentation_start_date = brewed
+    age = (today - brewed).days
+    if age > 14:
+        brew.bottling_date = brewed + datetime.timedelta(days=14)
+    if age > 42:
+        brew.tapped = brewed + datetime.timedelta(days=42)
+    if age > 180:
+        brew.finished = brewed + datetime.timedelta(days=180)
+
+
+def _count(rng, mean: float) -> int:
+    # integer part always, fractional part with its probability
+    return int(mean) + (rng.random() < mean % 1)
+
+
+def populate(num_brews: int, seed: int):
+    """Generate dataset in database of current application. Objects are
+    flushed in chunks and committed at the end.
+
+    :param num_brews: number of brews
+    :type num_brews: int
+    :param seed: random generator seed
+    :type seed: int
+    """
+    factory.random.reseed_random(seed)
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    num_breweries = max(num_brews // BREWS_PER_BREWERY, 1)
+    num_users = max(num_breweries // BREWERIES_PER_USER, 1)
+    users = [
+        UserFactory.build(
+            email=f'user{num}@example.com', is_public=rng.random() >= PRIVATE_USERS,
+        ) for num in range(num_users)
+    ]
+    db.session.add_all(users)
+    breweries = [
+        BreweryFactory.build(brewer=rng.choice(users)) for _ in range(num_breweries)
+    ]
+    db.session.add_all(breweries)
+    db.session.flush()
+    for start in range(0, num_brews, CHUNK_SIZE):
+        for _ in range(min(CHUNK_SIZE, num_brews - start)):
+            brew = BrewFactory.build(
+                brewery=rng.choice(breweries),
+                is_public=rng.random() >= PRIVATE_BREWS,
+            )
+            _brew_dates(brew, rng, today)
+            db.session.add(brew)
+            for _ in range(_count(rng, NOTES_PER_BREW)):
+                db.session.add(
+                    TastingNoteFactory.build(brew=brew, author=rng.choice(users))
+                )
+            for _ in range(_count(rng, STEPS_PER_BREW)):
+                db.session.add(FermentationStepFactory.build(brew=brew))
+        db.session.flush()
+    db.session.commit()
+
+
+def create_app(size: str, seed: int = 42, data_dir: str = DEFAULT_DATA_DIR):
+    """Create application that uses benchmark dataset, generating it first
+    if it does not exist yet.
+
+    :param size: dataset name, one of :data:`SIZES` keys
+    :type size: str
+    :param seed: random generator seed, defaults to 42
+    :type seed: int
+    :param data_dir: directory where dataset files are kept
+    :type data_dir: str
+    :return: application object
+    :rtype: Brewlog
+    """
+    path = database_path(size, seed, data_dir)
+    app = make_app('test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    if os.path.isfile(path):
+        return app
+    os.makedirs(data_dir, exist_ok=True)
+    partial_path = f'{path}.partial'
+    if os.path.isfile(partial_path):
+        os.remove(partial_path)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{partial_path}'
+    with app.app_context():
+        db.create_all()
+        populate(SIZES[size], seed)
+        db.session.execute('ANALYZE')
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+    os.rename(partial_path, path)
+    return create_app(size, seed, data_dir)
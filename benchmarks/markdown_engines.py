@@ -0,0 +1,68 @@
+"""Markdown engine throughput benchmark.
+
+Renders long recipe notes assembled from compatibility test corpus with
+every installed engine, bypassing rendering cache::
+
+    python benchmarks/markdown_engines.py --sections 40 --rounds 200
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from brewlog.utils.rendering import ENGINES, make_engine
+
+CORPUS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'tests', 'data', 'markdown',
+)
+
+
+def load_corpus():
+    texts = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if name.endswith('.md'):
+            with open(os.path.join(CORPUS_DIR, name), encoding='utf-8') as fp:
+                texts.append(fp.read())
+    return texts
+
+
+def make_notes(corpus, sections, count, rng):
+    return [
+        '\n\n'.join(rng.choices(corpus, k=sections)) for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, default=40)
+    parser.add_argument('--notes', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+    rng = random.Random(opts.seed)
+    notes = make_notes(load_corpus(), opts.sections, opts.notes, rng)
+    avg_size = statistics.mean(len(note) for note in notes)
+    print(f'notes: {opts.notes}, average size: {avg_size / 1024:.1f} KiB')
+    for name in sorted(ENGINES):
+        try:
+            render = make_engine(name)
+        except ImportError:
+            print(f'{name:12} not installed')
+            continue
+        timings = []
+        for num in range(opts.rounds):
+            note = notes[num % len(notes)]
+            started = time.perf_counter()
+            render(note)
+            timings.append((time.perf_counter() - started) * 1000)
+        throughput = opts.rounds / (sum(timings) / 1000)
+        print(
+            f'{name:12} {throughput:8.1f} notes/s, '
+            f'p50 {statistics.median(timings):.2f}ms, max {max(timings):.2f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Hot path micro benchmarks.
+
+Run in single request context, session is cleared after each call so
+objects are loaded from database every time.
+"""
+from typing import Dict
+
+from brewlog.brew.utils import BrewUtils, list_query_for_user
+from brewlog.ext import db
+from brewlog.models import Brew, BrewerProfile, TastingNote
+from brewlog.utils.query import search_result
+from brewlog.utils.rendering import render_field
+from brewlog.utils.text import stars2deg
+
+from . import measure
+
+STARS_TEXT = (
+    'Mash at 66*C for 60 minutes, mash out at 78*C. Ferment at 12*C for two '
+    'weeks, then raise to 18*C for diacetyl rest. ' * 20
+)
+
+
+def _fresh(func):
+    def call(num):
+        try:
+            func(num)
+        finally:
+            db.session.rollback()
+            db.session.expunge_all()
+    return call
+
+
+def run(app, rounds: int) -> Dict[str, Dict[str, float]]:
+    """Measure utility functions used by main pages.
+
+    :param app: application object
+    :type app: Brewlog
+    :param rounds: number of calls of each function
+    :type rounds: int
+    :return: mapping of benchmark name to its results
+    :rtype: Dict[str, Dict[str, float]]
+    """
+    results = {}
+    with app.test_request_context():
+        user_id = db.session.query(BrewerProfile.id).filter(
+            BrewerProfile.is_public.is_(True)
+        ).order_by(BrewerProfile.id).limit(1).scalar()
+        note_ids = [
+            note_id for (note_id,) in db.session.query(TastingNote.id)
+            .order_by(TastingNote.id).limit(100)
+        ]
+
+        def user():
+            return BrewerProfile.query.get(user_id)
+
+        def render_note(num, changed=True):
+            if changed:
+                note = TastingNote.query.get(note_ids[num % len(note_ids)])
+                # unique text so every call misses rendering cache
+                note.text = f'{note.text}\n\n*round {num}*'
+            else:
+                # same text every time, rendered during warmup
+                note = TastingNote.query.get(note_ids[0])
+                note.text_html = None
+            render_field(note, 'text', 'text_html')
+
+        cases = {
+            'brew_utils/latest_public': lambda num: BrewUtils.latest(
+                Brew.created, public_only=True
+            ),
+            'brew_utils/latest_user': lambda num: BrewUtils.latest(
+                Brew.created, user=user()
+            ),
+            'brew_utils/fermenting_public': lambda num: BrewUtils.fermenting(),
+            'brew_utils/brew_list_page': lambda num: BrewUtils.brew_list_query()
+            .order_by(db.desc(Brew.created), db.desc(Brew.id)).limit(20).all(),
+            'search_result/user_brews': lambda num: BrewUtils.brew_search_result(
+                list_query_for_user(user(), loading=None).order_by(Brew.name)
+            ),
+            'search_result/public_prefix': lambda num: search_result(
+                Brew.query.filter(
+                    Brew.effectively_public.is_(True), Brew.name.like('a%')
+                ).order_by(Brew.name).limit(10),
+                'brew.details', 'brew_id',
+            ),
+            'markdown/render_field_miss': render_note,
+            'markdown/render_field_hit': lambda num: render_note(num, changed=False),
+        }
+        for name, func in cases.items():
+            results[name] = measure(_fresh(func), rounds)
+    results['text/stars2deg'] = measure(lambda num: stars2deg(STARS_TEXT), rounds)
+    return results
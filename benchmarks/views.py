@@ -0,0 +1,88 @@
+"""Endpoint benchmarks.
+
+Requests are made sequentially with Flask test client, each one with fresh
+application context like in production. Conditional request headers are not
+sent so every response is rendered in full.
+"""
+import random
+from typing import Dict, List, Tuple
+
+from flask import url_for
+
+from brewlog.ext import db
+from brewlog.models import Brew, BrewerProfile
+
+from . import measure
+
+SAMPLE_SIZE = 100
+
+
+def _samples(app, seed: int) -> Tuple[List[int], List[int], int]:
+    rng = random.Random(seed)
+    with app.app_context():
+        brew_ids = [
+            brew_id for (brew_id,) in db.session.query(Brew.id).filter(
+                Brew.effectively_public.is_(True)
+            ).order_by(Brew.id)
+        ]
+        user_ids = [
+            user_id for (user_id,) in db.session.query(BrewerProfile.id).filter(
+                BrewerProfile.is_public.is_(True)
+            ).order_by(BrewerProfile.id)
+        ]
+    return (
+        rng.sample(brew_ids, min(SAMPLE_SIZE, len(brew_ids))),
+        rng.sample(user_ids, min(SAMPLE_SIZE, len(user_ids))),
+        rng.choice(user_ids),
+    )
+
+
+def _urls(app, brew_ids: List[int], user_ids: List[int]) -> Dict[str, List[str]]:
+    with app.test_request_context():
+        return {
+            'home': [url_for('home.index')],
+            'brew.all': [url_for('brew.all')],
+            'brew.details': [
+                url_for('brew.details', brew_id=brew_id) for brew_id in brew_ids
+            ],
+            'brewery.all': [url_for('brewery.all')],
+            'profile.brews': [
+                url_for('profile.brews', user_id=user_id) for user_id in user_ids
+            ],
+            'tastingnote.all': [url_for('tastingnote.all')],
+            'search.results': [url_for('search.results', q='ale')],
+            'brew.search': [url_for('brew.search', q='a')],
+        }
+
+
+def run(app, rounds: int, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """Measure latency and throughput of main endpoints, for anonymous and
+    authenticated user.
+
+    :param app: application object
+    :type app: Brewlog
+    :param rounds: number of requests to each endpoint
+    :type rounds: int
+    :param seed: random generator seed, defaults to 42
+    :type seed: int
+    :return: mapping of benchmark name to its results
+    :rtype: Dict[str, Dict[str, float]]
+    """
+    brew_ids, user_ids, login_id = _samples(app, seed)
+    urls = _urls(app, brew_ids, user_ids)
+    results = {}
+    for viewer in ('anon', 'user'):
+        client = app.test_client()
+        if viewer == 'user':
+            with client.session_transaction() as session:
+                session['_user_id'] = str(login_id)
+                session['_fresh'] = True
+        for name, endpoint_urls in urls.items():
+
+            def request(num, urls=endpoint_urls, client=client, name=name):
+                rv = client.get(urls[num % len(urls)])
+                if rv.status_code != 200:
+                    raise RuntimeError(f'{name}: HTTP {rv.status_code}')
+
+            results[f'views/{name}/{viewer}'] = measure(request, rounds)
+    return results
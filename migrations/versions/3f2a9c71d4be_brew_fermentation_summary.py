@@ -0,0 +1,36 @@
+"""brew fermentation summary columns
+
+Revision ID: 3f2a9c71d4be
+Revises: 5777779293a6
+Create Date: 2026-10-18 10:12:41.203117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c71d4be'
+down_revision = '5777779293a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('brew', sa.Column('og', sa.Float(precision=1), nullable=True))
+    op.add_column('brew', sa.Column('fg', sa.Float(precision=1), nullable=True))
+    op.add_column('brew', sa.Column('abv', sa.Float(precision=1), nullable=True))
+    op.add_column('brew', sa.Column('brew_length', sa.Float(precision=2), nullable=True))
+    op.add_column('brew', sa.Column('fermentation_start_date', sa.Date(), nullable=True))
+    op.create_index(op.f('ix_brew_og'), 'brew', ['og'], unique=False)
+    op.create_index(op.f('ix_brew_abv'), 'brew', ['abv'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_brew_abv'), table_name='brew')
+    op.drop_index(op.f('ix_brew_og'), table_name='brew')
+    op.drop_column('brew', 'fermentation_start_date')
+    op.drop_column('brew', 'brew_length')
+    op.drop_column('brew', 'abv')
+    op.drop_column('brew', 'fg')
+    op.drop_column('brew', 'og')
@@ -0,0 +1,47 @@
+"""counters of brews, breweries and tasting notes
+
+Revision ID: 7a4d2e9b1c36
+Revises: f3c8a1d29b47
+Create Date: 2026-10-19 01:12:37.904215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4d2e9b1c36'
+down_revision = 'f3c8a1d29b47'
+branch_labels = None
+depends_on = None
+
+COUNTERS = (
+    ('brew', 'brewery_id', 'brewery', 'brew_count'),
+    ('brewery', 'brewer_id', 'brewer_profile', 'brewery_count'),
+    ('tasting_note', 'brew_id', 'brew', 'tasting_note_count'),
+    ('tasting_note', 'author_id', 'brewer_profile', 'tasting_note_count'),
+)
+
+
+def upgrade():
+    for _, _, parent_name, column_name in COUNTERS:
+        op.add_column(
+            parent_name,
+            sa.Column(column_name, sa.Integer(), server_default='0', nullable=False)
+        )
+    for child_name, fk_name, parent_name, column_name in COUNTERS:
+        child = sa.table(child_name, sa.column(fk_name, sa.Integer))
+        parent = sa.table(
+            parent_name,
+            sa.column('id', sa.Integer), sa.column(column_name, sa.Integer),
+        )
+        op.execute(parent.update().values({
+            column_name: sa.select([sa.func.count()]).select_from(child).where(
+                child.c[fk_name] == parent.c.id
+            ).as_scalar()
+        }))
+
+
+def downgrade():
+    for _, _, parent_name, column_name in reversed(COUNTERS):
+        op.drop_column(parent_name, column_name)
@@ -0,0 +1,86 @@
+"""full text search documents
+
+Revision ID: 8c41e2b07a13
+Revises: 3f2a9c71d4be
+Create Date: 2026-10-18 13:40:08.551903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e2b07a13'
+down_revision = '3f2a9c71d4be'
+branch_labels = None
+depends_on = None
+
+PG_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(keywords, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'B')"
+)
+
+
+def upgrade():
+    op.create_table(
+        'search_document',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.Column('title', sa.String(length=250), nullable=False),
+        sa.Column('keywords', sa.Text(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('updated', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        op.f('ix_search_document_owner_id'), 'search_document', ['owner_id'],
+        unique=False
+    )
+    op.create_index(
+        'search_document_object', 'search_document', ['kind', 'object_id'],
+        unique=True
+    )
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE search_document_fts USING fts5(keywords, content, "
+            "content='search_document', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER search_document_ai AFTER INSERT ON search_document "
+            "BEGIN INSERT INTO search_document_fts(rowid, keywords, content) "
+            "VALUES (new.id, new.keywords, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER search_document_ad AFTER DELETE ON search_document "
+            "BEGIN INSERT INTO search_document_fts(search_document_fts, rowid, "
+            "keywords, content) VALUES ('delete', old.id, old.keywords, "
+            "old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER search_document_au AFTER UPDATE ON search_document "
+            "BEGIN INSERT INTO search_document_fts(search_document_fts, rowid, "
+            "keywords, content) VALUES ('delete', old.id, old.keywords, "
+            "old.content); INSERT INTO search_document_fts(rowid, keywords, "
+            "content) VALUES (new.id, new.keywords, new.content); END"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            'CREATE INDEX search_document_fts ON search_document '
+            f'USING gin (({PG_VECTOR_SQL}))'
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS search_document_fts')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS search_document_fts')
+    op.drop_index('search_document_object', table_name='search_document')
+    op.drop_index(op.f('ix_search_document_owner_id'), table_name='search_document')
+    op.drop_table('search_document')
@@ -0,0 +1,27 @@
+"""brewery statistics stored as json
+
+Revision ID: 9e2b6c4f0a57
+Revises: 7a4d2e9b1c36
+Create Date: 2026-10-19 02:06:48.113570
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e2b6c4f0a57'
+down_revision = '7a4d2e9b1c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # column was never written, statistics are calculated on first display
+    op.drop_column('brewery', 'stats')
+    op.add_column('brewery', sa.Column('stats', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('brewery', 'stats')
+    op.add_column('brewery', sa.Column('stats', sa.Text(), nullable=True))
@@ -0,0 +1,47 @@
+"""persisted brew state
+
+Revision ID: b7d5e8f31c02
+Revises: 8c41e2b07a13
+Create Date: 2026-10-18 15:02:37.118264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d5e8f31c02'
+down_revision = '8c41e2b07a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'brew',
+        sa.Column(
+            'state', sa.String(length=20), server_default='planned', nullable=False
+        )
+    )
+    brew = sa.table(
+        'brew',
+        sa.column('state', sa.String), sa.column('date_brewed', sa.Date),
+        sa.column('bottling_date', sa.Date), sa.column('tapped', sa.Date),
+        sa.column('finished', sa.Date),
+    )
+    today = sa.func.current_date()
+    op.execute(brew.update().values(state=sa.case([
+        (brew.c.finished.isnot(None), 'finished'),
+        (brew.c.tapped <= today, 'tapped'),
+        (brew.c.bottling_date <= today, 'maturing'),
+        (brew.c.date_brewed <= today, 'fermenting'),
+    ], else_='planned')))
+    op.create_index(
+        'brew_state_public_brewed', 'brew', ['state', 'is_public', 'date_brewed'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('brew_state_public_brewed', table_name='brew')
+    op.drop_column('brew', 'state')
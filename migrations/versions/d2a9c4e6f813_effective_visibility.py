@@ -0,0 +1,84 @@
+"""effective visibility flags
+
+Revision ID: d2a9c4e6f813
+Revises: b7d5e8f31c02
+Create Date: 2026-10-18 19:41:05.507731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a9c4e6f813'
+down_revision = 'b7d5e8f31c02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'brew',
+        sa.Column(
+            'effectively_public', sa.Boolean(), server_default=sa.false(),
+            nullable=False
+        )
+    )
+    op.add_column(
+        'tasting_note',
+        sa.Column(
+            'effectively_public', sa.Boolean(), server_default=sa.false(),
+            nullable=False
+        )
+    )
+    profile = sa.table(
+        'brewer_profile',
+        sa.column('id', sa.Integer), sa.column('is_public', sa.Boolean),
+    )
+    brewery = sa.table(
+        'brewery', sa.column('id', sa.Integer), sa.column('brewer_id', sa.Integer),
+    )
+    brew = sa.table(
+        'brew',
+        sa.column('id', sa.Integer), sa.column('brewery_id', sa.Integer),
+        sa.column('is_public', sa.Boolean), sa.column('effectively_public', sa.Boolean),
+    )
+    note = sa.table(
+        'tasting_note',
+        sa.column('brew_id', sa.Integer), sa.column('effectively_public', sa.Boolean),
+    )
+    brewer_public = sa.select([profile.c.is_public]).select_from(
+        brewery.join(profile, profile.c.id == brewery.c.brewer_id)
+    ).where(brewery.c.id == brew.c.brewery_id).as_scalar()
+    op.execute(brew.update().values(effectively_public=sa.and_(
+        sa.func.coalesce(brew.c.is_public, sa.true()),
+        sa.func.coalesce(brewer_public, sa.true()),
+    )))
+    op.execute(note.update().values(effectively_public=sa.select(
+        [brew.c.effectively_public]
+    ).where(brew.c.id == note.c.brew_id).as_scalar()))
+    op.drop_index('brew_state_public_brewed', table_name='brew')
+    op.create_index(
+        'brew_state_public_brewed', 'brew',
+        ['state', 'effectively_public', 'date_brewed'], unique=False
+    )
+    op.create_index(
+        'brew_public_created', 'brew', ['effectively_public', 'created', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'tasting_note_public_date', 'tasting_note',
+        ['effectively_public', 'date', 'id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('tasting_note_public_date', table_name='tasting_note')
+    op.drop_index('brew_public_created', table_name='brew')
+    op.drop_index('brew_state_public_brewed', table_name='brew')
+    op.create_index(
+        'brew_state_public_brewed', 'brew', ['state', 'is_public', 'date_brewed'],
+        unique=False
+    )
+    op.drop_column('tasting_note', 'effectively_public')
+    op.drop_column('brew', 'effectively_public')
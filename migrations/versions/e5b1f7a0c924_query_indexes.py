@@ -0,0 +1,52 @@
+"""indexes for foreign keys and shortlist queries
+
+Revision ID: e5b1f7a0c924
+Revises: d2a9c4e6f813
+Create Date: 2026-10-18 20:27:51.380154
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1f7a0c924'
+down_revision = 'd2a9c4e6f813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'brew_brewery_created', 'brew', ['brewery_id', 'created'], unique=False
+    )
+    op.create_index(
+        'brewery_brewer_name', 'brewery', ['brewer_id', 'name'], unique=False
+    )
+    op.create_index('brewery_name', 'brewery', ['name', 'id'], unique=False)
+    op.create_index('brewery_created', 'brewery', ['created'], unique=False)
+    op.create_index(
+        'tasting_note_brew_date', 'tasting_note', ['brew_id', 'date'], unique=False
+    )
+    op.create_index(
+        'tasting_note_author_date', 'tasting_note', ['author_id', 'date'],
+        unique=False
+    )
+    op.create_index(
+        'user_public_created', 'brewer_profile', ['is_public', 'created'],
+        unique=False
+    )
+    op.create_index(
+        'user_public_updated', 'brewer_profile', ['is_public', 'updated'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('user_public_updated', table_name='brewer_profile')
+    op.drop_index('user_public_created', table_name='brewer_profile')
+    op.drop_index('tasting_note_author_date', table_name='tasting_note')
+    op.drop_index('tasting_note_brew_date', table_name='tasting_note')
+    op.drop_index('brewery_created', table_name='brewery')
+    op.drop_index('brewery_name', table_name='brewery')
+    op.drop_index('brewery_brewer_name', table_name='brewery')
+    op.drop_index('brew_brewery_created', table_name='brew')
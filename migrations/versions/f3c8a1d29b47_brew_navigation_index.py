@@ -0,0 +1,23 @@
+"""index for previous and next brew navigation
+
+Revision ID: f3c8a1d29b47
+Revises: e5b1f7a0c924
+Create Date: 2026-10-18 23:41:12.518306
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a1d29b47'
+down_revision = 'e5b1f7a0c924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('brew_brewery_id', 'brew', ['brewery_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('brew_brewery_id', table_name='brew')
@@ -50,6 +50,7 @@ test_reqs = [
     'pytest-factoryboy',
     'pyfakefs',
     'fakeredis',
+    'prometheus-client',
 ]
 
 
@@ -104,6 +105,9 @@ setup(
     ),
     extras_require={
         'prod': ['uwsgi'],
+        'markdown-it': ['markdown-it-py'],
+        'mistune': ['mistune>=2'],
+        'metrics': ['prometheus-client'],
         'test': test_reqs,
         'dev': dev_reqs,
     },
@@ -9,15 +9,22 @@ from redis import Redis
 from werkzeug.utils import ImportStringError, import_string
 
 from .auth import auth_bp
+from .auth.principal import PrincipalCache
 from .brew import brew_bp
+from .brew.navigation import BrewNavigation
 from .brewery import brewery_bp
 from .ext import babel, bootstrap, csrf, db, login_manager, migrate, oauth, pages
 from .fermentation import ferm_bp
 from .home import home_bp
 from .profile import profile_bp
+from .search import search_bp
+from .search.autocomplete import AutocompleteService
 from .tasting import tasting_bp
 from .templates import setup_template_extensions
 from .utils.app import Brewlog
+from .utils.instrumentation import setup_instrumentation
+from .utils.metrics import setup_metrics
+from .utils.rendering import MarkdownRenderer
 
 
 def make_app(env: Optional[str] = None) -> Brewlog:
@@ -25,9 +32,11 @@ def make_app(env: Optional[str] = None) -> Brewlog:
         configure_logging()
     app = Brewlog(__name__.split('.')[0])
     configure_app(app, env)
+    setup_instrumentation(app)
     configure_extensions(app)
     with app.app_context():
         configure_redis(app)
+        setup_metrics(app)
         configure_blueprints(app)
         configure_error_handlers(app)
         setup_template_extensions(app)
@@ -59,6 +68,7 @@ def configure_blueprints(app: Brewlog):
     app.register_blueprint(brew_bp, url_prefix='/brew')
     app.register_blueprint(tasting_bp, url_prefix='/tastingnote')
     app.register_blueprint(ferm_bp, url_prefix='/ferm')
+    app.register_blueprint(search_bp, url_prefix='/search')
 
 
 def configure_extensions(app: Brewlog):
@@ -74,8 +84,11 @@ def configure_extensions(app: Brewlog):
 
     @login_manager.user_loader
     def get_user(user_id):
-        from .models.users import BrewerProfile
-        return BrewerProfile.query.get(user_id)
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return app.principals.get(user_id)
 
     if not babel.locale_selector_func:
         @babel.localeselector
@@ -98,6 +111,22 @@ def configure_redis(app: Brewlog):
         run_async = False
     app.redis = redis_conn_cls.from_url(app.config['REDIS_URL'])
     app.queue = rq.Queue('brewlog', is_async=run_async, connection=app.redis)
+    app.autocomplete = AutocompleteService(
+        app.redis, app.config['AUTOCOMPLETE_OVERLAY_CACHE_SIZE']
+    )
+    app.navigation = BrewNavigation(
+        app.redis, app.config['BREW_NAVIGATION_CACHE_TTL']
+    )
+    app.principals = PrincipalCache(
+        app.redis, app.config['PRINCIPAL_CACHE_TTL'],
+        app.config['PRINCIPAL_LOCAL_CACHE_TTL'],
+        app.config['PRINCIPAL_LOCAL_CACHE_SIZE'],
+    )
+    app.markdown = MarkdownRenderer(
+        app.redis, app.config['MARKDOWN_CACHE_TTL'],
+        app.config['MARKDOWN_LOCAL_CACHE_SIZE'],
+        app.config['MARKDOWN_ASYNC_THRESHOLD'], app.config['MARKDOWN_ENGINE'],
+    )
 
 
 def configure_logging():
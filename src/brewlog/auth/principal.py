@@ -0,0 +1,265 @@
+import datetime
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Union
+
+from flask import current_app, url_for
+from flask_babel import lazy_gettext as _
+from flask_login import UserMixin
+from redis import Redis
+from werkzeug.local import LocalProxy
+
+from ..ext import db
+from ..models import BrewerProfile
+from ..utils.events import after_commit, changed, mark_dirty
+from ..utils.metrics import cache_lookup
+
+# profile attributes which values are kept in cached principal, changes to
+# modification time alone do not invalidate cache
+PRINCIPAL_ATTRS = (
+    'nick', 'first_name', 'last_name', 'full_name', 'email', 'is_public',
+    'password', 'email_confirmed',
+)
+
+_DIRTY_KEY = 'principal_dirty'
+
+
+class CachedPrincipal(UserMixin):
+    """Authenticated user as seen by authentication and permission checks,
+    holds only few scalar attributes of profile. Compares equal to
+    :class:`BrewerProfile` with the same id. Full profile object is loaded
+    on first access to attribute that principal does not carry.
+
+    :param data: cached profile attributes
+    :type data: dict
+    """
+
+    def __init__(self, data: dict):
+        self._data = data
+        self._profile = None
+
+    @property
+    def id(self) -> int:  # noqa: A003
+        return self._data['id']
+
+    @property
+    def nick(self) -> Optional[str]:
+        return self._data['nick']
+
+    @property
+    def full_name(self) -> Optional[str]:
+        return self._data['full_name']
+
+    @property
+    def email(self) -> Optional[str]:
+        return self._data['email']
+
+    @property
+    def is_public(self) -> bool:
+        return self._data['is_public']
+
+    @property
+    def email_confirmed(self) -> bool:
+        return self._data['email_confirmed']
+
+    @property
+    def has_valid_password(self) -> bool:
+        return self._data['has_valid_password']
+
+    @property
+    def updated(self) -> Optional[datetime.datetime]:
+        return self._data['updated']
+
+    @property
+    def name(self) -> str:
+        return self.nick or self.full_name or _('wanting to stay anonymous')
+
+    @property
+    def breweries_list_url(self) -> str:
+        return url_for('profile.breweries', user_id=self.id)
+
+    @property
+    def brews_list_url(self) -> str:
+        return url_for('profile.brews', user_id=self.id)
+
+    @property
+    def profile(self) -> BrewerProfile:
+        """Full profile object, loaded on first access.
+
+        :return: profile object
+        :rtype: BrewerProfile
+        """
+        if self._profile is None:
+            self._profile = BrewerProfile.query.get(self.id)
+        return self._profile
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.profile, name)
+
+    def __repr__(self) -> str:
+        return f'<CachedPrincipal {self.id}>'
+
+
+def full_profile(user: Union[BrewerProfile, CachedPrincipal]) -> BrewerProfile:
+    """Get ORM profile object for user, needed when user is assigned to
+    relationship or added to session.
+
+    :param user: user object or proxy to it
+    :type user: Union[BrewerProfile, CachedPrincipal]
+    :return: profile object
+    :rtype: BrewerProfile
+    """
+    if isinstance(user, LocalProxy):
+        user = user._get_current_object()
+    if isinstance(user, CachedPrincipal):
+        return user.profile
+    return user
+
+
+def _load_data(user_id: int) -> Optional[dict]:
+    row = db.session.query(
+        BrewerProfile.id, BrewerProfile.nick, BrewerProfile.full_name,
+        BrewerProfile.email, BrewerProfile.is_public, BrewerProfile.email_confirmed,
+        BrewerProfile.updated, BrewerProfile.password,
+    ).filter(BrewerProfile.id == user_id).first()
+    if row is None:
+        return None
+    return {
+        'id': row.id,
+        'nick': row.nick,
+        'full_name': row.full_name,
+        'email': row.email,
+        'is_public': bool(row.is_public),
+        'email_confirmed': bool(row.email_confirmed),
+        'updated': row.updated,
+        'has_valid_password': row.password != 'unset',
+    }
+
+
+def _dumps(data: dict) -> str:
+    document = dict(data)
+    if document['updated'] is not None:
+        document['updated'] = document['updated'].isoformat()
+    return json.dumps(document)
+
+
+def _loads(raw: bytes) -> Optional[dict]:
+    try:
+        data = json.loads(raw)
+        if data['updated'] is not None:
+            data['updated'] = datetime.datetime.fromisoformat(data['updated'])
+        return data
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class PrincipalCache:
+    """Two level cache of principals: short lived per-process LRU in front of
+    Redis. Entries are removed from both levels after commit of changes to
+    profile, other processes may serve their local copy until it expires.
+
+    :param redis: Redis connection
+    :type redis: Redis
+    :param ttl: Redis entry lifetime in seconds
+    :type ttl: int
+    :param local_ttl: per-process entry lifetime in seconds
+    :type local_ttl: float
+    :param local_size: max number of entries kept in process memory
+    :type local_size: int
+    """
+
+    def __init__(
+                self, redis: Redis, ttl: int = 600, local_ttl: float = 5,
+                local_size: int = 1024,
+            ):
+        self.redis = redis
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f'principal:{user_id}'
+
+    def _local_get(self, user_id: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return data
+
+    def _local_set(self, user_id: int, data: dict):
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self.local_ttl, data)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, user_id: int) -> Optional[CachedPrincipal]:
+        """Get principal for user id, loading it from Redis or database if
+        not cached locally.
+
+        :param user_id: user id
+        :type user_id: int
+        :return: principal or None if user does not exist
+        :rtype: Optional[CachedPrincipal]
+        """
+        data = self._local_get(user_id)
+        if data is None:
+            raw = self.redis.get(self.key(user_id))
+            if raw is not None:
+                data = _loads(raw)
+            cache_lookup('principal', data is not None)
+            if data is None:
+                data = _load_data(user_id)
+                if data is None:
+                    return None
+                self.redis.set(self.key(user_id), _dumps(data), ex=self.ttl)
+            self._local_set(user_id, data)
+        return CachedPrincipal(data)
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Remove principals from cache.
+
+        :param user_ids: user ids
+        :type user_ids: Iterable[int]
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            for user_id in user_ids:
+                self._local.pop(user_id, None)
+        self.redis.delete(*[self.key(user_id) for user_id in user_ids])
+
+
+# events: principal cache invalidation
+def profile_post_update(mapper, connection, target):
+    if changed(target, PRINCIPAL_ATTRS):
+        mark_dirty(target, _DIRTY_KEY, [target.id])
+
+
+def profile_post_delete(mapper, connection, target):
+    mark_dirty(target, _DIRTY_KEY, [target.id])
+
+
+def _invalidate(user_ids):
+    cache = getattr(current_app, 'principals', None)
+    if cache is not None:
+        cache.invalidate(user_ids)
+
+
+db.event.listen(BrewerProfile, 'after_update', profile_post_update)
+db.event.listen(BrewerProfile, 'after_delete', profile_post_delete)
+after_commit(_DIRTY_KEY, _invalidate)
@@ -14,7 +14,7 @@ from ..models import Brew, Brewery, choices
 
 
 def user_breweries_query() -> BaseQuery:
-    return Brewery.query.filter_by(brewer=current_user).order_by(Brewery.name)
+    return Brewery.query.filter_by(brewer_id=current_user.id).order_by(Brewery.name)
 
 
 class BrewForm(BaseObjectForm):
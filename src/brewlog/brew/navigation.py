@@ -0,0 +1,246 @@
+import json
+from typing import Iterable, NamedTuple, Optional, Set, Tuple
+
+from flask import current_app
+from redis import Redis
+
+from ..ext import db
+from ..models import Brew, Brewery
+from ..utils.events import after_commit, changed, mark_dirty
+from ..utils.metrics import cache_lookup
+
+_brew = Brew.__table__
+
+_DIRTY_KEY = 'navigation_dirty'
+
+
+class Neighbour(NamedTuple):
+    id: int  # noqa: A003
+    name: str
+
+
+Neighbours = Tuple[Optional[Neighbour], Optional[Neighbour]]
+
+
+def _visible(brewery_id: int, public_only: bool):
+    criteria = [_brew.c.brewery_id == brewery_id]
+    if public_only:
+        criteria.append(_brew.c.is_public.is_(True))
+    return db.and_(*criteria)
+
+
+def supports_window_functions(connection) -> bool:
+    """Check if database supports window functions, SQLite has them since
+    version 3.25.
+
+    :param connection: database connection
+    :type connection: Connection
+    :return: True if LAG and LEAD may be used
+    :rtype: bool
+    """
+    dialect = connection.dialect
+    if dialect.name == 'sqlite':
+        return dialect.dbapi.sqlite_version_info >= (3, 25)
+    return True
+
+
+def window_query(brewery_id: int, brew_id: int, public_only: bool):
+    """Select previous and next brew with LAG and LEAD over visible brews of
+    brewery, ordered by id.
+
+    :param brewery_id: brewery id
+    :type brewery_id: int
+    :param brew_id: brew id
+    :type brew_id: int
+    :param public_only: include only public brews
+    :type public_only: bool
+    :return: select producing single row of previous id and name and next
+             id and name, or no rows if brew is not visible
+    """
+    columns = [_brew.c.id]
+    for func, prefix in ((db.func.lag, 'prev'), (db.func.lead, 'next')):
+        columns.extend([
+            func(_brew.c.id).over(order_by=_brew.c.id).label(f'{prefix}_id'),
+            func(_brew.c.name).over(order_by=_brew.c.id).label(f'{prefix}_name'),
+        ])
+    ordered = db.select(columns).where(_visible(brewery_id, public_only)).alias()
+    return db.select([
+        ordered.c.prev_id, ordered.c.prev_name, ordered.c.next_id,
+        ordered.c.next_name,
+    ]).where(ordered.c.id == brew_id)
+
+
+def subquery_query(brewery_id: int, brew_id: int, public_only: bool):
+    """Select previous and next brew with scalar subqueries, for databases
+    without window functions.
+
+    :param brewery_id: brewery id
+    :type brewery_id: int
+    :param brew_id: brew id
+    :type brew_id: int
+    :param public_only: include only public brews
+    :type public_only: bool
+    :return: select producing id and name of up to two neighbours
+    """
+    visible = _visible(brewery_id, public_only)
+    prev_id = db.select([_brew.c.id]).where(
+        db.and_(visible, _brew.c.id < brew_id)
+    ).order_by(db.desc(_brew.c.id)).limit(1).as_scalar()
+    next_id = db.select([_brew.c.id]).where(
+        db.and_(visible, _brew.c.id > brew_id)
+    ).order_by(_brew.c.id).limit(1).as_scalar()
+    return db.select([_brew.c.id, _brew.c.name]).where(
+        _brew.c.id.in_([prev_id, next_id])
+    )
+
+
+def neighbours(
+            connection, brewery_id: int, brew_id: int, public_only: bool,
+        ) -> Neighbours:
+    """Find previous and next brew of brewery in single query.
+
+    :param connection: database connection
+    :type connection: Connection
+    :param brewery_id: brewery id
+    :type brewery_id: int
+    :param brew_id: brew id
+    :type brew_id: int
+    :param public_only: include only public brews
+    :type public_only: bool
+    :return: previous and next brew, each may be None
+    :rtype: Neighbours
+    """
+    if supports_window_functions(connection):
+        row = connection.execute(window_query(brewery_id, brew_id, public_only)).first()
+        if row is None:
+            return None, None
+        previous = next_ = None
+        if row.prev_id is not None:
+            previous = Neighbour(row.prev_id, row.prev_name)
+        if row.next_id is not None:
+            next_ = Neighbour(row.next_id, row.next_name)
+        return previous, next_
+    previous = next_ = None
+    for row in connection.execute(subquery_query(brewery_id, brew_id, public_only)):
+        if row.id < brew_id:
+            previous = Neighbour(row.id, row.name)
+        else:
+            next_ = Neighbour(row.id, row.name)
+    return previous, next_
+
+
+def _dumps(value: Neighbours) -> str:
+    return json.dumps([list(item) if item else None for item in value])
+
+
+def _loads(raw: bytes) -> Neighbours:
+    previous, next_ = json.loads(raw)
+    return (
+        Neighbour(*previous) if previous else None,
+        Neighbour(*next_) if next_ else None,
+    )
+
+
+class BrewNavigation:
+    """Previous and next brew of brewery kept in Redis, one hash per
+    brewery and visibility scope with entries filled on first request for
+    brew. Hashes are removed after commit of changes to brews of brewery and
+    expire after ttl since first entry has been stored.
+
+    :param redis: Redis connection
+    :type redis: Redis
+    :param ttl: hash lifetime in seconds
+    :type ttl: int
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 3600):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def key(brewery_id: int, public_only: bool) -> str:
+        scope = 'public' if public_only else 'all'
+        return f'brewnav:{brewery_id}:{scope}'
+
+    def get(self, brew: Brew, public_only: bool = True) -> Neighbours:
+        """Get previous and next brew, querying database if not cached.
+
+        :param brew: brew
+        :type brew: Brew
+        :param public_only: include only public brews, defaults to True
+        :type public_only: bool
+        :return: previous and next brew, each may be None
+        :rtype: Neighbours
+        """
+        key = self.key(brew.brewery_id, public_only)
+        raw = self.redis.hget(key, brew.id)
+        cache_lookup('navigation', raw is not None)
+        if raw is not None:
+            try:
+                return _loads(raw)
+            except (TypeError, ValueError):
+                pass
+        value = neighbours(
+            db.session.connection(), brew.brewery_id, brew.id, public_only
+        )
+        pipe = self.redis.pipeline()
+        pipe.hset(key, brew.id, _dumps(value))
+        pipe.ttl(key)
+        _, ttl = pipe.execute()
+        if ttl < 0:
+            self.redis.expire(key, self.ttl)
+        return value
+
+    def invalidate(self, brewery_ids: Iterable[int]):
+        """Remove cached navigation of breweries in all visibility scopes.
+
+        :param brewery_ids: brewery ids
+        :type brewery_ids: Iterable[int]
+        """
+        keys = [
+            self.key(brewery_id, public_only)
+            for brewery_id in brewery_ids for public_only in (True, False)
+        ]
+        if keys:
+            self.redis.delete(*keys)
+
+
+# events: navigation cache invalidation
+def _brewery_ids(target) -> Set[int]:
+    history = db.inspect(target).attrs.brewery_id.history
+    values = set(history.deleted or ())
+    values.add(target.brewery_id)
+    values.discard(None)
+    return values
+
+
+def brew_brewery_set(target, value, oldvalue, initiator):
+    # brew moved by assigning relationship has no history of foreign key
+    if isinstance(oldvalue, Brewery) and oldvalue is not value:
+        mark_dirty(target, _DIRTY_KEY, [oldvalue.id])
+
+
+def brew_post_insert(mapper, connection, target):
+    mark_dirty(target, _DIRTY_KEY, _brewery_ids(target))
+
+
+def brew_post_update(mapper, connection, target):
+    if changed(target, ('is_public', 'brewery_id', 'name')):
+        mark_dirty(target, _DIRTY_KEY, _brewery_ids(target))
+
+
+def brew_post_delete(mapper, connection, target):
+    mark_dirty(target, _DIRTY_KEY, _brewery_ids(target))
+
+
+def _invalidate(brewery_ids):
+    navigation = getattr(current_app, 'navigation', None)
+    if navigation is not None:
+        navigation.invalidate(brewery_ids)
+
+
+db.event.listen(Brew.brewery, 'set', brew_brewery_set, active_history=True)
+db.event.listen(Brew, 'after_insert', brew_post_insert)
+db.event.listen(Brew, 'after_update', brew_post_update)
+db.event.listen(Brew, 'after_delete', brew_post_delete)
+after_commit(_DIRTY_KEY, _invalidate)
@@ -1,14 +1,20 @@
-import datetime
 from typing import Iterable, List, Mapping, Optional
 
+from flask import current_app
 from flask_babel import gettext, lazy_gettext as _
+from flask_login import current_user
 from flask_sqlalchemy import BaseQuery
 
 from ..ext import db
 from ..models import Brew, BrewerProfile, Brewery
 from ..models.brewing import BrewState
-from ..utils.query import public_or_owner, search_result
+from ..tasting.utils import TastingUtils
+from ..utils.loading import load_relationships, with_loading
+from ..utils.query import (
+    fetch_ordered, public_and_owned, public_or_owner, search_result,
+)
 from ..utils.text import stars2deg
+from .forms import BrewForm, ChangeStateForm
 
 
 class BrewUtils:
@@ -37,68 +43,54 @@ class BrewUtils:
     @staticmethod
     def fermenting(
                 user: Optional[BrewerProfile] = None, public_only: bool = True,
-                limit: int = 5
+                limit: int = 5, loading: Optional[str] = None,
             ) -> Iterable:
-        now = datetime.datetime.utcnow()
-        query = Brew.query.filter(
-            Brew.date_brewed <= now,
-            Brew.date_brewed.isnot(None),
-            Brew.bottling_date.is_(None),
-            Brew.tapped.is_(None),
-            Brew.finished.is_(None),
+        return BrewUtils._in_state(
+            BrewState.STATE_FERMENTING[0], user, public_only, limit, loading
         )
-        return BrewUtils._in_state(query, user, public_only, limit)
 
     @staticmethod
     def maturing(
                 user: Optional[BrewerProfile] = None, public_only: bool = True,
-                limit: int = 5
+                limit: int = 5, loading: Optional[str] = None,
             ) -> Iterable:
-        now = datetime.datetime.utcnow()
-        query = Brew.query.filter(
-            Brew.bottling_date <= now,
-            Brew.bottling_date.isnot(None),
-            Brew.tapped.is_(None),
-            Brew.finished.is_(None),
+        return BrewUtils._in_state(
+            BrewState.STATE_MATURING[0], user, public_only, limit, loading
         )
-        return BrewUtils._in_state(query, user, public_only, limit)
 
     @staticmethod
     def on_tap(
                 user: Optional[BrewerProfile] = None, public_only: bool = True,
-                limit: int = 5
+                limit: int = 5, loading: Optional[str] = None,
             ) -> Iterable:
-        now = datetime.datetime.utcnow()
-        query = Brew.query.filter(
-            Brew.tapped <= now,
-            Brew.tapped.isnot(None),
-            Brew.finished.is_(None),
+        return BrewUtils._in_state(
+            BrewState.STATE_TAPPED[0], user, public_only, limit, loading
         )
-        return BrewUtils._in_state(query, user, public_only, limit)
 
     @staticmethod
     def latest(
                 ordering, limit: int = 5, public_only: bool = False,
                 extra_user: Optional[BrewerProfile] = None,
                 user: Optional[BrewerProfile] = None, brewed_only: bool = False,
-            ) -> BaseQuery:
-        query = BrewUtils.brew_list_query(public_only, extra_user, user)
+                loading: Optional[str] = 'brew.list',
+            ) -> List[Brew]:
+        queries = BrewUtils.brew_list_queries(public_only, extra_user, user, loading)
         if brewed_only:
-            query = query.filter(Brew.date_brewed.isnot(None))
-        return query.order_by(db.desc(ordering)).limit(limit)
+            queries = [q.filter(Brew.date_brewed.isnot(None)) for q in queries]
+        return fetch_ordered(queries, ((ordering, True), (Brew.id, True)), limit)
 
     @staticmethod
     def _in_state(
-                state_query: BaseQuery, user: Optional[BrewerProfile],
-                public_only: bool, limit: int,
+                state: str, user: Optional[BrewerProfile], public_only: bool,
+                limit: int, loading: Optional[str] = None,
             ) -> Iterable:
         if user is not None and (not user.is_public and public_only):
             return []
-        query = state_query
+        query = with_loading(Brew.query.filter(Brew.state == state), loading)
         if public_only:
-            query = query.filter(Brew.is_public.is_(True))
+            query = query.filter(Brew.effectively_public.is_(True))
         if user is not None:
-            query = query.join(Brewery).filter(Brewery.brewer == user)
+            query = query.join(Brewery).filter(Brewery.brewer_id == user.id)
         query = query.order_by(db.desc(Brew.date_brewed))
         query = query.limit(limit)
         return query.all()
@@ -107,16 +99,30 @@ class BrewUtils:
     def brew_list_query(
                 public_only: bool = True, extra_user: Optional[BrewerProfile] = None,
                 user: Optional[BrewerProfile] = None,
+                loading: Optional[str] = 'brew.list',
             ) -> BaseQuery:
-        query = Brew.query
-        if user is not None or public_only:
-            query = query.join(Brewery).join(BrewerProfile)
-            if user is not None:
-                query = query.filter(BrewerProfile.id == user.id)
-            if public_only:
-                query = public_or_owner(query, extra_user)
+        query = with_loading(Brew.query, loading)
+        if user is not None:
+            query = query.join(Brewery).filter(Brewery.brewer_id == user.id)
+        if public_only:
+            query = public_or_owner(query, extra_user)
         return query
 
+    @staticmethod
+    def brew_list_queries(
+                public_only: bool = True, extra_user: Optional[BrewerProfile] = None,
+                user: Optional[BrewerProfile] = None,
+                loading: Optional[str] = 'brew.list',
+            ) -> List[BaseQuery]:
+        """Same as :meth:`brew_list_query` but visible brews are split into
+        disjoint queries to be paginated or fetched with
+        :func:`~brewlog.utils.query.fetch_ordered`.
+        """
+        query = BrewUtils.brew_list_query(False, None, user, loading)
+        if public_only:
+            return public_and_owned(query, extra_user)
+        return [query]
+
     @staticmethod
     def brew_search_result(query: BaseQuery) -> List[Mapping[str, str]]:
         return search_result(query, 'brew.details', 'brew_id')
@@ -129,7 +135,55 @@ class BrewUtils:
         )
 
 
-def list_query_for_user(user: BrewerProfile) -> BaseQuery:
+class BrewDetails:
+    """Data displayed on brew details page. Brew is expected to come with
+    brewery and brewer loaded, rest of page data is loaded in fixed number of
+    queries regardless of number of fermentation steps and tasting notes.
+    Tasting notes are displayed in windows, following windows are fetched
+    by page script. Forms are built only for brew owner.
+
+    :param brew: brew to be displayed
+    :type brew: Brew
+    :param form: brew form submitted by owner, defaults to None
+    :type form: Optional[BrewForm]
+    :param notes_cursor: tasting notes pagination cursor, defaults to None
+    :type notes_cursor: Optional[str]
+    """
+
+    def __init__(
+                self, brew: Brew, form: Optional[BrewForm] = None,
+                notes_cursor: Optional[str] = None,
+            ):
+        load_relationships(brew, 'brew.details')
+        self.brew = brew
+        self.notes_cursor = notes_cursor
+        self.is_owner = brew.brewery.brewer == current_user
+        self.form = None
+        self.action_form = None
+        if self.is_owner:
+            self.form = form or BrewForm(obj=brew)
+            if BrewUtils.state_changeable(brew):
+                self.action_form = ChangeStateForm(obj=brew)
+
+    def context(self) -> dict:
+        previous, next_ = current_app.navigation.get(
+            self.brew, public_only=not self.is_owner
+        )
+        return {
+            'brew': self.brew,
+            'utils': BrewUtils,
+            'is_owner': self.is_owner,
+            'next': next_,
+            'previous': previous,
+            'notes': TastingUtils.brew_notes(self.brew, self.notes_cursor),
+            'form': self.form,
+            'action_form': self.action_form,
+        }
+
+
+def list_query_for_user(
+            user: BrewerProfile, loading: Optional[str] = 'brew.list',
+        ) -> BaseQuery:
     if user.is_anonymous:
-        return BrewUtils.brew_list_query()
-    return BrewUtils.brew_list_query(public_only=False, user=user)
+        return BrewUtils.brew_list_query(loading=loading)
+    return BrewUtils.brew_list_query(public_only=False, user=user, loading=loading)
@@ -1,19 +1,25 @@
 from datetime import datetime
 from typing import Union
 
-from flask import Response, flash, jsonify, redirect, render_template, request, url_for
+from flask import (
+    Response, current_app, flash, jsonify, redirect, render_template, request,
+    url_for,
+)
 from flask_babel import lazy_gettext
 from flask_login import current_user, login_required
 
 from ..ext import db
 from ..forms.base import DeleteForm
 from ..models import Brew
-from ..utils.pagination import get_page
+from ..models.search import KIND_BREW
+from ..utils.http import conditional, data_validators, not_modified, page_validators
+from ..utils.loading import with_loading
+from ..utils.pagination import KeysetPagination, get_cursor
 from ..utils.views import next_redirect
 from . import brew_bp
 from .forms import BrewForm, ChangeStateForm
 from .permissions import AccessManager
-from .utils import BrewUtils, list_query_for_user
+from .utils import BrewDetails, BrewUtils, list_query_for_user
 
 HINTS = [
     (
@@ -48,9 +54,13 @@ def brew_add() -> Union[str, Response]:
 
 @brew_bp.route('/<int:brew_id>', methods=['POST', 'GET'], endpoint='details')
 def brew(brew_id: int) -> Union[str, Response]:
-    brew = Brew.query.get_or_404(brew_id)
+    brew = with_loading(Brew.query, 'brew.list').get_or_404(brew_id)
     is_post = request.method == 'POST'
     AccessManager(brew, is_post).check()
+    validators = page_validators(brew, brew.brewery, brew.brewery.brewer)
+    response = not_modified(validators)
+    if response is not None:
+        return response
     brew_form = None
     if is_post:
         brew_form = BrewForm()
@@ -61,30 +71,22 @@ def brew(brew_id: int) -> Union[str, Response]:
                 category='success'
             )
             return redirect(request.path)
-    public_only = brew.brewery.brewer != current_user
-    ctx = {
-        'brew': brew,
-        'utils': BrewUtils,
-        'mash_hints': HINTS,
-        'notes': brew.notes_to_json(),
-        'next': brew.get_next(public_only=public_only),
-        'previous': brew.get_previous(public_only=public_only),
-        'action_form': ChangeStateForm(obj=brew),
-        'form': brew_form or BrewForm(obj=brew),
-    }
-    return render_template('brew/details.html', **ctx)
+    # full graph is loaded only when page has to be rendered
+    ctx = BrewDetails(brew, brew_form, get_cursor(request)).context()
+    return conditional(render_template('brew/details.html', **ctx), validators)
 
 
 @brew_bp.route('/all', endpoint='all')
 def brew_all() -> str:
     page_size = 20
-    page = get_page(request)
     if current_user.is_anonymous:
-        query = BrewUtils.brew_list_query()
+        query = BrewUtils.brew_list_queries()
     else:
-        query = BrewUtils.brew_list_query(extra_user=current_user)
-    query = query.order_by(db.desc(Brew.created))
-    pagination = query.paginate(page, page_size)
+        query = BrewUtils.brew_list_queries(extra_user=current_user)
+    pagination = KeysetPagination(
+        query, ((Brew.created, True), (Brew.id, True)), get_cursor(request),
+        page_size,
+    )
     context = {
         'pagination': pagination,
         'utils': BrewUtils,
@@ -95,12 +97,25 @@ def brew_all() -> str:
 
 @brew_bp.route('/search', endpoint='search')
 def search() -> Response:
-    query = list_query_for_user(current_user)
-    term = request.args.getlist('q')
+    term = request.args.get('q')
+    user_id = None
+    if current_user.is_authenticated:
+        user_id = current_user.id
+    validators = data_validators(
+        KIND_BREW, current_app.autocomplete.generation(KIND_BREW, user_id), term,
+    )
+    response = not_modified(validators)
+    if response is not None:
+        return response
     if term:
-        query = query.filter(Brew.name.like(term[0] + '%'))
-    query = query.order_by(Brew.name)
-    return jsonify(BrewUtils.brew_search_result(query))
+        result = current_app.autocomplete.suggest(
+            KIND_BREW, term, user_id, limit=current_app.config['SEARCH_SUGGEST_LIMIT'],
+        )
+    else:
+        query = list_query_for_user(current_user, loading=None)
+        query = query.order_by(Brew.name)
+        result = BrewUtils.brew_search_result(query)
+    return conditional(jsonify(result), validators)
 
 
 @brew_bp.route('/<int:brew_id>/delete', methods=['GET', 'POST'], endpoint='delete')
@@ -133,7 +148,7 @@ def change_state(brew_id: int) -> Response:
     AccessManager(brew, True).check()
     form = ChangeStateForm()
     if form.validate_on_submit():
-        now = datetime.utcnow()
+        now = datetime.utcnow().date()
         action = form.action.data
         if action == 'tap':
             brew.tapped = now
@@ -4,6 +4,7 @@ from wtforms.fields import StringField, TextAreaField
 from wtforms.fields.html5 import DateField
 from wtforms.validators import InputRequired, Optional
 
+from ..auth.principal import full_profile
 from ..forms.base import BaseObjectForm
 from ..models import Brewery
 
@@ -15,5 +16,5 @@ class BreweryForm(BaseObjectForm):
 
     def save(self, obj=None):
         if obj is None:
-            obj = Brewery(brewer=current_user)
+            obj = Brewery(brewer=full_profile(current_user))
         return super(BreweryForm, self).save(obj, save=True)
@@ -0,0 +1,257 @@
+import datetime
+from typing import Iterable, Optional
+
+from flask import current_app
+
+from ..ext import db
+from ..models import Brew, Brewery, FermentationStep, TastingNote
+from ..models.brewing import STATES
+from ..utils.events import after_commit, changed, mark_dirty
+
+_brew = Brew.__table__
+_brewery = Brewery.__table__
+
+_DIRTY_KEY = 'brewery_stats_dirty'
+
+SCOPE_ALL = 'all'
+SCOPE_PUBLIC = 'public'
+
+# brew columns which minimum, maximum and average are collected
+MEASURES = ('og', 'fg', 'abv')
+
+# brew columns that statistics are calculated from
+BREW_ATTRS = (
+    'state', 'is_public', 'is_draft', 'brewery_id', 'date_brewed', 'brew_length',
+    *MEASURES,
+)
+
+
+def _empty_scope() -> dict:
+    scope = {
+        'brews': 0, 'states': {}, 'tasting_notes': 0, 'volume': 0.0,
+        'first_brewed': None, 'last_brewed': None,
+    }
+    for name in MEASURES:
+        scope[name] = {'count': 0, 'sum': 0.0, 'min': None, 'max': None}
+    return scope
+
+
+def _extreme(func, *values):
+    values = [value for value in values if value is not None]
+    if values:
+        return func(values)
+
+
+def _add_row(scope: dict, row):
+    scope['brews'] += row.brews
+    scope['states'][row.state] = scope['states'].get(row.state, 0) + row.brews
+    scope['tasting_notes'] += row.tasting_notes or 0
+    scope['volume'] += row.volume or 0
+    scope['first_brewed'] = _extreme(min, scope['first_brewed'], row.first_brewed)
+    scope['last_brewed'] = _extreme(max, scope['last_brewed'], row.last_brewed)
+    for name in MEASURES:
+        measure = scope[name]
+        measure['count'] += row[f'{name}_count']
+        measure['sum'] += row[f'{name}_sum'] or 0
+        measure['min'] = _extreme(min, measure['min'], row[f'{name}_min'])
+        measure['max'] = _extreme(max, measure['max'], row[f'{name}_max'])
+
+
+def _finish_scope(scope: dict) -> dict:
+    for name in MEASURES:
+        measure = scope.pop(name)
+        value = None
+        if measure['count']:
+            value = {
+                'avg': round(measure['sum'] / measure['count'], 2),
+                'min': measure['min'],
+                'max': measure['max'],
+            }
+        scope[name] = value
+    scope['volume'] = round(scope['volume'], 2)
+    for name in ('first_brewed', 'last_brewed'):
+        if scope[name] is not None:
+            scope[name] = scope[name].isoformat()
+    return scope
+
+
+class BreweryStats:
+    """Aggregated data of brewery brews stored in ``Brewery.stats`` column,
+    separately for all brews and for public non-draft ones. Statistics are
+    recalculated in background job enqueued after commit of changes to
+    brews, their fermentation steps and tasting notes. Jobs are debounced,
+    while one is waiting for brewery further changes do not enqueue more.
+    """
+
+    VERSION = 1
+
+    @staticmethod
+    def pending_key(brewery_id: int) -> str:
+        return f'brewery:stats:pending:{brewery_id}'
+
+    @staticmethod
+    def compute(connection, brewery_id: int) -> dict:
+        """Calculate statistics of brewery in single query.
+
+        :param connection: database connection
+        :type connection: Connection
+        :param brewery_id: brewery id
+        :type brewery_id: int
+        :return: statistics document
+        :rtype: dict
+        """
+        # no bound parameters so grouping expression matches selected one
+        public = db.and_(
+            db.func.coalesce(_brew.c.is_public, db.true()),
+            db.not_(db.func.coalesce(_brew.c.is_draft, db.false())),
+        )
+        columns = [
+            _brew.c.state, public.label('public'),
+            db.func.count(_brew.c.id).label('brews'),
+            db.func.sum(_brew.c.tasting_note_count).label('tasting_notes'),
+            db.func.sum(_brew.c.brew_length).label('volume'),
+            db.func.min(_brew.c.date_brewed).label('first_brewed'),
+            db.func.max(_brew.c.date_brewed).label('last_brewed'),
+        ]
+        for name in MEASURES:
+            column = _brew.c[name]
+            columns.extend([
+                db.func.count(column).label(f'{name}_count'),
+                db.func.sum(column).label(f'{name}_sum'),
+                db.func.min(column).label(f'{name}_min'),
+                db.func.max(column).label(f'{name}_max'),
+            ])
+        rows = connection.execute(
+            db.select(columns).where(_brew.c.brewery_id == brewery_id)
+            .group_by(_brew.c.state, public)
+        )
+        scopes = {SCOPE_ALL: _empty_scope(), SCOPE_PUBLIC: _empty_scope()}
+        for row in rows:
+            _add_row(scopes[SCOPE_ALL], row)
+            if row.public:
+                _add_row(scopes[SCOPE_PUBLIC], row)
+        return {
+            'v': BreweryStats.VERSION,
+            'scopes': {name: _finish_scope(scope) for name, scope in scopes.items()},
+        }
+
+    @classmethod
+    def refresh(cls, brewery_id: int) -> dict:
+        """Recalculate and store statistics of brewery. Pending mark is
+        removed first so changes committed while this runs enqueue another
+        job.
+
+        :param brewery_id: brewery id
+        :type brewery_id: int
+        :return: statistics document
+        :rtype: dict
+        """
+        current_app.redis.delete(cls.pending_key(brewery_id))
+        with db.engine.begin() as connection:
+            stats = cls.compute(connection, brewery_id)
+            # statistics are not modification of brewery, keep its timestamp
+            connection.execute(
+                _brewery.update().where(_brewery.c.id == brewery_id)
+                .values(stats=stats, updated=_brewery.c.updated)
+            )
+        return stats
+
+    @classmethod
+    def schedule(cls, brewery_ids: Iterable[int]):
+        """Enqueue recalculation of statistics of breweries that do not have
+        one pending already.
+
+        :param brewery_ids: brewery ids
+        :type brewery_ids: Iterable[int]
+        """
+        redis = current_app.redis
+        delay = current_app.config['BREWERY_STATS_DELAY']
+        for brewery_id in sorted(brewery_ids):
+            if not redis.set(
+                        cls.pending_key(brewery_id), 1, nx=True,
+                        ex=max(delay, 1) * 2,
+                    ):
+                continue
+            args = ('brewlog.tasks.refresh_brewery_stats', brewery_id)
+            if delay > 0:
+                current_app.queue.enqueue_in(datetime.timedelta(seconds=delay), *args)
+            else:
+                current_app.queue.enqueue(*args)
+
+    @classmethod
+    def get(cls, brewery: Brewery, public_only: bool = True) -> Optional[dict]:
+        """Get statistics of brewery for display. Missing or outdated
+        statistics are scheduled for recalculation.
+
+        :param brewery: brewery
+        :type brewery: Brewery
+        :param public_only: statistics of public brews only, defaults to True
+        :type public_only: bool
+        :return: statistics with brew counts as list of (state label, count)
+                 pairs and parsed dates, or None if not available yet
+        :rtype: Optional[dict]
+        """
+        stats = brewery.stats
+        if not isinstance(stats, dict) or stats.get('v') != cls.VERSION:
+            cls.schedule([brewery.id])
+            return None
+        scope = dict(stats['scopes'][SCOPE_PUBLIC if public_only else SCOPE_ALL])
+        scope['states'] = [
+            (state[1], scope['states'][name])
+            for name, (state, _) in STATES.items() if scope['states'].get(name)
+        ]
+        for name in ('first_brewed', 'last_brewed'):
+            if scope[name] is not None:
+                scope[name] = datetime.date.fromisoformat(scope[name])
+        return scope
+
+
+# events: statistics recalculation
+def _brew_brewery_id(connection, brew_id: Optional[int]) -> Optional[int]:
+    return connection.execute(
+        db.select([_brew.c.brewery_id]).where(_brew.c.id == brew_id)
+    ).scalar()
+
+
+def brewery_post_insert(mapper, connection, target):
+    mark_dirty(target, _DIRTY_KEY, [target.id])
+
+
+def brew_post_save(mapper, connection, target):
+    if changed(target, BREW_ATTRS):
+        mark_dirty(target, _DIRTY_KEY, [
+            *db.inspect(target).attrs.brewery_id.history.deleted,
+            target.brewery_id,
+        ])
+
+
+def brew_post_delete(mapper, connection, target):
+    mark_dirty(target, _DIRTY_KEY, [target.brewery_id])
+
+
+def brew_child_post_save(mapper, connection, target):
+    # brew summary columns and counters are maintained with plain SQL so
+    # changes of brew children are tracked separately
+    mark_dirty(target, _DIRTY_KEY, [_brew_brewery_id(connection, target.brew_id)])
+
+
+def tasting_note_post_update(mapper, connection, target):
+    history = db.inspect(target).attrs.brew_id.history
+    if history.has_changes():
+        mark_dirty(target, _DIRTY_KEY, [
+            _brew_brewery_id(connection, brew_id)
+            for brew_id in (*history.deleted, target.brew_id)
+        ])
+
+
+db.event.listen(Brewery, 'after_insert', brewery_post_insert)
+db.event.listen(Brew, 'after_insert', brew_post_save)
+db.event.listen(Brew, 'after_update', brew_post_save)
+db.event.listen(Brew, 'after_delete', brew_post_delete)
+db.event.listen(FermentationStep, 'after_insert', brew_child_post_save)
+db.event.listen(FermentationStep, 'after_update', brew_child_post_save)
+db.event.listen(FermentationStep, 'after_delete', brew_child_post_save)
+db.event.listen(TastingNote, 'after_insert', brew_child_post_save)
+db.event.listen(TastingNote, 'after_update', tasting_note_post_update)
+db.event.listen(TastingNote, 'after_delete', brew_child_post_save)
+after_commit(_DIRTY_KEY, BreweryStats.schedule)
@@ -1,10 +1,14 @@
 from typing import List, Mapping
 
+from flask_login import current_user
 from flask_sqlalchemy import BaseQuery
 
 from ..ext import db
 from ..models import Brew, BrewerProfile, Brewery
-from ..utils.query import search_result
+from ..utils.loading import with_loading
+from ..utils.query import fetch_ordered, search_result
+from .forms import BreweryForm
+from .stats import BreweryStats
 
 
 class BreweryUtils:
@@ -13,13 +17,14 @@ class BreweryUtils:
         self.brewery = brewery
 
     @staticmethod
-    def breweries(public_only=True, extra_user=None):
-        query = Brewery.query
+    def breweries(public_only=True, extra_user=None, loading='brewery.list'):
+        query = with_loading(Brewery.query, loading)
         if public_only:
             if extra_user:
                 query = query.join(BrewerProfile).filter(
                     db.or_(
-                        BrewerProfile.is_public.is_(True), Brewery.brewer == extra_user
+                        BrewerProfile.is_public.is_(True),
+                        Brewery.brewer_id == extra_user.id,
                     )
                 )
             else:
@@ -29,18 +34,36 @@ class BreweryUtils:
         return query
 
     @staticmethod
-    def latest_breweries(ordering, limit=5, public_only=False, extra_user=None):
-        return BreweryUtils.breweries(
-            public_only, extra_user
-        ).order_by(db.desc(ordering)).limit(limit).all()
+    def brewery_queries(public_only=True, extra_user=None, loading='brewery.list'):
+        """Same as :meth:`breweries` but visible breweries are split into
+        disjoint queries of breweries of public brewers and breweries of
+        hidden extra user, to be paginated or fetched with
+        :func:`~brewlog.utils.query.fetch_ordered`.
+        """
+        query = BreweryUtils.breweries(public_only, None, loading)
+        if public_only and extra_user and not extra_user.is_public:
+            return [query, with_loading(Brewery.query, loading).filter(
+                Brewery.brewer_id == extra_user.id
+            )]
+        return [query]
+
+    @staticmethod
+    def latest_breweries(
+                ordering, limit=5, public_only=False, extra_user=None,
+                loading='brewery.list',
+            ):
+        return fetch_ordered(
+            BreweryUtils.brewery_queries(public_only, extra_user, loading),
+            ((ordering, True), (Brewery.id, True)), limit,
+        )
 
     @staticmethod
     def brewery_search_result(query: BaseQuery) -> List[Mapping[str, str]]:
         return search_result(query, 'brewery.details', 'brewery_id')
 
     @staticmethod
-    def brews(brewery, order, public_only=True, limit=None):
-        query = brewery.brews.filter_by(is_draft=False)
+    def brews(brewery, order, public_only=True, limit=None, loading=None):
+        query = with_loading(brewery.brews, loading).filter_by(is_draft=False)
         if public_only:
             query = query.filter_by(is_public=True)
         query = query.order_by(order)
@@ -53,3 +76,32 @@ class BreweryUtils:
             self.brewery, order=db.desc(Brew.created), public_only=public_only,
             limit=limit,
         )
+
+
+class BreweryDetails:
+    """Data displayed on brewery details page. Brewery is expected to come
+    with brewer loaded. Non-owners see only public brews and statistics of
+    them, edit form is built only for brewery owner.
+
+    :param brewery: brewery to be displayed
+    :type brewery: Brewery
+    :param form: brewery form submitted by owner, defaults to None
+    :type form: Optional[BreweryForm]
+    """
+
+    def __init__(self, brewery, form=None):
+        self.brewery = brewery
+        self.is_owner = brewery.brewer == current_user
+        self.form = None
+        if self.is_owner:
+            self.form = form or BreweryForm(obj=brewery)
+
+    def context(self):
+        utils = BreweryUtils(self.brewery)
+        return {
+            'brewery': self.brewery,
+            'is_owner': self.is_owner,
+            'recent_brews': utils.recent_brews(public_only=not self.is_owner).all(),
+            'stats': BreweryStats.get(self.brewery, public_only=not self.is_owner),
+            'form': self.form,
+        }
@@ -1,16 +1,22 @@
-from flask import flash, jsonify, redirect, render_template, request, url_for
+from flask import (
+    current_app, flash, jsonify, redirect, render_template, request, url_for,
+)
 from flask_babel import lazy_gettext as _
 from flask_login import current_user, login_required
 
+from ..auth.principal import full_profile
 from ..ext import db
 from ..forms.base import DeleteForm
-from ..models import Brewery
-from ..utils.pagination import get_page
+from ..models import Brew, Brewery
+from ..models.search import KIND_BREWERY
+from ..utils.http import conditional, data_validators, not_modified, page_validators
+from ..utils.loading import with_loading
+from ..utils.pagination import KeysetPagination, get_cursor
 from ..utils.views import next_redirect
 from . import brewery_bp
 from .forms import BreweryForm
 from .permissions import AccessManager
-from .utils import BreweryUtils
+from .utils import BreweryDetails, BreweryUtils
 
 
 @brewery_bp.route('/add', methods=['POST', 'GET'], endpoint='add')
@@ -53,13 +59,14 @@ def brewery_delete(brewery_id):
 @brewery_bp.route('/all', endpoint='all')
 def brewery_all():
     page_size = 20
-    page = get_page(request)
     if current_user.is_anonymous:
-        query = BreweryUtils.breweries()
+        query = BreweryUtils.brewery_queries()
     else:
-        query = BreweryUtils.breweries(extra_user=current_user)
-    query = query.order_by(Brewery.name)
-    pagination = query.paginate(page, page_size)
+        query = BreweryUtils.brewery_queries(extra_user=current_user)
+    pagination = KeysetPagination(
+        query, ((Brewery.name, False), (Brewery.id, False)), get_cursor(request),
+        page_size,
+    )
     ctx = {
         'pagination': pagination,
     }
@@ -68,24 +75,43 @@ def brewery_all():
 
 @brewery_bp.route('/search', endpoint='search')
 def search():
-    if current_user.is_anonymous:
-        query = BreweryUtils.breweries()
-    else:
-        query = current_user.breweries
-    term = request.args.getlist('q')
+    term = request.args.get('q')
+    user_id = None
+    if current_user.is_authenticated:
+        user_id = current_user.id
+    validators = data_validators(
+        KIND_BREWERY, current_app.autocomplete.generation(KIND_BREWERY, user_id),
+        term,
+    )
+    response = not_modified(validators)
+    if response is not None:
+        return response
     if term:
-        query = query.filter(Brewery.name.like(term[0] + '%'))
-    query = query.order_by(Brewery.name)
-    return jsonify(BreweryUtils.brewery_search_result(query))
+        result = current_app.autocomplete.suggest(
+            KIND_BREWERY, term, user_id,
+            limit=current_app.config['SEARCH_SUGGEST_LIMIT'],
+        )
+    else:
+        if current_user.is_anonymous:
+            query = BreweryUtils.breweries(loading=None)
+        else:
+            query = full_profile(current_user).breweries
+        query = query.order_by(Brewery.name)
+        result = BreweryUtils.brewery_search_result(query)
+    return conditional(jsonify(result), validators)
 
 
 @brewery_bp.route(
     '/<int:brewery_id>', methods=['POST', 'GET'], endpoint='details',
 )
 def brewery(brewery_id):
-    brewery = Brewery.query.get_or_404(brewery_id)
+    brewery = with_loading(Brewery.query, 'brewery.details').get_or_404(brewery_id)
     is_post = request.method == 'POST'
     AccessManager(brewery, is_post).check()
+    validators = page_validators(brewery, brewery.brewer)
+    response = not_modified(validators)
+    if response is not None:
+        return response
     form = None
     if is_post:
         form = BreweryForm()
@@ -96,12 +122,8 @@ def brewery(brewery_id):
                 category='success',
             )
             return redirect(request.path)
-    ctx = {
-        'brewery': brewery,
-        'utils': BreweryUtils(brewery),
-        'form': form or BreweryForm(obj=brewery),
-    }
-    return render_template('brewery/details.html', **ctx)
+    ctx = BreweryDetails(brewery, form).context()
+    return conditional(render_template('brewery/details.html', **ctx), validators)
 
 
 @brewery_bp.route('/<int:brewery_id>/brews', endpoint='brews')
@@ -109,13 +131,15 @@ def brewery_brews(brewery_id):
     brewery = Brewery.query.get_or_404(brewery_id)
     AccessManager(brewery, False).check()
     page_size = 20
-    page = get_page(request)
     utils = BreweryUtils(brewery)
     public_only = False
     if current_user.is_anonymous or (current_user != brewery.brewer):
         public_only = True
     brewery_brews = utils.recent_brews(public_only=public_only, limit=None)
-    pagination = brewery_brews.paginate(page, page_size)
+    pagination = KeysetPagination(
+        brewery_brews, ((Brew.created, True), (Brew.id, True)), get_cursor(request),
+        page_size,
+    )
     ctx = {
         'brewery': brewery,
         'brews': brewery_brews,
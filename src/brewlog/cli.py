@@ -1,11 +1,26 @@
+import dataclasses
+import json
+
+import click
+from flask import current_app
 from flask.cli import FlaskGroup
 from dotenv import load_dotenv, find_dotenv
 
 from . import make_app
+from .brewery.stats import BreweryStats
 from .ext import db
+from .home.utils import HomeSnapshot
+from .models import Brew
+from .models.brewing import (
+    refresh_brew_states, state_expression, update_fermentation_summary,
+)
+from .models.counters import refresh_counters
+from .models.search import KIND_BREW, KIND_BREWERY, rebuild_index
+from .utils import loadtest
+from .utils.seed import SeedOptions, generate
 
 
-def create_app(info):
+def create_app(info=None):
     return make_app('dev')
 
 
@@ -29,6 +44,170 @@ def recreatedb():
     db.create_all()
 
 
+@cli.command(
+    'updatebrewsummary', short_help='Recalculate brew fermentation summary data'
+)
+def update_brew_summary():
+    brew_ids = [brew_id for (brew_id,) in db.session.query(Brew.id)]
+    connection = db.session.connection()
+    for brew_id in brew_ids:
+        update_fermentation_summary(connection, brew_id)
+    db.session.commit()
+
+
+@cli.command('reindex', short_help='Rebuild full text search index')
+def reindex():
+    rebuild_index(db.session)
+    db.session.commit()
+
+
+@cli.command(
+    'refreshstate', short_help='Apply date driven brew state changes (run daily)'
+)
+def refresh_state():
+    connection = db.session.connection()
+    brew_table = Brew.__table__
+    # state is changed with plain SQL, statistics of breweries are
+    # recalculated separately
+    brewery_ids = [
+        brewery_id for (brewery_id,) in connection.execute(
+            db.select([brew_table.c.brewery_id]).distinct()
+            .where(brew_table.c.state != state_expression())
+        )
+    ]
+    count = refresh_brew_states(connection)
+    db.session.commit()
+    BreweryStats.schedule(brewery_ids)
+    click.echo(f'{count} brew(s) changed state')
+
+
+@cli.command('reconcilecounters', short_help='Repair drift of maintained counters')
+def reconcile_counters():
+    count = refresh_counters(db.session.connection())
+    db.session.commit()
+    click.echo(f'{count} counter value(s) repaired')
+
+
+@cli.command('seed', short_help='Generate synthetic dataset for load testing')
+@click.option(
+    '--brews', type=int, default=SeedOptions.brews, show_default=True,
+    help='Number of brews, other counts are derived from it',
+)
+@click.option(
+    '--brews-per-brewery', type=float, default=SeedOptions.brews_per_brewery,
+    show_default=True,
+)
+@click.option(
+    '--breweries-per-user', type=float, default=SeedOptions.breweries_per_user,
+    show_default=True,
+)
+@click.option(
+    '--steps-per-brew', type=float, default=SeedOptions.steps_per_brew,
+    show_default=True, help='Mean length of fermentation step chain',
+)
+@click.option(
+    '--notes-per-brew', type=float, default=SeedOptions.notes_per_brew,
+    show_default=True, help='Mean number of tasting notes of tapped brew',
+)
+@click.option(
+    '--private-users', type=click.FloatRange(0, 1),
+    default=SeedOptions.private_users, show_default=True,
+    help='Fraction of non-public brewer profiles',
+)
+@click.option(
+    '--private-brews', type=click.FloatRange(0, 1),
+    default=SeedOptions.private_brews, show_default=True,
+    help='Fraction of non-public brews',
+)
+@click.option('--password', help='Password set for all generated brewers')
+@click.option(
+    '--batch-size', type=click.IntRange(1), default=SeedOptions.batch_size,
+    show_default=True, help='Number of rows inserted in one batch',
+)
+@click.option('--seed', type=int, default=SeedOptions.seed, show_default=True)
+def seed(**kwargs):
+    counts = generate(
+        db.session.connection(), SeedOptions(**kwargs), progress=click.echo,
+    )
+    db.session.commit()
+    # rows were written without model events so caches are not aware of them
+    current_app.autocomplete.invalidate([(KIND_BREW, None), (KIND_BREWERY, None)])
+    HomeSnapshot.refresh()
+    for table_name, count in counts.items():
+        click.echo(f'{table_name}: {count} row(s)')
+
+
+@cli.command('loadtest', short_help='Replay traffic mix and report latency')
+@click.option(
+    '--url', help='Address of running server, by default requests are made to '
+    'application in-process',
+)
+@click.option('--workers', type=click.IntRange(1), default=4, show_default=True)
+@click.option(
+    '--processes', is_flag=True, help='Run workers in processes instead of threads',
+)
+@click.option(
+    '--duration', type=click.FloatRange(0), default=30, show_default=True,
+    help='Test duration in seconds',
+)
+@click.option(
+    '--mix', multiple=True, metavar='SCENARIO=WEIGHT',
+    help='Change weight of scenario, may be repeated (scenarios: '
+    f'{", ".join(f"{k}={v}" for k, v in loadtest.DEFAULT_MIX.items())})',
+)
+@click.option(
+    '--auth-ratio', type=click.FloatRange(0, 1), default=0.2, show_default=True,
+    help='Fraction of scenarios run by logged in users',
+)
+@click.option(
+    '--password', help='Password of users that log in, as set with seed command',
+)
+@click.option(
+    '--sample-size', type=click.IntRange(1), default=500, show_default=True,
+    help='Number of objects of each kind requested',
+)
+@click.option('--seed', type=int, default=42, show_default=True)
+@click.option(
+    '--output', type=click.Path(dir_okay=False), help='Write results as JSON',
+)
+def load_test(
+            url, workers, processes, duration, mix, auth_ratio, password,
+            sample_size, seed, output,
+        ):
+    try:
+        mix = loadtest.parse_mix(mix)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--mix')
+    if password is None and auth_ratio > 0:
+        click.echo('no password given, skipping authenticated traffic')
+        auth_ratio = 0
+    plan = loadtest.build_plan(sample_size, seed)
+    settings = loadtest.Settings(
+        duration=duration, mix=mix, auth_ratio=auth_ratio, password=password,
+        base_url=url, seed=seed,
+    )
+    click.echo(
+        f'running {workers} worker(s) in {"processes" if processes else "threads"} '
+        f'for {duration}s against {url or "application in-process"}'
+    )
+    samples, wall_time = loadtest.run(
+        plan, settings, workers, processes, app=current_app._get_current_object(),
+        app_factory=create_app,
+    )
+    summary = loadtest.summarize(samples, wall_time)
+    for line in loadtest.format_report(summary):
+        click.echo(line)
+    if output:
+        settings = dataclasses.asdict(settings)
+        settings.pop('password')
+        with open(output, 'w') as fp:
+            json.dump({
+                'settings': dict(settings, workers=workers, processes=processes),
+                'wall_time': round(wall_time, 3),
+                'results': summary,
+            }, fp, indent=2)
+
+
 def main():
     load_dotenv(find_dotenv())
     cli()
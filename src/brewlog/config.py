@@ -17,7 +17,7 @@ EMAIL_CONFIRM_MAX_AGE = PASSWORD_RESET_MAX_AGE = 60 * 60 * 24 * 2
 
 # flatpages
 FLATPAGES_EXTENSION = '.html.md'
-FLATPAGES_MARKDOWN_EXTENSIONS = []
+FLATPAGES_HTML_RENDERER = 'brewlog.utils.rendering.render_markdown'
 
 # babel
 BABEL_DEFAULT_LOCALE = os.getenv('BABEL_DEFAULT_LOCALE') or 'pl'
@@ -26,3 +26,55 @@ BABEL_DEFAULT_TIMEZONE = os.getenv('BABEL_DEFAULT_TIMEZONE') or 'Europe/Warsaw'
 # display limits
 SHORTLIST_DEFAULT_LIMIT = 5
 LIST_DEFAULT_LIMIT = 10
+SEARCH_SUGGEST_LIMIT = 10
+SEARCH_MAX_PAGE = 50
+# tasting notes displayed on brew page and loaded in one request afterwards
+TASTING_NOTES_PAGE_SIZE = 10
+# max number of note texts requested by inline editor at once
+NOTE_TEXT_BATCH_LIMIT = 50
+
+# anonymous home page snapshot freshness, in seconds
+HOME_SNAPSHOT_TTL = 60
+# time that request waits for missing snapshot being built by another one
+# before serving home page without lists, in seconds
+HOME_SNAPSHOT_WAIT = 2
+
+# autocomplete
+AUTOCOMPLETE_OVERLAY_CACHE_SIZE = 256
+
+# authenticated user cache, lifetimes in seconds
+PRINCIPAL_CACHE_TTL = 600
+PRINCIPAL_LOCAL_CACHE_TTL = 5
+PRINCIPAL_LOCAL_CACHE_SIZE = 1024
+
+# previous and next brew navigation cache lifetime, in seconds
+BREW_NAVIGATION_CACHE_TTL = 60 * 60
+
+# brewery statistics are recalculated this many seconds after first change,
+# 0 enqueues job immediately; delayed jobs are run only by worker started
+# with scheduler (rq worker --with-scheduler)
+BREWERY_STATS_DELAY = 0
+
+# markdown rendering, engine is one of brewlog.utils.rendering.ENGINES; texts
+# longer than threshold (in characters) are rendered in background, 0
+# disables background rendering
+MARKDOWN_ENGINE = os.getenv('MARKDOWN_ENGINE') or 'markdown'
+MARKDOWN_CACHE_TTL = 60 * 60 * 24 * 7
+MARKDOWN_LOCAL_CACHE_SIZE = 512
+MARKDOWN_ASYNC_THRESHOLD = 0
+
+# request instrumentation, requests that issue more statements or take longer
+# (in seconds) than thresholds are logged, 0 disables threshold; Server-Timing
+# header exposes statement count and timings to any client so it is sent only
+# in debug mode unless enabled here
+SERVER_TIMING_HEADER = False
+SLOW_REQUEST_QUERY_COUNT = 25
+SLOW_REQUEST_TIME = 1.0
+
+# prometheus metrics at /metrics (needs prometheus-client), scrapes are
+# allowed from listed addresses (empty list allows any) and have to present
+# bearer token if one is set; processes of multi-process server have to share
+# directory pointed by PROMETHEUS_MULTIPROC_DIR environment variable
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_ALLOWED_ADDRS = ['127.0.0.1', '::1']
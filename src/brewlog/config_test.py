@@ -4,3 +4,4 @@ CSRF_ENABLED = False
 WTF_CSRF_ENABLED = CSRF_ENABLED
 LOGIN_DISABLED = False
 SQLALCHEMY_DATABASE_URI = 'sqlite://'
+BREWERY_STATS_DELAY = 0
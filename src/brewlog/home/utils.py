@@ -0,0 +1,339 @@
+import datetime
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from ..brew.utils import BrewUtils
+from ..brewery.utils import BreweryUtils
+from ..ext import db
+from ..models import Brew, BrewerProfile, Brewery, TastingNote
+from ..models.brewing import BrewState
+from ..tasting.utils import TastingUtils
+from ..utils.metrics import cache_lookup
+from ..utils.text import get_announcement
+
+SECTIONS = (
+    'latest_recipes', 'recent_reviews', 'recently_brewed', 'fermenting',
+    'maturing', 'on_tap',
+)
+
+
+@dataclass
+class DashboardItem:
+    """Compact dashboard row, always refers to a brew."""
+
+    id: int  # noqa: A003
+    code: Optional[str]
+    name: str
+    date: Optional[datetime.date]
+
+    @property
+    def full_name(self) -> str:
+        if self.code:
+            return f'#{self.code} {self.name}'
+        return self.name
+
+
+def _supports_window_functions(dialect) -> bool:
+    if dialect.name == 'postgresql':
+        return True
+    if dialect.name == 'sqlite':
+        return dialect.dbapi.sqlite_version_info >= (3, 25)
+    return False
+
+
+class DashboardUtils:
+
+    @staticmethod
+    def _branches(user_id: int):
+        brew_table = Brew.__table__
+        brewery_table = Brewery.__table__
+        note_table = TastingNote.__table__
+        own_brews = brew_table.join(
+            brewery_table, brew_table.c.brewery_id == brewery_table.c.id
+        )
+        owner = brewery_table.c.brewer_id == user_id
+
+        def brews(section, date_col, ordering, *criteria):
+            date_expr = db.cast(db.null(), db.Date) if date_col is None else date_col
+            return section, db.select([
+                brew_table.c.id, brew_table.c.code, brew_table.c.name,
+                date_expr.label('date'),
+            ]).select_from(own_brews).where(db.and_(owner, *criteria)), (
+                ordering, brew_table.c.id
+            )
+
+        def in_state(section, state, date_col):
+            return brews(
+                section, date_col, brew_table.c.date_brewed,
+                brew_table.c.state == state[0],
+            )
+
+        notes = db.select([
+            brew_table.c.id, brew_table.c.code, brew_table.c.name,
+            note_table.c.date.label('date'),
+        ]).select_from(
+            note_table.join(brew_table, note_table.c.brew_id == brew_table.c.id)
+        ).where(note_table.c.author_id == user_id)
+        return [
+            brews('latest_recipes', None, brew_table.c.created),
+            ('recent_reviews', notes, (note_table.c.date, note_table.c.id)),
+            brews(
+                'recently_brewed', brew_table.c.date_brewed,
+                brew_table.c.date_brewed, brew_table.c.date_brewed.isnot(None),
+            ),
+            in_state(
+                'fermenting', BrewState.STATE_FERMENTING,
+                brew_table.c.fermentation_start_date,
+            ),
+            in_state('maturing', BrewState.STATE_MATURING, brew_table.c.bottling_date),
+            in_state('on_tap', BrewState.STATE_TAPPED, brew_table.c.tapped),
+        ]
+
+    @staticmethod
+    def shortlists(user_id: int, limit: int = 5) -> Dict[str, List[DashboardItem]]:
+        """Fetch all dashboard shortlists of user in single query. Branches
+        are combined with UNION ALL and limited with ROW_NUMBER window where
+        backend supports it, otherwise each branch is limited subquery and
+        final order is set on outer query.
+
+        :param user_id: dashboard owner id
+        :type user_id: int
+        :param limit: max number of items in each list, defaults to 5
+        :type limit: int
+        :return: mapping of list name to items
+        :rtype: Dict[str, List[DashboardItem]]
+        """
+        dialect = db.session.get_bind().dialect
+        use_window = _supports_window_functions(dialect)
+        parts = []
+        for num, (section, stmt, (sort_key, sort_id)) in enumerate(
+                    DashboardUtils._branches(user_id)
+                ):
+            section_col = db.literal(SECTIONS.index(section)).label('section')
+            ordering = (db.desc(sort_key), db.desc(sort_id))
+            if use_window:
+                stmt = stmt.column(section_col).column(
+                    db.func.row_number().over(order_by=ordering).label('pos')
+                )
+            else:
+                # order of subquery rows is not kept by union, ordering columns
+                # are selected for outer query; sort keys of branches differ
+                # in type (date or timestamp) so they are compared as text
+                stmt = db.select([
+                    stmt.column(section_col)
+                    .column(db.cast(sort_key, db.String).label('sort_key'))
+                    .column(sort_id.label('sort_id'))
+                    .order_by(*ordering).limit(limit)
+                    .alias(f'dashboard_{num}')
+                ])
+            parts.append(stmt)
+        union = db.union_all(*parts)
+        if use_window:
+            union = union.alias('dashboard')
+            query = db.select([union]).where(union.c.pos <= limit).order_by(
+                union.c.section, union.c.pos
+            )
+        else:
+            union = union.alias('dashboard')
+            query = db.select([union]).order_by(
+                union.c.section, db.desc(union.c.sort_key), db.desc(union.c.sort_id)
+            )
+        lists = {section: [] for section in SECTIONS}
+        for row in db.session.execute(query):
+            lists[SECTIONS[row.section]].append(
+                DashboardItem(row.id, row.code, row.name, row.date)
+            )
+        return lists
+
+
+def _profile_name(profile) -> Optional[str]:
+    return profile.nick or profile.full_name or None
+
+
+@dataclass
+class HomeBrew:
+    id: int  # noqa: A003
+    full_name: str
+    brewery_name: str
+    brewer_name: Optional[str]
+
+
+@dataclass
+class HomeNote:
+    brew_id: int
+    brew_full_name: str
+    author_name: Optional[str]
+    date: datetime.date
+
+    def __post_init__(self):
+        if isinstance(self.date, str):
+            self.date = datetime.date.fromisoformat(self.date)
+
+
+@dataclass
+class HomeBrewer:
+    id: int  # noqa: A003
+    name: Optional[str]
+    created: datetime.datetime
+
+    def __post_init__(self):
+        if isinstance(self.created, str):
+            self.created = datetime.datetime.fromisoformat(self.created)
+
+
+@dataclass
+class HomeBrewery:
+    id: int  # noqa: A003
+    name: str
+    brewer_name: Optional[str]
+
+
+_SNAPSHOT_ITEMS = {
+    'latest_brews': HomeBrew,
+    'latest_tasting_notes': HomeNote,
+    'latest_brewers': HomeBrewer,
+    'latest_breweries': HomeBrewery,
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class HomeSnapshot:
+    """Public home page context kept as JSON document in Redis. Snapshot is
+    served as long as it exists, when it is older than configured freshness
+    TTL a background job is enqueued to rebuild it (stale-while-revalidate).
+    """
+
+    KEY = 'home:snapshot'
+    LOCK_KEY = 'home:snapshot:refresh'
+    VERSION = 1
+
+    @staticmethod
+    def build(limit: int) -> dict:
+        brews = BrewUtils.latest(Brew.created, limit=limit, public_only=True)
+        notes = TastingUtils.latest_notes(
+            TastingNote.date, limit=limit, public_only=True
+        )
+        brewers = BrewerProfile.last_created(limit=limit, public_only=True)
+        breweries = BreweryUtils.latest_breweries(
+            Brewery.created, limit=limit, public_only=True
+        )
+        return {
+            'latest_brews': [
+                HomeBrew(
+                    b.id, b.full_name, b.brewery.name, _profile_name(b.brewery.brewer)
+                ) for b in brews
+            ],
+            'latest_tasting_notes': [
+                HomeNote(n.brew.id, n.brew.full_name, _profile_name(n.author), n.date)
+                for n in notes
+            ],
+            'latest_brewers': [
+                HomeBrewer(p.id, _profile_name(p), p.created) for p in brewers
+            ],
+            'latest_breweries': [
+                HomeBrewery(b.id, b.name, _profile_name(b.brewer)) for b in breweries
+            ],
+            'announcement': get_announcement(
+                current_app.config.get('ANNOUNCEMENT_FILE')
+            ),
+        }
+
+    @staticmethod
+    def placeholder() -> dict:
+        """Home page context without any lists, served when snapshot is being
+        built by another request.
+
+        :return: home page context
+        :rtype: dict
+        """
+        context = {name: [] for name in _SNAPSHOT_ITEMS}
+        context['announcement'] = get_announcement(
+            current_app.config.get('ANNOUNCEMENT_FILE')
+        )
+        return context
+
+    @classmethod
+    def _lock_timeout(cls) -> int:
+        return max(int(current_app.config['HOME_SNAPSHOT_TTL']), 1) * 2
+
+    @classmethod
+    def refresh(cls) -> dict:
+        """Rebuild snapshot and store it in Redis, releasing refresh lock.
+
+        :return: home page context
+        :rtype: dict
+        """
+        redis = current_app.redis
+        try:
+            context = cls.build(current_app.config.get('SHORTLIST_DEFAULT_LIMIT', 5))
+            document = {
+                'v': cls.VERSION,
+                'built': time.time(),
+                'context': {
+                    name: [asdict(item) for item in value]
+                    if name in _SNAPSHOT_ITEMS else value
+                    for name, value in context.items()
+                },
+            }
+            redis.set(cls.KEY, json.dumps(document, default=_json_default))
+        finally:
+            redis.delete(cls.LOCK_KEY)
+        return context
+
+    @classmethod
+    def _load(cls) -> Tuple[Optional[dict], float]:
+        raw = current_app.redis.get(cls.KEY)
+        if raw is None:
+            return None, 0
+        try:
+            document = json.loads(raw)
+            if document['v'] != cls.VERSION:
+                return None, 0
+            context = document['context']
+            for name, item_cls in _SNAPSHOT_ITEMS.items():
+                context[name] = [item_cls(**data) for data in context[name]]
+            return context, document['built']
+        except (KeyError, TypeError, ValueError):
+            return None, 0
+
+    @classmethod
+    def _wait(cls) -> Optional[dict]:
+        deadline = time.monotonic() + current_app.config['HOME_SNAPSHOT_WAIT']
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            context, _ = cls._load()
+            if context is not None:
+                return context
+        return None
+
+    @classmethod
+    def get(cls) -> dict:
+        """Get home page context. Missing snapshot is built synchronously by
+        request that acquires refresh lock, other requests wait for it for
+        configured time and get placeholder context if it is not ready
+        by then. Stale snapshot is returned and refresh job is enqueued
+        unless another one is already pending.
+
+        :return: home page context
+        :rtype: dict
+        """
+        context, built = cls._load()
+        cache_lookup('home_snapshot', context is not None)
+        redis = current_app.redis
+        if context is None:
+            if redis.set(cls.LOCK_KEY, 1, nx=True, ex=cls._lock_timeout()):
+                return cls.refresh()
+            return cls._wait() or cls.placeholder()
+        if time.time() - built > current_app.config['HOME_SNAPSHOT_TTL']:
+            if redis.set(cls.LOCK_KEY, 1, nx=True, ex=cls._lock_timeout()):
+                current_app.queue.enqueue('brewlog.tasks.refresh_home_snapshot')
+        return context
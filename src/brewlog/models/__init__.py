@@ -3,3 +3,5 @@ from .brewing import Brew  # noqa: F401
 from .fermentation import FermentationStep  # noqa: F401
 from .tasting import TastingNote  # noqa: F401
 from .users import BrewerProfile  # noqa: F401
+from .search import SearchDocument  # noqa: F401
+from . import activity, counters, visibility  # noqa: F401
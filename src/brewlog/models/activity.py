@@ -0,0 +1,151 @@
+import datetime
+from collections import defaultdict
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..ext import db
+from .brewery import Brewery
+from .brewing import Brew
+from .counters import COUNTERS
+from .fermentation import FermentationStep
+from .tasting import TastingNote
+from .users import BrewerProfile
+
+# child class -> (foreign key, parent class) of object which page displays
+# child
+PARENTS = {
+    TastingNote: ('brew_id', Brew),
+    FermentationStep: ('brew_id', Brew),
+    Brew: ('brewery_id', Brewery),
+    Brewery: ('brewer_id', BrewerProfile),
+}
+
+# parents are touched in this order, each one after its children
+_LEVELS = (Brew, Brewery, BrewerProfile)
+
+# counter updates change modification time of these parents themselves
+_COUNTED = {
+    (counter.child, counter.foreign_key) for counter in COUNTERS if counter.touch
+}
+
+# profile attributes displayed with tasting notes on brew page
+AUTHOR_ATTRS = ('nick', 'full_name')
+
+
+def _key_values(obj, attr_name: str) -> set:
+    history = db.inspect(obj).attrs[attr_name].history
+    values = {*(history.deleted or ()), getattr(obj, attr_name)}
+    values.discard(None)
+    return values
+
+
+def _parent_ids(session, model, ids: set) -> set:
+    # parents of objects loaded in session are known without query
+    attr_name, _ = PARENTS[model]
+    found = set()
+    missing = set()
+    for obj_id in ids:
+        key = db.inspect(model).identity_key_from_primary_key([obj_id])
+        obj = session.identity_map.get(key)
+        if obj is not None and attr_name in obj.__dict__:
+            found.add(obj.__dict__[attr_name])
+        else:
+            missing.add(obj_id)
+    if missing:
+        table = model.__table__
+        rows = session.connection().execute(
+            db.select([table.c[attr_name]]).where(table.c.id.in_(missing))
+        )
+        found.update(row[0] for row in rows)
+    found.discard(None)
+    return found
+
+
+def _touch(session, model, ids: set, now: datetime.datetime):
+    table = model.__table__
+    session.connection().execute(
+        table.update().where(table.c.id.in_(ids)).values(updated=now)
+    )
+    mapper = db.inspect(model)
+    for obj_id in ids:
+        obj = session.identity_map.get(mapper.identity_key_from_primary_key([obj_id]))
+        if obj is not None:
+            set_committed_value(obj, 'updated', now)
+
+
+def touch_parents(session, objs, now=None):
+    """Set modification time of parents of flushed objects, walking up the
+    chain (note or fermentation step -> brew -> brewery -> brewer profile)
+    so that ``updated`` of each object reflects changes in everything that
+    is displayed on its page. Each parent table is updated with single
+    statement; parents which counters have been changed in the same flush
+    already have modification time set so they are only walked through.
+    Brews with tasting notes of profile which displayed name has changed
+    are touched too.
+
+    :param session: session that objects belong to
+    :type session: Session
+    :param objs: flushed objects
+    :type objs: Iterable
+    :param now: modification time, defaults to current UTC time
+    :type now: Optional[datetime.datetime]
+    """
+    now = now or datetime.datetime.utcnow()
+    touched = defaultdict(set)
+    walked = defaultdict(set)
+    authors = set()
+    for obj in objs:
+        model = type(obj)
+        if model is BrewerProfile and obj not in session.new and any(
+                    db.inspect(obj).attrs[name].history.has_changes()
+                    for name in AUTHOR_ATTRS
+                ):
+            authors.add(obj.id)
+        if model not in PARENTS:
+            continue
+        attr_name, parent = PARENTS[model]
+        ids = _key_values(obj, attr_name)
+        walked[parent].update(ids)
+        moved = db.inspect(obj).attrs[attr_name].history.has_changes()
+        counted = (model, attr_name) in _COUNTED and (
+            obj in session.new or obj in session.deleted or moved
+        )
+        if not counted:
+            touched[parent].update(ids)
+    if authors:
+        note_table = TastingNote.__table__
+        rows = session.connection().execute(
+            db.select([note_table.c.brew_id]).distinct()
+            .where(note_table.c.author_id.in_(authors))
+        )
+        touched[Brew].update(row.brew_id for row in rows)
+    for model in _LEVELS:
+        if touched[model]:
+            _touch(session, model, touched[model], now)
+        ids = walked[model] | touched[model]
+        if ids and model in PARENTS:
+            _, parent = PARENTS[model]
+            parent_ids = _parent_ids(session, model, ids)
+            walked[parent].update(parent_ids)
+            touched[parent].update(parent_ids)
+
+
+# events: session (parent modification time)
+def session_pre_flush(session, flush_context, instances):
+    # foreign keys of deleted objects have to be known after their rows
+    # are gone
+    for obj in session.deleted:
+        if type(obj) in PARENTS:
+            getattr(obj, PARENTS[type(obj)][0])
+
+
+def session_post_flush(session, flush_context):
+    changed = [
+        obj for obj in session.dirty
+        if session.is_modified(obj, include_collections=False)
+    ]
+    touch_parents(session, [*session.new, *changed, *session.deleted])
+
+
+db.event.listen(db.session, 'before_flush', session_pre_flush)
+db.event.listen(db.session, 'after_flush', session_post_flush)
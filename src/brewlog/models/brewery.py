@@ -1,8 +1,7 @@
 import datetime
 
-import markdown
-
 from ..ext import db
+from ..utils.rendering import render_field
 
 
 class Brewery(db.Model):
@@ -15,24 +14,38 @@ class Brewery(db.Model):
     est_year = db.Column(db.Integer)
     est_month = db.Column(db.Integer)
     est_day = db.Column(db.Integer)
-    stats = db.Column(db.Text)
+    # aggregated brew data, maintained by background job
+    stats = db.Column(db.JSON)
     created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow, index=True)
-    brewer_id = db.Column(
-        db.Integer, db.ForeignKey('brewer_profile.id'), nullable=False
+    # previous value kept in history for counter maintenance
+    brewer_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('brewer_profile.id'), nullable=False),
+        active_history=True,
     )
     brewer = db.relationship(
         'BrewerProfile',
         backref=db.backref('breweries', lazy='dynamic', cascade='all,delete-orphan'),
     )
+    # batch-loadable alternative to dynamic backref
+    brew_list = db.relationship(
+        'Brew', viewonly=True, order_by='desc(Brew.created)',
+    )
+    # maintained from counter events
+    brew_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0',
+    )
+
+    __table_args__ = (
+        db.Index('brewery_brewer_name', 'brewer_id', 'name'),
+        db.Index('brewery_name', 'name', 'id'),
+        db.Index('brewery_created', 'created'),
+    )
 
 
 # events: Brewery model
 def brewery_pre_save(mapper, connection, target):
-    if target.description:
-        target.description_html = markdown.markdown(target.description)
-    else:
-        target.description_html = None
+    render_field(target, 'description', 'description_html')
     if target.updated is None:
         target.updated = target.created
     if target.established_date:
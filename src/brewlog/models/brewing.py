@@ -1,14 +1,14 @@
 import datetime
-import json
 from dataclasses import dataclass
 from typing import ClassVar, Optional, Tuple
 
-import markdown
 from flask_babel import lazy_gettext as _
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.utils import cached_property
 
 from ..ext import db
 from ..utils.brewing import abv, apparent_attenuation, real_attenuation
+from ..utils.rendering import render_field
 from ..utils.text import stars2deg
 from . import choices
 from .brewery import Brewery
@@ -28,6 +28,54 @@ class BrewState:
     STATE_MATURING: ClassVar[Tuple[str, str]] = ('maturing', _('maturing'))
 
 
+# state name -> (state, date attribute the state is in effect since)
+STATES = {
+    state[0]: (state, date_attr) for state, date_attr in (
+        (BrewState.STATE_PLANNED, None),
+        (BrewState.STATE_FERMENTING, 'date_brewed'),
+        (BrewState.STATE_MATURING, 'bottling_date'),
+        (BrewState.STATE_TAPPED, 'tapped'),
+        (BrewState.STATE_FINISHED, 'finished'),
+    )
+}
+
+
+def _as_date(value):
+    # datetime values (assigned by code, not forms) are truncated to date
+    if value is not None and hasattr(value, 'date'):
+        return value.date()
+    return value
+
+
+def compute_state(
+            date_brewed: Optional[datetime.date],
+            bottling_date: Optional[datetime.date], tapped: Optional[datetime.date],
+            finished: Optional[datetime.date], today: Optional[datetime.date] = None,
+        ) -> str:
+    """Calculate brew lifecycle state name from its dates. Dates in future
+    do not count so state changes with passing of time.
+
+    :param today: reference date, defaults to current date
+    :type today: Optional[datetime.date]
+    :return: state name
+    :rtype: str
+    """
+    if today is None:
+        today = datetime.date.today()
+    tapped, bottling_date, date_brewed = map(
+        _as_date, (tapped, bottling_date, date_brewed)
+    )
+    if finished:
+        return BrewState.STATE_FINISHED[0]
+    if tapped and tapped <= today:
+        return BrewState.STATE_TAPPED[0]
+    if bottling_date and bottling_date <= today:
+        return BrewState.STATE_MATURING[0]
+    if date_brewed and date_brewed <= today:
+        return BrewState.STATE_FERMENTING[0]
+    return BrewState.STATE_PLANNED[0]
+
+
 class Brew(db.Model):
     STATE_PLANNED = _('planned')
     STATE_FERMENTING = _('fermenting')
@@ -66,13 +114,52 @@ class Brew(db.Model):
     carbonation_used = db.Column(db.Text)
     is_public = db.Column(db.Boolean, default=True)
     is_draft = db.Column(db.Boolean, default=False)
-    brewery_id = db.Column(db.Integer, db.ForeignKey('brewery.id'), nullable=False)
+    # previous value kept in history for counter maintenance
+    brewery_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('brewery.id'), nullable=False),
+        active_history=True,
+    )
     brewery = db.relationship(
         'Brewery',
         backref=db.backref('brews', lazy='dynamic', cascade='all,delete-orphan')
     )
     tapped = db.Column(db.Date)
     finished = db.Column(db.Date)
+    # batch-loadable alternatives to dynamic backrefs
+    fermentation_step_list = db.relationship(
+        'FermentationStep', viewonly=True, order_by='FermentationStep.date',
+    )
+    tasting_note_list = db.relationship(
+        'TastingNote', viewonly=True, order_by='desc(TastingNote.date)',
+    )
+    # maintained from counter events
+    tasting_note_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0',
+    )
+    # fermentation summary, maintained from fermentation step events
+    og = db.Column(db.Float(precision=1), index=True)
+    fg = db.Column(db.Float(precision=1))
+    abv = db.Column(db.Float(precision=1), index=True)
+    brew_length = db.Column(db.Float(precision=2))
+    fermentation_start_date = db.Column(db.Date)
+    # lifecycle state, maintained on save and by periodic refresh
+    state = db.Column(
+        db.String(20), nullable=False, default=BrewState.STATE_PLANNED[0],
+        server_default=BrewState.STATE_PLANNED[0],
+    )
+    # brew and brewer are both public, maintained from visibility events
+    effectively_public = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.false(),
+    )
+
+    __table_args__ = (
+        db.Index(
+            'brew_state_public_brewed', 'state', 'effectively_public', 'date_brewed',
+        ),
+        db.Index('brew_public_created', 'effectively_public', 'created', 'id'),
+        db.Index('brew_brewery_created', 'brewery_id', 'created'),
+        db.Index('brew_brewery_id', 'brewery_id', 'id'),
+    )
 
     @cached_property
     def first_step(self):
@@ -82,26 +169,6 @@ class Brew(db.Model):
     def last_step(self):
         return FermentationStep.last_for_brew(self.id)
 
-    @property
-    def og(self):
-        if self.first_step:
-            return self.first_step.og
-
-    @property
-    def fg(self):
-        if self.last_step:
-            return self.last_step.fg
-
-    @property
-    def fermentation_start_date(self):
-        if self.first_step:
-            return self.first_step.date
-
-    @property
-    def brew_length(self):
-        if self.first_step:
-            return self.first_step.volume
-
     @property
     def carbonation_data_display(self):
         if self.carbonation_type:
@@ -129,12 +196,6 @@ class Brew(db.Model):
             }
         return {'real': 0, 'apparent': 0}
 
-    def notes_to_json(self):
-        notes = {}
-        for note in self.tasting_notes:
-            notes[f'note_text_{note.id}'] = note.text
-        return json.dumps(notes)
-
     @classmethod
     def get_latest_for(cls, user, public_only=False, limit=None):
         if public_only and not user.is_public:
@@ -155,49 +216,115 @@ class Brew(db.Model):
         parts.append(self.name)
         return ' '.join(parts)
 
-    @property
-    def abv(self):
-        if self.fg and self.og:
-            from_carbonation = 0
-            if self.carbonation_type and self.carbonation_type.endswith('priming'):
-                from_carbonation = choices.CARB_LEVEL_DATA[
-                    self.carbonation_level or 'normal'
-                ]
-            return abv(self.og, self.fg, from_carbonation)
-
     @property
     def current_state(self):
-        state = None
-        if not self.date_brewed:
-            state = BrewState(*BrewState.STATE_PLANNED)
-        if not self.bottling_date:
-            state = BrewState(*BrewState.STATE_FERMENTING, since=self.date_brewed)
-        if self.finished:
-            state = BrewState(*BrewState.STATE_FINISHED, since=self.finished)
-        else:
-            if self.tapped:
-                state = BrewState(*BrewState.STATE_TAPPED, since=self.tapped)
-            else:
-                state = BrewState(*BrewState.STATE_MATURING, since=self.bottling_date)
-        return state
-
-    def get_next(self, public_only=True):
-        query = Brew.query
-        if public_only:
-            query = query.filter(Brew.is_public.is_(True))
-        return query.order_by(Brew.id).filter(
-            Brew.id > self.id,
-            Brew.brewery == self.brewery
-        ).first()
+        name = self.state or compute_state(
+            self.date_brewed, self.bottling_date, self.tapped, self.finished
+        )
+        state, date_attr = STATES[name]
+        since = None
+        if date_attr is not None:
+            since = getattr(self, date_attr)
+        return BrewState(*state, since=since)
 
-    def get_previous(self, public_only=True):
-        query = Brew.query
-        if public_only:
-            query = query.filter(Brew.is_public.is_(True))
-        return query.order_by(db.desc(Brew.id)).filter(
-            Brew.id < self.id,
-            Brew.brewery == self.brewery
-        ).first()
+
+def calculate_abv(og, fg, carbonation_type, carbonation_level):
+    if fg and og:
+        from_carbonation = 0
+        if carbonation_type and carbonation_type.endswith('priming'):
+            from_carbonation = choices.CARB_LEVEL_DATA[carbonation_level or 'normal']
+        return abv(og, fg, from_carbonation)
+
+
+def state_expression(today: Optional[datetime.date] = None):
+    """SQL expression calculating brew state, counterpart of
+    :func:`compute_state`.
+
+    :param today: reference date, defaults to current date
+    :type today: Optional[datetime.date]
+    """
+    if today is None:
+        today = datetime.date.today()
+    brew_table = Brew.__table__
+    return db.case([
+        (brew_table.c.finished.isnot(None), BrewState.STATE_FINISHED[0]),
+        (brew_table.c.tapped <= today, BrewState.STATE_TAPPED[0]),
+        (brew_table.c.bottling_date <= today, BrewState.STATE_MATURING[0]),
+        (brew_table.c.date_brewed <= today, BrewState.STATE_FERMENTING[0]),
+    ], else_=BrewState.STATE_PLANNED[0])
+
+
+def refresh_brew_states(connection, today: Optional[datetime.date] = None) -> int:
+    """Apply date driven state transitions to all brews which state is out of
+    date, in single UPDATE statement.
+
+    :param connection: database connection
+    :type connection: Connection
+    :param today: reference date, defaults to current date
+    :type today: Optional[datetime.date]
+    :return: number of brews that changed state
+    :rtype: int
+    """
+    brew_table = Brew.__table__
+    expr = state_expression(today)
+    return connection.execute(
+        brew_table.update().where(brew_table.c.state != expr).values(state=expr)
+    ).rowcount
+
+
+def update_fermentation_summary(connection, brew_id, session=None):
+    """Recalculate fermentation summary columns of brew from its fermentation
+    steps. Values are written with Core statements so this can run inside
+    flush, brew object (if present in session) gets refreshed without being
+    marked dirty.
+
+    :param connection: database connection
+    :type connection: Connection
+    :param brew_id: brew identifier
+    :type brew_id: int
+    :param session: session to look up brew object in, defaults to db.session
+    :type session: Optional[Session]
+    """
+    step_table = FermentationStep.__table__
+    brew_table = Brew.__table__
+    step_q = db.select([
+        step_table.c.og, step_table.c.fg, step_table.c.volume, step_table.c.date,
+    ]).where(step_table.c.brew_id == brew_id)
+    first_step = connection.execute(
+        step_q.order_by(step_table.c.date, step_table.c.id).limit(1)
+    ).first()
+    last_step = connection.execute(
+        step_q.order_by(db.desc(step_table.c.date), db.desc(step_table.c.id)).limit(1)
+    ).first()
+    carbonation = connection.execute(
+        db.select([brew_table.c.carbonation_type, brew_table.c.carbonation_level])
+        .where(brew_table.c.id == brew_id)
+    ).first()
+    if carbonation is None:
+        return
+    values = {
+        'og': None, 'fg': None, 'brew_length': None, 'fermentation_start_date': None,
+    }
+    if first_step is not None:
+        values.update({
+            'og': first_step.og,
+            'brew_length': first_step.volume,
+            'fermentation_start_date': first_step.date,
+        })
+    if last_step is not None:
+        values['fg'] = last_step.fg
+    values['abv'] = calculate_abv(
+        values['og'], values['fg'], *carbonation,
+    )
+    connection.execute(
+        brew_table.update().where(brew_table.c.id == brew_id).values(**values)
+    )
+    session = session or db.session
+    key = db.inspect(Brew).identity_key_from_primary_key([brew_id])
+    brew = session.identity_map.get(key)
+    if brew is not None:
+        for name, value in values.items():
+            set_committed_value(brew, name, value)
 
 
 # events: Brew model
@@ -209,10 +336,31 @@ def brew_pre_save(mapper, connection, target):
     target.bjcp_style = bjcp_style or None
     if target.notes:
         target.notes = stars2deg(target.notes)
-        target.notes_html = markdown.markdown(target.notes)
+    render_field(target, 'notes', 'notes_html')
     if target.updated is None:
         target.updated = target.created
+    target.abv = calculate_abv(
+        target.og, target.fg, target.carbonation_type, target.carbonation_level,
+    )
+    target.state = compute_state(
+        target.date_brewed, target.bottling_date, target.tapped, target.finished
+    )
 
 
 db.event.listen(Brew, 'before_insert', brew_pre_save)
 db.event.listen(Brew, 'before_update', brew_pre_save)
+
+
+# events: FermentationStep model (brew summary)
+def fermentation_step_post_save(mapper, connection, target):
+    session = db.object_session(target)
+    update_fermentation_summary(connection, target.brew_id, session)
+    history = db.inspect(target).attrs.brew_id.history
+    for brew_id in history.deleted or ():
+        if brew_id is not None and brew_id != target.brew_id:
+            update_fermentation_summary(connection, brew_id, session)
+
+
+db.event.listen(FermentationStep, 'after_insert', fermentation_step_post_save)
+db.event.listen(FermentationStep, 'after_update', fermentation_step_post_save)
+db.event.listen(FermentationStep, 'after_delete', fermentation_step_post_save)
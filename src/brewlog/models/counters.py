@@ -0,0 +1,122 @@
+import datetime
+from typing import Iterable, NamedTuple
+
+from ..ext import db
+from .brewery import Brewery
+from .brewing import Brew
+from .tasting import TastingNote
+from .users import BrewerProfile
+
+_STALE_KEY = 'counters_stale'
+
+
+class Counter(NamedTuple):
+    child: type
+    foreign_key: str
+    parent: type
+    column: str
+    # parent page displays children so their change is its modification
+    touch: bool = False
+
+
+COUNTERS = (
+    Counter(Brew, 'brewery_id', Brewery, 'brew_count', True),
+    Counter(Brewery, 'brewer_id', BrewerProfile, 'brewery_count', True),
+    Counter(TastingNote, 'brew_id', Brew, 'tasting_note_count', True),
+    Counter(TastingNote, 'author_id', BrewerProfile, 'tasting_note_count'),
+)
+
+
+def _counters_of(child: type) -> Iterable[Counter]:
+    return [counter for counter in COUNTERS if counter.child is child]
+
+
+def _values(parent, column, value, touch: bool = False) -> dict:
+    # unless parent displays children counter change is not its modification
+    # so timestamp is kept
+    updated = datetime.datetime.utcnow() if touch else parent.c.updated
+    return {column: value, parent.c.updated: updated}
+
+
+def refresh_counters(connection) -> int:
+    """Recalculate counter columns that differ from actual number of rows.
+
+    :param connection: database connection
+    :type connection: Connection
+    :return: number of repaired counter values
+    :rtype: int
+    """
+    repaired = 0
+    for counter in COUNTERS:
+        child = counter.child.__table__
+        parent = counter.parent.__table__
+        actual = db.select([db.func.count()]).select_from(child).where(
+            child.c[counter.foreign_key] == parent.c.id
+        ).as_scalar()
+        column = parent.c[counter.column]
+        result = connection.execute(
+            parent.update().where(column != actual)
+            .values(_values(parent, column, actual))
+        )
+        repaired += result.rowcount
+    return repaired
+
+
+def _change(connection, target, counter: Counter, parent_id, delta: int):
+    if parent_id is None:
+        return
+    parent = counter.parent.__table__
+    column = parent.c[counter.column]
+    connection.execute(
+        parent.update().where(parent.c.id == parent_id)
+        .values(_values(parent, column, column + delta, counter.touch))
+    )
+    session = db.inspect(target).session
+    if session is not None:
+        stale = session.info.setdefault(_STALE_KEY, set())
+        stale.add((counter.parent, parent_id, counter.column))
+        if counter.touch:
+            stale.add((counter.parent, parent_id, 'updated'))
+
+
+# events: counter maintenance
+def child_post_insert(mapper, connection, target):
+    for counter in _counters_of(mapper.class_):
+        _change(connection, target, counter, getattr(target, counter.foreign_key), 1)
+
+
+def child_post_update(mapper, connection, target):
+    attrs = db.inspect(target).attrs
+    for counter in _counters_of(mapper.class_):
+        history = attrs[counter.foreign_key].history
+        if history.has_changes():
+            for parent_id in history.deleted or ():
+                _change(connection, target, counter, parent_id, -1)
+            _change(
+                connection, target, counter, getattr(target, counter.foreign_key), 1
+            )
+
+
+def child_post_delete(mapper, connection, target):
+    attrs = db.inspect(target).attrs
+    for counter in _counters_of(mapper.class_):
+        history = attrs[counter.foreign_key].history
+        for parent_id in history.non_added():
+            _change(connection, target, counter, parent_id, -1)
+
+
+def session_post_flush(session, flush_context):
+    # counters were changed with plain SQL, loaded parents have to see new
+    # values
+    for model, parent_id, column in session.info.pop(_STALE_KEY, ()):
+        key = db.inspect(model).identity_key_from_primary_key([parent_id])
+        instance = session.identity_map.get(key)
+        if instance is not None:
+            session.expire(instance, [column])
+
+
+for _child in (Brew, Brewery, TastingNote):
+    db.event.listen(_child, 'after_insert', child_post_insert)
+    db.event.listen(_child, 'after_update', child_post_update)
+    db.event.listen(_child, 'after_delete', child_post_delete)
+db.event.listen(db.session, 'after_flush_postexec', session_post_flush)
@@ -0,0 +1,215 @@
+import datetime
+
+from ..ext import db
+from ..utils.events import changed
+from ..utils.text import fold_text
+from .brewery import Brewery
+from .brewing import Brew
+from .tasting import TastingNote
+
+KIND_BREW = 'brew'
+KIND_BREWERY = 'brewery'
+KIND_NOTE = 'note'
+
+FTS_TABLE = 'search_document_fts'
+
+# attributes which values end up in search documents
+BREW_INDEXED = (
+    'name', 'code', 'style', 'bjcp_style', 'hops', 'fermentables', 'is_public',
+    'brewery_id',
+)
+BREWERY_INDEXED = ('name', 'description', 'brewer_id')
+NOTE_INDEXED = ('text', 'brew_id')
+
+# expression has to be identical in index definition and in queries
+PG_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(keywords, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'B')"
+)
+
+
+class SearchDocument(db.Model):
+    __tablename__ = 'search_document'
+    id = db.Column(db.Integer, primary_key=True)  # noqa: A003
+    kind = db.Column(db.String(20), nullable=False)
+    object_id = db.Column(db.Integer, nullable=False)
+    parent_id = db.Column(db.Integer)
+    owner_id = db.Column(db.Integer, nullable=False, index=True)
+    is_public = db.Column(db.Boolean, default=True)
+    title = db.Column(db.String(250), nullable=False)
+    keywords = db.Column(db.Text)
+    content = db.Column(db.Text)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('search_document_object', 'kind', 'object_id', unique=True),
+    )
+
+
+# full text index: FTS5 external content table kept in sync by triggers on
+# SQLite, GIN expression index on PostgreSQL, other backends use LIKE scans
+_table = SearchDocument.__table__
+
+db.event.listen(_table, 'after_create', db.DDL(
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(keywords, content, "
+    "content='search_document', content_rowid='id')"
+).execute_if(dialect='sqlite'))
+db.event.listen(_table, 'after_create', db.DDL(
+    "CREATE TRIGGER search_document_ai AFTER INSERT ON search_document BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, keywords, content) "
+    "VALUES (new.id, new.keywords, new.content); END"
+).execute_if(dialect='sqlite'))
+db.event.listen(_table, 'after_create', db.DDL(
+    "CREATE TRIGGER search_document_ad AFTER DELETE ON search_document BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, keywords, content) "
+    "VALUES ('delete', old.id, old.keywords, old.content); END"
+).execute_if(dialect='sqlite'))
+db.event.listen(_table, 'after_create', db.DDL(
+    "CREATE TRIGGER search_document_au AFTER UPDATE ON search_document BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, keywords, content) "
+    "VALUES ('delete', old.id, old.keywords, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, keywords, content) "
+    "VALUES (new.id, new.keywords, new.content); END"
+).execute_if(dialect='sqlite'))
+db.event.listen(_table, 'before_drop', db.DDL(
+    f'DROP TABLE IF EXISTS {FTS_TABLE}'
+).execute_if(dialect='sqlite'))
+db.event.listen(_table, 'after_create', db.DDL(
+    'CREATE INDEX search_document_fts ON search_document '
+    f'USING gin (({PG_VECTOR_SQL}))'
+).execute_if(dialect='postgresql'))
+
+
+def _join_text(*parts):
+    return '\n'.join(p for p in parts if p)
+
+
+def _store_document(
+            connection, kind, object_id, owner_id, is_public, title, content,
+            parent_id=None,
+        ):
+    connection.execute(_table.delete().where(
+        db.and_(_table.c.kind == kind, _table.c.object_id == object_id)
+    ))
+    connection.execute(_table.insert().values(
+        kind=kind, object_id=object_id, parent_id=parent_id, owner_id=owner_id,
+        is_public=bool(is_public), title=title[:250], keywords=fold_text(title),
+        content=fold_text(content), updated=datetime.datetime.utcnow(),
+    ))
+
+
+def remove_document(connection, kind, object_id):
+    connection.execute(_table.delete().where(
+        db.and_(_table.c.kind == kind, _table.c.object_id == object_id)
+    ))
+
+
+def _brew_owner(connection, brewery_id):
+    brewery_table = Brewery.__table__
+    return connection.execute(
+        db.select([brewery_table.c.brewer_id])
+        .where(brewery_table.c.id == brewery_id)
+    ).scalar()
+
+
+def index_brew(connection, brew):
+    owner_id = _brew_owner(connection, brew.brewery_id)
+    content = _join_text(
+        brew.style, brew.bjcp_style, brew.hops, brew.fermentables,
+    )
+    _store_document(
+        connection, KIND_BREW, brew.id, owner_id, brew.is_public, brew.full_name,
+        content,
+    )
+    # tasting notes inherit title, visibility and ownership from brew
+    note_table = TastingNote.__table__
+    connection.execute(_table.update().where(db.and_(
+        _table.c.kind == KIND_NOTE,
+        _table.c.object_id.in_(
+            db.select([note_table.c.id]).where(note_table.c.brew_id == brew.id)
+        ),
+    )).values(
+        owner_id=owner_id, is_public=bool(brew.is_public), title=brew.full_name,
+        keywords=fold_text(brew.full_name),
+    ))
+
+
+def index_brewery(connection, brewery):
+    _store_document(
+        connection, KIND_BREWERY, brewery.id, brewery.brewer_id, True, brewery.name,
+        brewery.description,
+    )
+
+
+def index_note(connection, note):
+    brew_table = Brew.__table__
+    brew = connection.execute(
+        db.select([
+            brew_table.c.brewery_id, brew_table.c.is_public, brew_table.c.name,
+            brew_table.c.code,
+        ]).where(brew_table.c.id == note.brew_id)
+    ).first()
+    if brew is None:
+        return
+    title = brew.name
+    if brew.code:
+        title = f'#{brew.code} {title}'
+    _store_document(
+        connection, KIND_NOTE, note.id, _brew_owner(connection, brew.brewery_id),
+        brew.is_public, title, note.text, parent_id=note.brew_id,
+    )
+
+
+def rebuild_index(session):
+    """Recreate all search documents.
+
+    :param session: database session
+    :type session: Session
+    """
+    connection = session.connection()
+    connection.execute(_table.delete())
+    for brewery in Brewery.query.yield_per(500):
+        index_brewery(connection, brewery)
+    for brew in Brew.query.yield_per(500):
+        index_brew(connection, brew)
+    for note in TastingNote.query.yield_per(500):
+        index_note(connection, note)
+
+
+# events: search index maintenance
+def brew_post_save(mapper, connection, target):
+    if changed(target, BREW_INDEXED):
+        index_brew(connection, target)
+
+
+def brew_post_delete(mapper, connection, target):
+    remove_document(connection, KIND_BREW, target.id)
+
+
+def brewery_post_save(mapper, connection, target):
+    if changed(target, BREWERY_INDEXED):
+        index_brewery(connection, target)
+
+
+def brewery_post_delete(mapper, connection, target):
+    remove_document(connection, KIND_BREWERY, target.id)
+
+
+def tasting_note_post_save(mapper, connection, target):
+    if changed(target, NOTE_INDEXED):
+        index_note(connection, target)
+
+
+def tasting_note_post_delete(mapper, connection, target):
+    remove_document(connection, KIND_NOTE, target.id)
+
+
+db.event.listen(Brew, 'after_insert', brew_post_save)
+db.event.listen(Brew, 'after_update', brew_post_save)
+db.event.listen(Brew, 'after_delete', brew_post_delete)
+db.event.listen(Brewery, 'after_insert', brewery_post_save)
+db.event.listen(Brewery, 'after_update', brewery_post_save)
+db.event.listen(Brewery, 'after_delete', brewery_post_delete)
+db.event.listen(TastingNote, 'after_insert', tasting_note_post_save)
+db.event.listen(TastingNote, 'after_update', tasting_note_post_save)
+db.event.listen(TastingNote, 'after_delete', tasting_note_post_delete)
@@ -1,16 +1,17 @@
 import datetime
 
-import markdown
-
 from ..ext import db
+from ..utils.rendering import render_field
 from ..utils.text import stars2deg
 
 
 class TastingNote(db.Model):
     __tablename__ = 'tasting_note'
     id = db.Column(db.Integer, primary_key=True)  # noqa: A003
-    author_id = db.Column(
-        db.Integer, db.ForeignKey('brewer_profile.id'), nullable=False
+    # previous values of foreign keys kept in history for counter maintenance
+    author_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('brewer_profile.id'), nullable=False),
+        active_history=True,
     )
     author = db.relationship(
         'BrewerProfile',
@@ -21,7 +22,10 @@ class TastingNote(db.Model):
     date = db.Column(db.Date, nullable=False, index=True)
     text = db.Column(db.Text, nullable=False)
     text_html = db.Column(db.Text)
-    brew_id = db.Column(db.Integer, db.ForeignKey('brew.id'), nullable=False)
+    brew_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('brew.id'), nullable=False),
+        active_history=True,
+    )
     brew = db.relationship(
         'Brew',
         backref=db.backref(
@@ -29,6 +33,16 @@ class TastingNote(db.Model):
             order_by='desc(TastingNote.date)'
         )
     )
+    # copy of brew flag, maintained from visibility events
+    effectively_public = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.false(),
+    )
+
+    __table_args__ = (
+        db.Index('tasting_note_public_date', 'effectively_public', 'date', 'id'),
+        db.Index('tasting_note_brew_date', 'brew_id', 'date'),
+        db.Index('tasting_note_author_date', 'author_id', 'date'),
+    )
 
     @classmethod
     def create_for(cls, brew, author, text, date=None):
@@ -42,7 +56,7 @@ class TastingNote(db.Model):
 # events: TastingNote model
 def tasting_note_pre_save(mapper, connection, target):
     target.text = stars2deg(target.text)
-    target.text_html = markdown.markdown(target.text)
+    render_field(target, 'text', 'text_html')
 
 
 db.event.listen(TastingNote, 'before_insert', tasting_note_pre_save)
@@ -8,6 +8,7 @@ from flask_login import UserMixin
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from ..ext import db
+from ..utils.loading import with_loading
 
 
 class BrewerProfile(UserMixin, db.Model):
@@ -36,8 +37,22 @@ class BrewerProfile(UserMixin, db.Model):
     confirmation_sent_dt = db.Column(db.DateTime)
     confirmed_dt = db.Column(db.DateTime)
 
+    # batch-loadable alternative to dynamic backref
+    brewery_list = db.relationship(
+        'Brewery', viewonly=True, order_by='Brewery.name',
+    )
+    # maintained from counter events
+    brewery_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0',
+    )
+    tasting_note_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0',
+    )
+
     __table_args__ = (
         db.Index('user_remote_id', 'oauth_service', 'remote_userid'),
+        db.Index('user_public_created', 'is_public', 'created'),
+        db.Index('user_public_updated', 'is_public', 'updated'),
     )
 
     @property
@@ -65,23 +80,23 @@ class BrewerProfile(UserMixin, db.Model):
         return cls.query.filter_by(email=email).first()
 
     @classmethod
-    def _last(cls, ordering, public_only=False, limit=5):
-        query = cls.query
+    def _last(cls, ordering, public_only=False, limit=5, loading='profile.list'):
+        query = with_loading(cls.query, loading)
         if public_only:
             query = query.filter_by(is_public=True)
         return query.order_by(db.desc(ordering)).limit(limit).all()
 
     @classmethod
     def last_created(cls, public_only=False, limit=5, **kwargs):
-        return cls._last(cls.created, public_only, limit)
+        return cls._last(cls.created, public_only, limit, **kwargs)
 
     @classmethod
-    def last_updated(cls, public_only=False, limit=5):
-        return cls._last(cls.updated, public_only, limit)
+    def last_updated(cls, public_only=False, limit=5, **kwargs):
+        return cls._last(cls.updated, public_only, limit, **kwargs)
 
     @classmethod
-    def public(cls, order_by=None):
-        query = cls.query.filter_by(is_public=True)
+    def public(cls, order_by=None, loading='profile.list'):
+        query = with_loading(cls.query, loading).filter_by(is_public=True)
         if order_by is not None:
             query = query.order_by(order_by)
         return query
@@ -0,0 +1,105 @@
+from typing import Optional
+
+from ..ext import db
+from ..utils.events import changed
+from .brewery import Brewery
+from .brewing import Brew
+from .tasting import TastingNote
+from .users import BrewerProfile
+
+_brew = Brew.__table__
+_brewery = Brewery.__table__
+_note = TastingNote.__table__
+_profile = BrewerProfile.__table__
+
+
+def _flag(value) -> bool:
+    # unset visibility flag gets column default (public) on insert
+    return value is None or bool(value)
+
+
+def refresh_visibility(connection, brewery_ids=None):
+    """Recalculate ``effectively_public`` flag of brews and their tasting
+    notes with bulk updates.
+
+    :param connection: database connection
+    :type connection: Connection
+    :param brewery_ids: ids of breweries which brews are updated or select
+                        producing them, None to update all brews
+    """
+    brewer_public = db.select([_profile.c.is_public]).select_from(
+        _brewery.join(_profile, _profile.c.id == _brewery.c.brewer_id)
+    ).where(_brewery.c.id == _brew.c.brewery_id).as_scalar()
+    brews = _brew.update().values(effectively_public=db.and_(
+        db.func.coalesce(_brew.c.is_public, True),
+        db.func.coalesce(brewer_public, True),
+    ))
+    brew_public = db.select([_brew.c.effectively_public]).where(
+        _brew.c.id == _note.c.brew_id
+    ).as_scalar()
+    notes = _note.update().values(effectively_public=brew_public)
+    if brewery_ids is not None:
+        brews = brews.where(_brew.c.brewery_id.in_(brewery_ids))
+        notes = notes.where(_note.c.brew_id.in_(
+            db.select([_brew.c.id]).where(_brew.c.brewery_id.in_(brewery_ids))
+        ))
+    connection.execute(brews)
+    connection.execute(notes)
+
+
+def _brewer_public(connection, brewery_id: Optional[int]) -> bool:
+    value = connection.execute(
+        db.select([_profile.c.is_public]).select_from(
+            _brewery.join(_profile, _profile.c.id == _brewery.c.brewer_id)
+        ).where(_brewery.c.id == brewery_id)
+    ).scalar()
+    return _flag(value)
+
+
+# events: visibility flag maintenance
+def brew_pre_save(mapper, connection, target):
+    if target.effectively_public is None or changed(
+                target, ('is_public', 'brewery_id')
+            ):
+        target.effectively_public = _flag(target.is_public) and _brewer_public(
+            connection, target.brewery_id
+        )
+
+
+def brew_post_update(mapper, connection, target):
+    if changed(target, ('effectively_public',)):
+        connection.execute(
+            _note.update().where(_note.c.brew_id == target.id)
+            .values(effectively_public=target.effectively_public)
+        )
+
+
+def tasting_note_pre_save(mapper, connection, target):
+    if target.effectively_public is None or changed(target, ('brew_id',)):
+        value = connection.execute(
+            db.select([_brew.c.effectively_public])
+            .where(_brew.c.id == target.brew_id)
+        ).scalar()
+        target.effectively_public = bool(value)
+
+
+def brewery_post_update(mapper, connection, target):
+    if changed(target, ('brewer_id',)):
+        refresh_visibility(connection, [target.id])
+
+
+def profile_post_update(mapper, connection, target):
+    if changed(target, ('is_public',)):
+        refresh_visibility(
+            connection,
+            db.select([_brewery.c.id]).where(_brewery.c.brewer_id == target.id),
+        )
+
+
+db.event.listen(Brew, 'before_insert', brew_pre_save)
+db.event.listen(Brew, 'before_update', brew_pre_save)
+db.event.listen(Brew, 'after_update', brew_post_update)
+db.event.listen(TastingNote, 'before_insert', tasting_note_pre_save)
+db.event.listen(TastingNote, 'before_update', tasting_note_pre_save)
+db.event.listen(Brewery, 'after_update', brewery_post_update)
+db.event.listen(BrewerProfile, 'after_update', profile_post_update)
@@ -0,0 +1,62 @@
+from typing import Dict, Optional
+
+from flask_login import current_user
+
+from ..ext import db
+from ..models import Brew, BrewerProfile
+from ..utils.loading import load_relationships
+from .forms import ProfileForm
+
+
+class ProfileDetails:
+    """Data displayed on brewer profile page. Owner sees maintained brew
+    counters of breweries, for non-owners counts of public brews of all
+    profile breweries are fetched with single query. Profile form is built
+    only for profile owner.
+
+    :param profile: profile to be displayed
+    :type profile: BrewerProfile
+    :param form: profile form submitted by owner, defaults to None
+    :type form: Optional[ProfileForm]
+    """
+
+    def __init__(self, profile: BrewerProfile, form: Optional[ProfileForm] = None):
+        load_relationships(profile, 'profile.details')
+        self.profile = profile
+        self.is_owner = profile == current_user
+        self.form = None
+        if self.is_owner:
+            self.form = form or ProfileForm(obj=profile)
+
+    def brew_counts(self) -> Dict[int, int]:
+        """Number of brews in each of profile breweries.
+
+        :return: mapping of brewery id to number of brews
+        :rtype: Dict[int, int]
+        """
+        breweries = self.profile.brewery_list
+        if self.is_owner:
+            return {brewery.id: brewery.brew_count for brewery in breweries}
+        ids = [brewery.id for brewery in breweries]
+        if not ids:
+            return {}
+        query = db.session.query(
+            Brew.brewery_id, db.func.count(Brew.id)
+        ).filter(
+            Brew.brewery_id.in_(ids), Brew.is_public.is_(True),
+            Brew.is_draft.is_(False),
+        )
+        counts = dict.fromkeys(ids, 0)
+        counts.update(query.group_by(Brew.brewery_id))
+        return counts
+
+    def context(self) -> dict:
+        return {
+            'profile': self.profile,
+            'is_owner': self.is_owner,
+            'brew_counts': self.brew_counts(),
+            'latest_brews': Brew.get_latest_for(
+                self.profile, public_only=not self.is_owner, limit=10
+            ),
+            'form': self.form,
+        }
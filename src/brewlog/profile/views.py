@@ -6,15 +6,19 @@ from flask_babel import gettext as _
 from flask_login import current_user, login_required, logout_user
 from itsdangerous.url_safe import URLSafeTimedSerializer
 
+from ..auth.principal import full_profile
 from ..brew.utils import BrewUtils
 from ..ext import db
 from ..forms.base import DeleteForm
 from ..models import Brew, BrewerProfile, Brewery
-from ..utils.pagination import get_page
+from ..utils.http import conditional, not_modified, page_validators
+from ..utils.loading import with_loading
+from ..utils.pagination import KeysetPagination, get_cursor
 from ..utils.views import check_token
 from . import profile_bp
 from .forms import PasswordChangeForm, ProfileForm
 from .permissions import AccessManager
+from .utils import ProfileDetails
 
 
 @profile_bp.route('/<int:user_id>', methods=['GET', 'POST'], endpoint='details')
@@ -22,6 +26,10 @@ def profile(user_id):
     user_profile = BrewerProfile.query.get_or_404(user_id)
     is_post = request.method == 'POST'
     AccessManager(user_profile, is_post).check()
+    validators = page_validators(user_profile)
+    response = not_modified(validators)
+    if response is not None:
+        return response
     form = None
     if is_post:
         form = ProfileForm()
@@ -29,13 +37,8 @@ def profile(user_id):
             profile = form.save(obj=user_profile)
             flash(_('your profile data has been updated'), category='success')
             return redirect(url_for('.details', user_id=profile.id))
-    context = {
-        'profile': user_profile,
-        'latest_brews': Brew.get_latest_for(user_profile, limit=10),
-    }
-    if user_profile == current_user:
-        context['form'] = form or ProfileForm(obj=user_profile)
-    return render_template('account/profile.html', **context)
+    context = ProfileDetails(user_profile, form).context()
+    return conditional(render_template('account/profile.html', **context), validators)
 
 
 @profile_bp.route('/newpassword', methods=['GET', 'POST'], endpoint='setpassword')
@@ -43,7 +46,7 @@ def profile(user_id):
 def set_password():
     form = PasswordChangeForm()
     if form.validate_on_submit():
-        user = form.save(current_user)
+        user = form.save(full_profile(current_user))
         flash(_('your password has been changed'), category='success')
         return redirect(url_for('.details', user_id=user.id))
     context = {
@@ -77,9 +80,11 @@ def profile_delete(user_id):
 @profile_bp.route('/all', endpoint='all')
 def profile_list():
     page_size = 20
-    page = get_page(request)
-    query = BrewerProfile.public(order_by=BrewerProfile.created)
-    pagination = query.paginate(page, page_size)
+    query = BrewerProfile.public()
+    pagination = KeysetPagination(
+        query, ((BrewerProfile.created, False), (BrewerProfile.id, False)),
+        get_cursor(request), page_size,
+    )
     ctx = {
         'pagination': pagination,
     }
@@ -91,9 +96,11 @@ def breweries(user_id):
     brewer = BrewerProfile.query.get_or_404(user_id)
     AccessManager(brewer, False).check()
     page_size = 10
-    page = get_page(request)
-    query = brewer.breweries.order_by(Brewery.name)
-    pagination = query.paginate(page, page_size)
+    query = with_loading(brewer.breweries, 'brewery.list')
+    pagination = KeysetPagination(
+        query, ((Brewery.name, False), (Brewery.id, False)), get_cursor(request),
+        page_size,
+    )
     ctx = {
         'pagination': pagination,
     }
@@ -105,12 +112,15 @@ def brews(user_id):
     brewer = BrewerProfile.query.get_or_404(user_id)
     AccessManager(brewer, False).check()
     page_size = 10
-    page = get_page(request)
-    query = Brew.query.join(Brewery).filter(Brewery.brewer_id == user_id)
+    query = with_loading(Brew.query, 'brew.list').join(Brewery).filter(
+        Brewery.brewer_id == user_id
+    )
     if current_user.is_anonymous or current_user.id != user_id:
         query = query.filter(Brew.is_public.is_(True))
-    query = query.order_by(db.desc(Brew.created))
-    pagination = query.paginate(page, page_size)
+    pagination = KeysetPagination(
+        query, ((Brew.created, True), (Brew.id, True)), get_cursor(request),
+        page_size,
+    )
     ctx = {
         'pagination': pagination,
         'utils': BrewUtils,
@@ -159,8 +169,9 @@ def email_confirm(token: str):
     if not check_result.is_error:
         if check_result.payload['id'] != current_user.id:
             abort(400)
-        current_user.set_email_confirmed()
-        db.session.add(current_user)
+        user = full_profile(current_user)
+        user.set_email_confirmed()
+        db.session.add(user)
         db.session.commit()
         msg = _('your email has been confirmed succesfully')
         category = 'success'
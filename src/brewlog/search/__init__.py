@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+
+search_bp = Blueprint('search', __name__)
+
+from . import views  # noqa: F401
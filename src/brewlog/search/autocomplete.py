@@ -0,0 +1,321 @@
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Mapping, Optional, Set, Tuple
+
+from flask import current_app, url_for
+from redis import Redis
+
+from ..ext import db
+from ..models import Brew, BrewerProfile, Brewery
+from ..models.search import KIND_BREW, KIND_BREWERY
+from ..utils.events import after_commit, changed, mark_dirty
+from ..utils.metrics import cache_lookup
+from ..utils.text import fold_text
+
+# large enough to never collide with real part of generated url
+_URL_MARKER = 2147483647
+
+_ENDPOINTS = {
+    KIND_BREW: ('brew.details', 'brew_id'),
+    KIND_BREWERY: ('brewery.details', 'brewery_id'),
+}
+
+_DIRTY_KEY = 'autocomplete_dirty'
+
+_word_re = re.compile(r'\w+')
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(fold_text(text).split())
+
+
+class PrefixIndex:
+    """Immutable prefix index over object names. Folded name and each of its
+    word suffixes are kept in single sorted array so lookup is a binary
+    search followed by scan over at most few entries past requested limit.
+
+    :param items: iterable of (object id, name) pairs
+    :type items: Iterable[Tuple[int, str]]
+    """
+
+    __slots__ = ('_keys', '_ids', '_names')
+
+    def __init__(self, items: Iterable[Tuple[int, str]]):
+        entries = []
+        self._names = {}
+        for obj_id, name in items:
+            self._names[obj_id] = name
+            key = _normalize(name)
+            for match in _word_re.finditer(key):
+                entries.append((key[match.start():], obj_id))
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._ids = array('q', (obj_id for _, obj_id in entries))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def lookup(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """Find objects with name or any of name words starting with prefix.
+
+        :param prefix: text to look up, folded before matching
+        :type prefix: str
+        :param limit: maximum number of results, defaults to 10
+        :type limit: int
+        :return: list of (object id, name) pairs
+        :rtype: List[Tuple[int, str]]
+        """
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        keys = self._keys
+        found = []
+        seen = set()
+        pos = bisect_left(keys, prefix)
+        while pos < len(keys) and len(found) < limit:
+            if not keys[pos].startswith(prefix):
+                break
+            obj_id = self._ids[pos]
+            if obj_id not in seen:
+                seen.add(obj_id)
+                found.append((obj_id, self._names[obj_id]))
+            pos += 1
+        return found
+
+
+def _brew_names(user_id: Optional[int]) -> List[Tuple[int, str]]:
+    query = db.session.query(Brew.id, Brew.name)
+    if user_id is not None:
+        return query.join(Brewery).filter(Brewery.brewer_id == user_id).all()
+    return query.filter(Brew.effectively_public.is_(True)).all()
+
+
+def _brewery_names(user_id: Optional[int]) -> List[Tuple[int, str]]:
+    query = db.session.query(Brewery.id, Brewery.name)
+    if user_id is not None:
+        return query.filter(Brewery.brewer_id == user_id).all()
+    return query.join(BrewerProfile).filter(BrewerProfile.is_public.is_(True)).all()
+
+
+_LOADERS: Mapping[str, Callable[[Optional[int]], List[Tuple[int, str]]]] = {
+    KIND_BREW: _brew_names,
+    KIND_BREWERY: _brewery_names,
+}
+
+
+class AutocompleteService:
+    """Per worker autocomplete over names of brews and breweries. Public
+    objects are kept in one index per kind, objects owned by user are kept
+    in per-user overlay indexes held in bounded LRU cache.
+
+    Indexes are rebuilt lazily on lookup when generation counter stored in
+    Redis differs from the one index has been built at, counters are bumped
+    after commit of changes to indexed objects so all workers pick them up.
+    Only one thread rebuilds given index, others wait for its result.
+
+    :param redis: Redis connection
+    :type redis: Redis
+    :param overlay_cache_size: max number of user overlays kept in memory
+    :type overlay_cache_size: int
+    """
+
+    def __init__(self, redis: Redis, overlay_cache_size: int = 256):
+        self.redis = redis
+        self.overlay_cache_size = overlay_cache_size
+        self._public = {}
+        self._overlays = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    @staticmethod
+    def generation_key(kind: str, user_id: Optional[int] = None) -> str:
+        if user_id is None:
+            return f'autocomplete:{kind}:gen'
+        return f'autocomplete:{kind}:gen:{user_id}'
+
+    def generation(self, kind: str, user_id: Optional[int] = None) -> Optional[bytes]:
+        """Current generation of public index or user overlay index.
+
+        :param kind: object kind
+        :type kind: str
+        :param user_id: owner id for overlay, None for public index
+        :type user_id: Optional[int]
+        :return: generation counter value, None if never invalidated
+        :rtype: Optional[bytes]
+        """
+        return self.redis.get(self.generation_key(kind, user_id))
+
+    def index(self, kind: str, user_id: Optional[int] = None) -> PrefixIndex:
+        """Get up to date public index or user overlay index for kind.
+
+        :param kind: object kind
+        :type kind: str
+        :param user_id: owner id for overlay, None for public index
+        :type user_id: Optional[int]
+        :return: prefix index
+        :rtype: PrefixIndex
+        """
+        generation = self.generation(kind, user_id)
+        cache_key = (kind, user_id)
+        index = self._cached(cache_key, generation)
+        cache_lookup('autocomplete', index is not None)
+        if index is not None:
+            return index
+        with self._lock:
+            build_lock = self._build_locks.setdefault(cache_key, threading.Lock())
+        try:
+            with build_lock:
+                # index might have been built while waiting for lock
+                index = self._cached(cache_key, generation)
+                if index is None:
+                    index = PrefixIndex(_LOADERS[kind](user_id))
+                    self._store(cache_key, generation, index)
+        finally:
+            with self._lock:
+                self._build_locks.pop(cache_key, None)
+        return index
+
+    def _cached(self, cache_key, generation) -> Optional[PrefixIndex]:
+        with self._lock:
+            if cache_key[1] is None:
+                entry = self._public.get(cache_key)
+            else:
+                entry = self._overlays.get(cache_key)
+                if entry is not None:
+                    self._overlays.move_to_end(cache_key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+        return None
+
+    def _store(self, cache_key, generation, index: PrefixIndex):
+        with self._lock:
+            if cache_key[1] is None:
+                self._public[cache_key] = (generation, index)
+            else:
+                self._overlays[cache_key] = (generation, index)
+                self._overlays.move_to_end(cache_key)
+                while len(self._overlays) > self.overlay_cache_size:
+                    self._overlays.popitem(last=False)
+
+    def suggest(
+                self, kind: str, term: str, user_id: Optional[int] = None,
+                limit: int = 10,
+            ) -> List[Mapping[str, str]]:
+        """Find names starting with term. Anonymous users get public objects,
+        authenticated users get objects they own.
+
+        :param kind: object kind
+        :type kind: str
+        :param term: text typed by user
+        :type term: str
+        :param user_id: actor id, may be None
+        :type user_id: Optional[int]
+        :param limit: maximum number of results, defaults to 10
+        :type limit: int
+        :return: list of mappings with name and url
+        :rtype: List[Mapping[str, str]]
+        """
+        found = self.index(kind, user_id).lookup(term, limit)
+        if not found:
+            return []
+        endpoint, arg_name = _ENDPOINTS[kind]
+        url_template = url_for(endpoint, **{arg_name: _URL_MARKER}).replace(
+            str(_URL_MARKER), '{}'
+        )
+        return [
+            {'name': name, 'url': url_template.format(obj_id)}
+            for obj_id, name in found
+        ]
+
+    def invalidate(self, keys: Iterable[Tuple[str, Optional[int]]]):
+        """Bump generation counters of indexes.
+
+        :param keys: iterable of (kind, user id or None) pairs
+        :type keys: Iterable[Tuple[str, Optional[int]]]
+        """
+        pipe = self.redis.pipeline()
+        for kind, user_id in keys:
+            pipe.incr(self.generation_key(kind, user_id))
+        pipe.execute()
+
+
+# events: autocomplete invalidation
+def _owner_ids(connection, brewery_ids: Iterable[int]) -> Set[int]:
+    brewery_table = Brewery.__table__
+    rows = connection.execute(
+        db.select([brewery_table.c.brewer_id])
+        .where(brewery_table.c.id.in_(list(brewery_ids)))
+    )
+    return {row.brewer_id for row in rows}
+
+
+def _history_values(target, attr_name: str) -> Set[int]:
+    history = db.inspect(target).attrs[attr_name].history
+    values = set(history.deleted or ())
+    values.add(getattr(target, attr_name))
+    values.discard(None)
+    return values
+
+
+def _listed_publicly(target) -> bool:
+    # visibility not loaded is not known, such brew invalidates public index
+    values = db.inspect(target).attrs.effectively_public.history.sum()
+    return not values or any(values)
+
+
+def _invalidate_brew(connection, target):
+    owners = _owner_ids(connection, _history_values(target, 'brewery_id'))
+    keys = [(KIND_BREW, owner) for owner in owners]
+    if _listed_publicly(target):
+        keys.append((KIND_BREW, None))
+    mark_dirty(target, _DIRTY_KEY, keys)
+
+
+def brew_post_save(mapper, connection, target):
+    if changed(target, ('name', 'is_public', 'brewery_id')):
+        _invalidate_brew(connection, target)
+
+
+def brew_post_delete(mapper, connection, target):
+    _invalidate_brew(connection, target)
+
+
+def _invalidate_brewery(target):
+    owners = _history_values(target, 'brewer_id')
+    mark_dirty(
+        target, _DIRTY_KEY,
+        [(KIND_BREWERY, None)] + [(KIND_BREWERY, owner) for owner in owners],
+    )
+
+
+def brewery_post_save(mapper, connection, target):
+    if changed(target, ('name', 'brewer_id')):
+        _invalidate_brewery(target)
+
+
+def brewery_post_delete(mapper, connection, target):
+    _invalidate_brewery(target)
+
+
+def profile_post_save(mapper, connection, target):
+    if changed(target, ('is_public',)):
+        mark_dirty(target, _DIRTY_KEY, [(KIND_BREW, None), (KIND_BREWERY, None)])
+
+
+def _invalidate(keys):
+    service = getattr(current_app, 'autocomplete', None)
+    if service is not None:
+        service.invalidate(keys)
+
+
+db.event.listen(Brew, 'after_insert', brew_post_save)
+db.event.listen(Brew, 'after_update', brew_post_save)
+db.event.listen(Brew, 'after_delete', brew_post_delete)
+db.event.listen(Brewery, 'after_insert', brewery_post_save)
+db.event.listen(Brewery, 'after_update', brewery_post_save)
+db.event.listen(Brewery, 'after_delete', brewery_post_delete)
+db.event.listen(BrewerProfile, 'after_update', profile_post_save)
+after_commit(_DIRTY_KEY, _invalidate)
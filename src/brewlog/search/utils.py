@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from typing import List, Mapping, Optional, Sequence
+
+from flask import url_for
+from flask_sqlalchemy import BaseQuery
+
+from ..ext import db
+from ..models import BrewerProfile
+from ..models.search import (
+    FTS_TABLE, KIND_BREW, KIND_BREWERY, KIND_NOTE, PG_VECTOR_SQL, SearchDocument,
+)
+from ..utils.text import search_terms
+
+_ENDPOINTS = {
+    KIND_BREW: ('brew.details', 'brew_id'),
+    KIND_BREWERY: ('brewery.details', 'brewery_id'),
+    KIND_NOTE: ('brew.details', 'brew_id'),
+}
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    object_id: int
+    parent_id: Optional[int]
+    title: str
+
+    @property
+    def url(self) -> str:
+        endpoint, arg_name = _ENDPOINTS[self.kind]
+        obj_id = self.parent_id if self.kind == KIND_NOTE else self.object_id
+        return url_for(endpoint, **{arg_name: obj_id})
+
+
+@dataclass
+class SearchResultPage:
+    items: List[SearchResult]
+    page: int
+    per_page: int
+    has_next: bool
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+
+class SearchUtils:
+
+    @staticmethod
+    def _matching(terms: Sequence[str], title_only: bool) -> BaseQuery:
+        dialect = db.session.get_bind().dialect.name
+        query = db.session.query(SearchDocument)
+        if dialect == 'sqlite':
+            fts = db.table(FTS_TABLE, db.column('rowid'))
+            fts_col = db.literal_column(FTS_TABLE)
+            prefix = 'keywords : ' if title_only else ''
+            expr = ' '.join(f'{prefix}"{term}"*' for term in terms)
+            rank = db.func.bm25(fts_col, 10.0, 1.0)
+            return query.join(fts, fts.c.rowid == SearchDocument.id).filter(
+                fts_col.match(expr)
+            ).order_by(rank, SearchDocument.id)
+        if dialect == 'postgresql':
+            vector = db.literal_column(f'({PG_VECTOR_SQL})')
+            weight = 'A' if title_only else ''
+            tsquery = db.func.to_tsquery(
+                'simple', ' & '.join(f'{term}:*{weight}' for term in terms)
+            )
+            rank = db.func.ts_rank(vector, tsquery)
+            return query.filter(vector.op('@@')(tsquery)).order_by(
+                db.desc(rank), SearchDocument.id
+            )
+        for term in terms:
+            condition = SearchDocument.keywords.like(f'%{term}%')
+            if not title_only:
+                condition = db.or_(
+                    condition, SearchDocument.content.like(f'%{term}%')
+                )
+            query = query.filter(condition)
+        return query.order_by(SearchDocument.keywords, SearchDocument.id)
+
+    @staticmethod
+    def query(
+                term: str, user: Optional[BrewerProfile] = None,
+                kinds: Optional[Sequence[str]] = None, owner_only: bool = False,
+                title_only: bool = False,
+            ) -> Optional[BaseQuery]:
+        """Build ranked query over search documents matching search phrase,
+        filtered by visibility rules that apply to user.
+
+        :param term: search phrase
+        :type term: str
+        :param user: actor object, may be None
+        :type user: Optional[BrewerProfile]
+        :param kinds: document kinds to search, defaults to all
+        :type kinds: Optional[Sequence[str]]
+        :param owner_only: search only objects owned by user
+        :type owner_only: bool
+        :param title_only: match only title (name) of objects
+        :type title_only: bool
+        :return: query or None if phrase does not contain searchable terms
+        :rtype: Optional[BaseQuery]
+        """
+        terms = search_terms(term)
+        if not terms:
+            return None
+        query = SearchUtils._matching(terms, title_only)
+        if kinds:
+            query = query.filter(SearchDocument.kind.in_(kinds))
+        if owner_only and user is not None:
+            return query.filter(SearchDocument.owner_id == user.id)
+        query = query.join(BrewerProfile, BrewerProfile.id == SearchDocument.owner_id)
+        public = db.and_(
+            BrewerProfile.is_public.is_(True), SearchDocument.is_public.is_(True)
+        )
+        if user is not None:
+            return query.filter(db.or_(SearchDocument.owner_id == user.id, public))
+        return query.filter(public)
+
+    @staticmethod
+    def search(
+                term: str, user: Optional[BrewerProfile] = None,
+                kinds: Optional[Sequence[str]] = None, page: int = 1,
+                per_page: int = 20,
+            ) -> SearchResultPage:
+        query = SearchUtils.query(term, user, kinds)
+        page = max(page, 1)
+        if query is None:
+            return SearchResultPage([], page, per_page, False)
+        rows = query.with_entities(
+            SearchDocument.kind, SearchDocument.object_id, SearchDocument.parent_id,
+            SearchDocument.title,
+        ).offset((page - 1) * per_page).limit(per_page + 1).all()
+        items = [SearchResult(*row) for row in rows[:per_page]]
+        return SearchResultPage(items, page, per_page, len(rows) > per_page)
+
+    @staticmethod
+    def suggest(
+                term: str, kind: str, user: Optional[BrewerProfile] = None,
+                owner_only: bool = False, limit: int = 10,
+            ) -> List[Mapping[str, str]]:
+        query = SearchUtils.query(
+            term, user, [kind], owner_only=owner_only, title_only=True
+        )
+        if query is None:
+            return []
+        rows = query.with_entities(
+            SearchDocument.kind, SearchDocument.object_id, SearchDocument.parent_id,
+            SearchDocument.title,
+        ).limit(limit)
+        return [
+            {'name': result.title, 'url': result.url}
+            for result in (SearchResult(*row) for row in rows)
+        ]
@@ -0,0 +1,31 @@
+from flask import current_app, render_template, request
+from flask_login import current_user
+
+from ..models.search import KIND_BREW, KIND_BREWERY, KIND_NOTE
+from ..utils.pagination import get_page
+from . import search_bp
+from .utils import SearchUtils
+
+KINDS = (KIND_BREW, KIND_BREWERY, KIND_NOTE)
+
+
+@search_bp.route('/', endpoint='results')
+def search_results():
+    term = request.args.get('q', '').strip()
+    kinds = [k for k in request.args.getlist('kind') if k in KINDS] or None
+    max_page = current_app.config.get('SEARCH_MAX_PAGE', 50)
+    page = min(get_page(request), max_page)
+    user = None
+    if current_user.is_authenticated:
+        user = current_user
+    results = SearchUtils.search(
+        term, user, kinds, page=page,
+        per_page=current_app.config.get('LIST_DEFAULT_LIMIT', 10),
+    )
+    ctx = {
+        'term': term,
+        'kinds': kinds,
+        'results': results,
+        'max_page': max_page,
+    }
+    return render_template('search/results.html', **ctx)
@@ -1,9 +1,16 @@
 import logging
 import os
 import sys
+from contextlib import contextmanager
 from typing import Sequence
 
 import requests
+from flask import current_app, has_app_context
+
+from .app import make_app
+from .brewery.stats import BreweryStats
+from .home.utils import HomeSnapshot
+from .utils.rendering import rerender_field
 
 _mailgun_domain = os.getenv('MAILGUN_DOMAIN')
 _mailgun_api_url = f'https://api.eu.mailgun.net/v3/{_mailgun_domain}/messages'
@@ -27,3 +34,45 @@ def send_email(
         logger.error(
             'Unhandled exception in background task', exc_info=sys.exc_info()
         )
+
+
+@contextmanager
+def _app_context():
+    if has_app_context():
+        yield current_app
+    else:
+        app = make_app()
+        with app.app_context():
+            yield app
+
+
+def refresh_home_snapshot():
+    try:
+        with _app_context():
+            HomeSnapshot.refresh()
+    except Exception:
+        logger.error(
+            'Unhandled exception in background task', exc_info=sys.exc_info()
+        )
+
+
+def refresh_brewery_stats(brewery_id: int):
+    try:
+        with _app_context():
+            BreweryStats.refresh(brewery_id)
+    except Exception:
+        logger.error(
+            'Unhandled exception in background task', exc_info=sys.exc_info()
+        )
+
+
+def render_markdown_field(
+            table_name: str, obj_id: int, source_col: str, html_col: str,
+        ):
+    try:
+        with _app_context():
+            rerender_field(table_name, obj_id, source_col, html_col)
+    except Exception:
+        logger.error(
+            'Unhandled exception in background task', exc_info=sys.exc_info()
+        )
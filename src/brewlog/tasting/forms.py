@@ -4,6 +4,7 @@ from wtforms.fields import TextAreaField
 from wtforms.fields.html5 import DateField
 from wtforms.validators import InputRequired
 
+from ..auth.principal import full_profile
 from ..forms.base import BaseObjectForm
 from ..models import TastingNote
 
@@ -13,5 +14,5 @@ class TastingNoteForm(BaseObjectForm):
     text = TextAreaField(_('text'), validators=[InputRequired()])
 
     def save(self, brew, save=True):
-        obj = TastingNote(brew=brew, author=current_user)
+        obj = TastingNote(brew=brew, author=full_profile(current_user))
         return super(TastingNoteForm, self).save(obj, save)
@@ -1,22 +1,58 @@
-from ..ext import db
-from ..models import Brew, BrewerProfile, Brewery, TastingNote
-from ..utils.query import public_or_owner
+from flask import current_app
+
+from ..models import TastingNote
+from ..utils.loading import with_loading
+from ..utils.pagination import KeysetPagination
+from ..utils.query import fetch_ordered, public_and_owned, public_or_owner
 
 
 class TastingUtils:
 
     @staticmethod
-    def notes(public_only=True, extra_user=None, user=None):
-        query = TastingNote.query
+    def notes(public_only=True, extra_user=None, user=None, loading='note.list'):
+        query = with_loading(TastingNote.query, loading)
         if user is not None:
-            query = query.join(BrewerProfile).filter(BrewerProfile.id == user.id)
+            query = query.filter(TastingNote.author_id == user.id)
         if public_only:
-            query = query.join(Brew).join(Brewery).join(BrewerProfile)
-            query = public_or_owner(query, extra_user)
+            query = public_or_owner(query, extra_user, TastingNote)
         return query
 
     @staticmethod
-    def latest_notes(ordering, limit=5, public_only=False, extra_user=None, user=None):
-        return TastingUtils.notes(
-            public_only, extra_user, user
-        ).order_by(db.desc(ordering)).limit(limit).all()
+    def note_queries(public_only=True, extra_user=None, user=None, loading='note.list'):
+        query = TastingUtils.notes(False, None, user, loading)
+        if public_only:
+            return public_and_owned(query, extra_user, TastingNote)
+        return [query]
+
+    @staticmethod
+    def latest_notes(
+                ordering, limit=5, public_only=False, extra_user=None, user=None,
+                loading='note.list',
+            ):
+        return fetch_ordered(
+            TastingUtils.note_queries(public_only, extra_user, user, loading),
+            ((ordering, True), (TastingNote.id, True)), limit,
+        )
+
+    @staticmethod
+    def brew_notes(brew, cursor=None, per_page=None):
+        """Window of tasting notes of brew, newest first.
+
+        :param brew: brew which notes are displayed
+        :type brew: Brew
+        :param cursor: pagination cursor, None for first window
+        :type cursor: Optional[str]
+        :param per_page: window size, defaults to configured page size
+        :type per_page: Optional[int]
+        :return: notes pagination
+        :rtype: KeysetPagination
+        """
+        if per_page is None:
+            per_page = current_app.config['TASTING_NOTES_PAGE_SIZE']
+        query = with_loading(TastingNote.query, 'note.brew').filter(
+            TastingNote.brew_id == brew.id
+        )
+        return KeysetPagination(
+            query, ((TastingNote.date, True), (TastingNote.id, True)), cursor,
+            per_page,
+        )
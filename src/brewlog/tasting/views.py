@@ -1,12 +1,21 @@
-import markdown
-from flask import abort, flash, redirect, render_template, request
+import hashlib
+from typing import Dict, Tuple
+
+from flask import (
+    abort, current_app, flash, jsonify, redirect, render_template, request, url_for,
+)
 from flask_babel import gettext as _
 from flask_login import current_user, login_required
+from sqlalchemy.orm import load_only
 
+from ..brew.permissions import AccessManager as BrewAccessManager
 from ..ext import db
 from ..forms.base import DeleteForm
 from ..models import Brew, TastingNote
-from ..utils.pagination import get_page
+from ..utils.http import conditional, data_validators, not_modified
+from ..utils.loading import with_loading
+from ..utils.pagination import KeysetPagination, get_cursor
+from ..utils.query import public_or_owner
 from ..utils.views import next_redirect
 from . import tasting_bp
 from .forms import TastingNoteForm
@@ -17,13 +26,14 @@ from .utils import TastingUtils
 @tasting_bp.route('/all', endpoint='all')
 def all_tasting_notes():
     page_size = 20
-    page = get_page(request)
     kw = {}
     if current_user.is_authenticated:
         kw['extra_user'] = current_user
-    query = TastingUtils.notes(public_only=True, **kw)
-    query = query.order_by(db.desc(TastingNote.date))
-    pagination = query.paginate(page, page_size)
+    query = TastingUtils.note_queries(public_only=True, **kw)
+    pagination = KeysetPagination(
+        query, ((TastingNote.date, True), (TastingNote.id, True)),
+        get_cursor(request), page_size,
+    )
     context = {
         'public_only': True,
         'pagination': pagination,
@@ -31,6 +41,26 @@ def all_tasting_notes():
     return render_template('tasting/list.html', **context)
 
 
+@tasting_bp.route('/brew/<int:brew_id>', endpoint='brew')
+def brew_tasting_notes(brew_id):
+    brew = with_loading(Brew.query, 'brew.list').get_or_404(brew_id)
+    BrewAccessManager(brew, False).check()
+    pagination = TastingUtils.brew_notes(brew, get_cursor(request))
+    html = render_template(
+        'tasting/include/tasting_note_list.html', brew=brew, notes=pagination,
+    )
+    next_url = None
+    if pagination.next_cursor:
+        next_url = url_for('.brew', brew_id=brew.id, c=pagination.next_cursor)
+    validators = data_validators(
+        brew.id, next_url, hashlib.sha1(html.encode('utf-8')).hexdigest()
+    )
+    response = not_modified(validators)
+    if response is not None:
+        return response
+    return conditional(jsonify({'html': html, 'next': next_url}), validators)
+
+
 @tasting_bp.route('/<int:brew_id>/add', methods=['GET', 'POST'], endpoint='add')
 @login_required
 def brew_add_tasting_note(brew_id):
@@ -73,14 +103,59 @@ def brew_delete_tasting_note(note_id):
     return render_template('tasting/tasting_note_delete.html', **ctx)
 
 
+def _visible_texts(element_ids) -> Dict[str, Tuple[int, str]]:
+    ids = {}
+    for element_id in element_ids:
+        try:
+            ids[int(element_id.rsplit('_', 1)[-1])] = element_id
+        except ValueError:
+            abort(400)
+    query = TastingNote.query.options(load_only('id', 'text')).filter(
+        TastingNote.id.in_(ids)
+    )
+    # notes that actor can not see are skipped
+    user = current_user if current_user.is_authenticated else None
+    query = public_or_owner(query, user, TastingNote)
+    texts = {ids[note.id]: (note.id, note.text) for note in query}
+    if not texts:
+        abort(404)
+    return texts
+
+
+def _note_texts(element_ids):
+    limit = current_app.config['NOTE_TEXT_BATCH_LIMIT']
+    if not element_ids or len(element_ids) > limit:
+        abort(400)
+    texts = {
+        key: text for key, (_, text) in _visible_texts(element_ids).items()
+    }
+    validators = data_validators(*[
+        (key, hashlib.sha1(text.encode('utf-8')).hexdigest())
+        for key, text in sorted(texts.items())
+    ])
+    response = not_modified(validators)
+    if response is not None:
+        return response
+    return conditional(jsonify(texts), validators)
+
+
 @tasting_bp.route('/ajaxtext', endpoint='loadtext')
 def brew_load_tasting_note_text():
+    # batch of notes is returned as JSON object keyed by element id
+    requested = request.args.get('ids')
+    if requested is not None:
+        return _note_texts([value for value in requested.split(',') if value])
     provided_id = request.args.get('id')
     if not provided_id:
         abort(400)
-    note_id = provided_id.rsplit('_', 1)[-1]
-    note = TastingNote.query.get_or_404(note_id)
-    return note.text
+    [(note_id, text)] = _visible_texts([provided_id]).values()
+    validators = data_validators(
+        note_id, hashlib.sha1(text.encode('utf-8')).hexdigest()
+    )
+    response = not_modified(validators)
+    if response is not None:
+        return response
+    return conditional(text, validators)
 
 
 @tasting_bp.route('/ajaxupdate', methods=['POST'], endpoint='update')
@@ -96,5 +171,4 @@ def brew_update_tasting_note():
         note.text = value
         db.session.add(note)
         db.session.commit()
-        return markdown.markdown(value)
     return note.text_html
@@ -8,6 +8,14 @@ from .utils.brewing import plato2sg
 from .utils.pagination import url_for_other_page
 from .utils.text import stars2deg
 
+STATE_BADGES = {
+    'planned': 'light',
+    'fermenting': 'warning',
+    'maturing': 'info',
+    'tapped': 'success',
+    'finished': 'secondary',
+}
+
 
 def setup_globals(application: Brewlog):
     application.jinja_env.globals.update({
@@ -15,6 +23,7 @@ def setup_globals(application: Brewlog):
         'pow': math.pow,
         'stars2deg': stars2deg,
         'plato2sg': plato2sg,
+        'state_badges': STATE_BADGES,
         'url_for_other_page': url_for_other_page,
         'version': get_version(),
     })
@@ -0,0 +1,59 @@
+from typing import Callable, Hashable, Iterable, Set
+
+from flask import has_app_context
+
+from ..ext import db
+
+
+def changed(target, attr_names: Iterable[str]) -> bool:
+    """Check if any of attributes of object has been changed.
+
+    :param target: mapped object
+    :param attr_names: names of attributes
+    :type attr_names: Iterable[str]
+    :return: True if any attribute has history of changes
+    :rtype: bool
+    """
+    attrs = db.inspect(target).attrs
+    return any(attrs[name].history.has_changes() for name in attr_names)
+
+
+def mark_dirty(target, key: str, values: Iterable[Hashable]):
+    """Collect values in session of object, to be passed to function
+    registered with :func:`after_commit` for the same key. Objects that are
+    not attached to session are ignored.
+
+    :param target: mapped object
+    :param key: name of collection in session info
+    :type key: str
+    :param values: values to collect, None values are skipped
+    :type values: Iterable[Hashable]
+    """
+    session = db.inspect(target).session
+    if session is not None:
+        session.info.setdefault(key, set()).update(
+            value for value in values if value is not None
+        )
+
+
+def after_commit(key: str, func: Callable[[Set], None]):
+    """Register function to be called with values collected by
+    :func:`mark_dirty` after transaction is committed. Values collected in
+    transaction that has been rolled back are discarded.
+
+    :param key: name of collection in session info
+    :type key: str
+    :param func: function called with set of values within app context
+    :type func: Callable[[Set], None]
+    """
+
+    def session_post_commit(session):
+        values = session.info.pop(key, None)
+        if values and has_app_context():
+            func(values)
+
+    def session_post_rollback(session):
+        session.info.pop(key, None)
+
+    db.event.listen(db.session, 'after_commit', session_post_commit)
+    db.event.listen(db.session, 'after_rollback', session_post_rollback)
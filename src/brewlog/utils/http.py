@@ -0,0 +1,145 @@
+import datetime
+import hashlib
+import time
+from typing import Any, Optional, Tuple
+
+from flask import Response, current_app, request, session
+from flask_babel import get_locale
+from flask_login import current_user
+
+from .._version import get_version
+
+Validators = Tuple[str, Optional[datetime.datetime]]
+
+
+def make_etag(*parts: Any) -> str:
+    """Calculate entity tag from parts, includes application version so
+    validators change when templates do.
+
+    :return: entity tag value
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for part in (get_version(), *parts):
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def viewer_parts() -> Tuple:
+    """Parts of validator that identify viewer. Pages rendered for
+    authenticated users embed CSRF tokens that expire, so time bucket
+    shorter than token validity is included too.
+
+    :return: tuple of viewer specific values
+    :rtype: Tuple
+    """
+    parts = [str(get_locale())]
+    if current_user.is_authenticated:
+        parts.extend([current_user.id, current_user.updated])
+        if current_app.config.get('WTF_CSRF_ENABLED', True):
+            time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600
+            parts.append(int(time.time() // max(time_limit // 2, 1)))
+    else:
+        parts.append(None)
+    return tuple(parts)
+
+
+def _cacheable() -> bool:
+    # responses rendered with flashed messages must not be reused
+    return request.method in ('GET', 'HEAD') and not session.get('_flashes')
+
+
+def page_validators(*objs: Any) -> Optional[Validators]:
+    """Calculate validators of page that displays objects, from their
+    modification (or creation) timestamps and viewer identity. Returns None
+    if response to current request should not be conditional.
+
+    :return: entity tag and last modification time
+    :rtype: Optional[Validators]
+    """
+    if not _cacheable():
+        return None
+    stamps = [
+        getattr(obj, 'updated', None) or getattr(obj, 'created', None)
+        for obj in objs
+    ]
+    parts = [(type(obj).__name__, obj.id, stamp) for obj, stamp in zip(objs, stamps)]
+    known = [stamp for stamp in stamps if stamp is not None]
+    last_modified = None
+    if known and len(known) == len(stamps):
+        last_modified = max(known)
+    return make_etag(*parts, *viewer_parts()), last_modified
+
+
+def data_validators(*parts: Any) -> Optional[Validators]:
+    """Calculate validators of viewer specific data identified by parts.
+
+    :return: entity tag and no last modification time
+    :rtype: Optional[Validators]
+    """
+    if not _cacheable():
+        return None
+    return make_etag(*parts, *viewer_parts()), None
+
+
+def not_modified(validators: Optional[Validators]) -> Optional[Response]:
+    """Check request validators, returns ``304 Not Modified`` response if
+    client copy is still valid and None otherwise.
+
+    :param validators: current validators, may be None
+    :type validators: Optional[Validators]
+    :return: response or None
+    :rtype: Optional[Response]
+    """
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    matched = False
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif (
+        request.if_modified_since and last_modified is not None
+        and current_user.is_anonymous
+    ):
+        # last modification time does not account for viewer identity
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since
+    if not matched:
+        return None
+    return set_validators(Response(status=304), validators)
+
+
+def set_validators(response: Response, validators: Validators) -> Response:
+    """Attach validators to response. Responses depend on viewer so they
+    may be cached only privately and have to be revalidated.
+
+    :param response: response object
+    :type response: Response
+    :param validators: entity tag and last modification time
+    :type validators: Validators
+    :return: response with validators set
+    :rtype: Response
+    """
+    etag, last_modified = validators
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def conditional(rv: Any, validators: Optional[Validators]) -> Response:
+    """Convert view return value to response with validators attached.
+
+    :param rv: anything view function may return
+    :param validators: validators, may be None
+    :type validators: Optional[Validators]
+    :return: response object
+    :rtype: Response
+    """
+    response = current_app.make_response(rv)
+    if validators is not None:
+        set_validators(response, validators)
+    return response
@@ -0,0 +1,177 @@
+import json
+import time
+from typing import Optional
+
+from flask import Response, current_app, g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy.engine import Engine
+
+from ..ext import db
+from .app import Brewlog
+
+_STATS_ATTR = 'request_stats'
+_START_KEY = 'query_start'
+
+# statement text in log lines is cut at this length
+STATEMENT_MAX_LENGTH = 1000
+
+
+class RequestStats:
+    """Counters of database statements and template rendering time collected
+    during single request. Rendering time includes time of statements issued
+    while template is rendered (eg. lazy loads).
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.worst_statement = None
+        self.worst_time = 0.0
+
+    def add_query(self, statement: str, duration: float):
+        self.query_count += 1
+        self.query_time += duration
+        if self.worst_statement is None or duration > self.worst_time:
+            self.worst_statement = statement
+            self.worst_time = duration
+
+    def add_template(self, duration: float):
+        self.template_time += duration
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self, elapsed: float) -> str:
+        """Format ``Server-Timing`` header value, durations in milliseconds.
+
+        :param elapsed: total request time in seconds
+        :type elapsed: float
+        :return: header value
+        :rtype: str
+        """
+        return ', '.join([
+            f'db;dur={self.query_time * 1000:.1f};desc="{self.query_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ])
+
+    def summary(self, elapsed: float) -> dict:
+        """Collected data in form suitable for structured logging.
+
+        :param elapsed: total request time in seconds
+        :type elapsed: float
+        :return: mapping of values
+        :rtype: dict
+        """
+        statement = self.worst_statement
+        if statement is not None:
+            statement = ' '.join(statement.split())[:STATEMENT_MAX_LENGTH]
+        return {
+            'event': 'slow_request',
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'duration_ms': round(elapsed * 1000, 1),
+            'query_count': self.query_count,
+            'query_ms': round(self.query_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'worst_statement': statement,
+            'worst_statement_ms': round(self.worst_time * 1000, 1),
+        }
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Statistics of request being processed.
+
+    :return: stats object or None if outside of request
+    :rtype: Optional[RequestStats]
+    """
+    if has_request_context():
+        return g.get(_STATS_ATTR)
+    return None
+
+
+class TimedTemplate(Template):
+    """Template that adds its rendering time to request statistics. Only
+    top level rendering is measured, included and extended templates are
+    rendered as part of it.
+    """
+
+    def render(self, *args, **kwargs) -> str:
+        stats = current_stats()
+        if stats is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats.add_template(time.perf_counter() - start)
+
+
+def _is_slow(stats: RequestStats, elapsed: float) -> bool:
+    max_queries = current_app.config.get('SLOW_REQUEST_QUERY_COUNT', 0)
+    max_time = current_app.config.get('SLOW_REQUEST_TIME', 0)
+    return (
+        (max_queries > 0 and stats.query_count > max_queries)
+        or (max_time > 0 and elapsed > max_time)
+    )
+
+
+def start_request():
+    setattr(g, _STATS_ATTR, RequestStats())
+
+
+def finish_request(response: Response) -> Response:
+    stats = current_stats()
+    if stats is None:
+        return response
+    elapsed = stats.elapsed
+    if current_app.debug or current_app.config.get('SERVER_TIMING_HEADER', False):
+        response.headers['Server-Timing'] = stats.server_timing(elapsed)
+    if _is_slow(stats, elapsed):
+        current_app.logger.warning(json.dumps(stats.summary(elapsed)))
+    return response
+
+
+def teardown_request(exc):
+    g.pop(_STATS_ATTR, None)
+
+
+def setup_instrumentation(application: Brewlog):
+    """Install request hooks that collect statistics. Should be called
+    before other request hooks are registered so they are accounted for.
+
+    :param application: application object
+    :type application: Brewlog
+    """
+    application.jinja_env.template_class = TimedTemplate
+    application.before_request(start_request)
+    application.after_request(finish_request)
+    application.teardown_request(teardown_request)
+
+
+# events: engine (statement timing)
+def engine_pre_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def engine_post_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    starts = conn.info.get(_START_KEY)
+    if stats is not None and starts:
+        stats.add_query(statement, time.perf_counter() - starts.pop())
+
+
+def engine_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_START_KEY):
+        conn.info[_START_KEY].pop()
+
+
+db.event.listen(Engine, 'before_cursor_execute', engine_pre_execute)
+db.event.listen(Engine, 'after_cursor_execute', engine_post_execute)
+db.event.listen(Engine, 'handle_error', engine_error)
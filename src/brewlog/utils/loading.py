@@ -0,0 +1,135 @@
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+from flask_sqlalchemy import BaseQuery
+from sqlalchemy import inspect
+from sqlalchemy.orm import Load, joinedload, load_only, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+# Loader profiles map profile name to sequence of (strategy, path) pairs. Path
+# is dotted chain of relationship names relative to queried entity, each
+# segment is loaded with strategy declared for its prefix in the same profile
+# or with strategy of the entry itself. Strategy "only" takes space separated
+# column names instead of path.
+LOADER_PROFILES: Mapping[str, Tuple[Tuple[str, str], ...]] = {
+    'brew.list': (
+        ('joined', 'brewery.brewer'),
+    ),
+    'brew.details': (
+        ('joined', 'brewery.brewer'),
+        ('selectin', 'fermentation_step_list'),
+    ),
+    'brewery.list': (
+        ('joined', 'brewer'),
+    ),
+    'brewery.details': (
+        ('joined', 'brewer'),
+    ),
+    'note.list': (
+        ('joined', 'author'),
+        ('joined', 'brew.brewery.brewer'),
+    ),
+    'note.brew': (
+        ('joined', 'author'),
+    ),
+    'profile.list': (
+        ('only', 'id nick first_name last_name full_name is_public created updated'),
+    ),
+    'profile.details': (
+        ('selectin', 'brewery_list'),
+    ),
+}
+
+_STRATEGIES = {
+    'joined': (joinedload, 'joinedload'),
+    'selectin': (selectinload, 'selectinload'),
+}
+
+
+def _build_options(entity, entries: Iterable[Tuple[str, str]]) -> List[Load]:
+    declared = {}
+    options = []
+    for strategy, path in entries:
+        if strategy == 'only':
+            options.append(load_only(*path.split()))
+            continue
+        option = None
+        cls = entity
+        segments = path.split('.')
+        for num, name in enumerate(segments):
+            prefix = '.'.join(segments[:num + 1])
+            seg_strategy = declared.setdefault(prefix, strategy)
+            loader_fn, method_name = _STRATEGIES[seg_strategy]
+            attr = getattr(cls, name)
+            if option is None:
+                option = loader_fn(attr)
+            else:
+                option = getattr(option, method_name)(attr)
+            cls = attr.property.mapper.class_
+        options.append(option)
+    return options
+
+
+def loader_options(entity, profile: str) -> List[Load]:
+    """Build loader options for entity from named profile.
+
+    :param entity: mapped class that is the primary entity of query
+    :param profile: loader profile name
+    :type profile: str
+    :return: list of loader options
+    :rtype: List[Load]
+    """
+    return _build_options(entity, LOADER_PROFILES[profile])
+
+
+def load_relationships(instance, profile: str) -> None:
+    """Load relationships from named profile for object that has been already
+    loaded, eg. for permission check. Each top level relationship that is not
+    loaded yet is fetched with single query, with its nested paths loaded
+    by that query, so object does not have to be queried again with loader
+    options. Relationships already loaded are left untouched. Column
+    restrictions ("only" entries) do not apply to loaded object and are
+    ignored.
+
+    :param instance: persistent mapped object
+    :param profile: loader profile name
+    :type profile: str
+    """
+    state = inspect(instance)
+    nested = {}
+    for strategy, path in LOADER_PROFILES[profile]:
+        if strategy == 'only':
+            continue
+        name, _, rest = path.partition('.')
+        entries = nested.setdefault(name, [])
+        if rest:
+            entries.append((strategy, rest))
+    for name, entries in nested.items():
+        if name not in state.unloaded:
+            continue
+        prop = state.mapper.relationships[name]
+        target = prop.mapper.class_
+        query = state.session.query(target).with_parent(instance, name).options(
+            *_build_options(target, entries)
+        )
+        if prop.order_by:
+            query = query.order_by(*prop.order_by)
+        value = query.all() if prop.uselist else query.first()
+        set_committed_value(instance, name, value)
+
+
+def with_loading(query: BaseQuery, profile: Optional[str]) -> BaseQuery:
+    """Apply loader profile to query. Query has to have mapped class as its
+    first entity, profile may be None in which case query is returned
+    unchanged.
+
+    :param query: query to apply loader options to
+    :type query: BaseQuery
+    :param profile: loader profile name
+    :type profile: Optional[str]
+    :return: query with loader options applied
+    :rtype: BaseQuery
+    """
+    if profile is None:
+        return query
+    entity = query.column_descriptions[0]['entity']
+    return query.options(*loader_options(entity, profile))
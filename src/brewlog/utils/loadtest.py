@@ -0,0 +1,446 @@
+"""Load test harness replaying weighted mix of page views, either against
+application in-process (through WSGI test client) or against running server
+over HTTP.
+
+Traffic is generated by workers running in thread or process pool. Each
+worker acts as one anonymous and (optionally) one logged in visitor and in
+loop picks scenario according to mix weights until time runs out. Only
+read-only requests are made so tests can be repeated on the same data.
+"""
+import html
+import random
+import re
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import requests
+from flask import current_app, url_for
+
+from ..ext import db
+from ..models import Brew, BrewerProfile, TastingNote
+
+# scenario name -> weight
+DEFAULT_MIX = {
+    'home': 25,
+    'brew_list': 15,
+    'typeahead': 15,
+    'brew_details': 35,
+    'note_text': 10,
+}
+
+# pages of brew list visited by single visitor at most
+MAX_LIST_DEPTH = 10
+
+# characters typed in single typeahead burst at most
+MAX_TYPED = 6
+
+HTTP_TIMEOUT = 30
+
+_csrf_re = re.compile(r'name="csrf_token"[^>]*value="([^"]*)"')
+_cursor_link_re = re.compile(r'href="([^"]*[?&](?:amp;)?c=[^"]*)"')
+
+
+@dataclass
+class Plan:
+    """Paths and credentials used by workers, loaded from database before
+    test starts.
+    """
+    home: str
+    brew_list: str
+    brew_search: str
+    login: str
+    brews: List[str]
+    notes: List[str]
+    terms: List[str]
+    credentials: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Settings:
+    """Load test parameters.
+
+    :param duration: test duration in seconds
+    :type duration: float
+    :param mix: mapping of scenario name to its weight
+    :type mix: Mapping[str, float]
+    :param auth_ratio: fraction of scenarios run by logged in visitor
+    :type auth_ratio: float
+    :param password: password of visitors that log in
+    :type password: Optional[str]
+    :param base_url: server address, None to run application in-process
+    :type base_url: Optional[str]
+    :param seed: random generator seed
+    :type seed: int
+    """
+    duration: float = 30
+    mix: Mapping[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    auth_ratio: float = 0.2
+    password: Optional[str] = None
+    base_url: Optional[str] = None
+    seed: int = 42
+
+
+# request label, HTTP status (0 if request failed), latency in milliseconds
+Sample = Tuple[str, int, float]
+
+
+def build_plan(sample_size: int = 500, seed: int = 42) -> Plan:
+    """Select objects requested during load test. Needs application context.
+
+    :param sample_size: max number of objects of each kind
+    :type sample_size: int
+    :param seed: random generator seed
+    :type seed: int
+    :return: load test plan
+    :rtype: Plan
+    """
+    rng = random.Random(seed)
+
+    def sample(query):
+        values = [value for (value,) in query]
+        return rng.sample(values, min(sample_size, len(values)))
+
+    brew_ids = sample(
+        db.session.query(Brew.id).filter(Brew.effectively_public.is_(True))
+        .order_by(Brew.id)
+    )
+    note_ids = sample(
+        db.session.query(TastingNote.id)
+        .filter(TastingNote.effectively_public.is_(True)).order_by(TastingNote.id)
+    )
+    names = sample(
+        db.session.query(Brew.name).filter(Brew.effectively_public.is_(True))
+        .order_by(Brew.id)
+    )
+    emails = sample(
+        db.session.query(BrewerProfile.email).filter(
+            BrewerProfile.email.isnot(None), BrewerProfile.password != 'unset',
+        ).order_by(BrewerProfile.id)
+    )
+    with current_app.test_request_context():
+        return Plan(
+            home=url_for('home.index'),
+            brew_list=url_for('brew.all'),
+            brew_search=url_for('brew.search'),
+            login=url_for('auth.select'),
+            brews=[url_for('brew.details', brew_id=brew_id) for brew_id in brew_ids],
+            notes=[
+                url_for('tastingnote.loadtext', id=f'note_text_{note_id}')
+                for note_id in note_ids
+            ],
+            terms=[name.lower() for name in names],
+            credentials=emails,
+        )
+
+
+class WSGIClient:
+    """Client making requests to application object, with cookies.
+
+    :param app: application object
+    :type app: Brewlog
+    """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(
+                self, method: str, path: str, data: Optional[dict] = None,
+            ) -> Tuple[int, str, Optional[str]]:
+        rv = self.client.open(path, method=method, data=data)
+        return rv.status_code, rv.get_data(as_text=True), rv.headers.get('Location')
+
+
+class HTTPClient:
+    """Client making requests to server over HTTP, with cookies.
+
+    :param base_url: server address
+    :type base_url: str
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(
+                self, method: str, path: str, data: Optional[dict] = None,
+            ) -> Tuple[int, str, Optional[str]]:
+        rv = self.session.request(
+            method, f'{self.base_url}{path}', data=data, allow_redirects=False,
+            timeout=HTTP_TIMEOUT,
+        )
+        return rv.status_code, rv.text, rv.headers.get('Location')
+
+
+class Visitor:
+    """Single visitor making requests and recording their latency.
+
+    :param client: HTTP or WSGI client
+    :param samples: list where samples are appended
+    :type samples: List[Sample]
+    """
+
+    def __init__(self, client, samples: List[Sample]):
+        self.client = client
+        self.samples = samples
+
+    def request(
+                self, label: str, path: str, method: str = 'GET',
+                data: Optional[dict] = None,
+            ) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            status, text, _ = self.client.request(method, path, data)
+        except Exception:
+            status, text = 0, None
+        self.samples.append((label, status, (time.perf_counter() - started) * 1000))
+        if status >= 400:
+            return None
+        return text
+
+    def login(self, plan: Plan, email: str, password: str) -> bool:
+        page = self.request('auth.select', plan.login)
+        data = {'userid': email, 'password': password}
+        match = _csrf_re.search(page or '')
+        if match:
+            data['csrf_token'] = html.unescape(match.group(1))
+        started = time.perf_counter()
+        try:
+            status, _, location = self.client.request('POST', plan.login, data)
+        except Exception:
+            status, location = 0, None
+        # failed login redirects back to login page
+        logged_in = status == 302 and urlsplit(location or '').path != plan.login
+        if status == 302 and not logged_in:
+            status = 401
+        self.samples.append(
+            ('auth.login', status, (time.perf_counter() - started) * 1000)
+        )
+        return logged_in
+
+
+# scenarios
+def home(visitor: Visitor, plan: Plan, rng: random.Random):
+    visitor.request('home.index', plan.home)
+
+
+def brew_list(visitor: Visitor, plan: Plan, rng: random.Random):
+    # deep pages can only be reached by following cursor links
+    page = visitor.request('brew.all', plan.brew_list)
+    for _ in range(rng.randint(0, MAX_LIST_DEPTH - 1)):
+        links = _cursor_link_re.findall(page or '')
+        if not links:
+            break
+        page = visitor.request('brew.all (deep)', html.unescape(links[-1]))
+
+
+def typeahead(visitor: Visitor, plan: Plan, rng: random.Random):
+    # every keystroke fires request
+    if not plan.terms:
+        return
+    term = rng.choice(plan.terms)
+    for length in range(1, min(len(term), MAX_TYPED) + 1):
+        visitor.request(
+            'brew.search', f'{plan.brew_search}?q={quote(term[:length])}'
+        )
+
+
+def brew_details(visitor: Visitor, plan: Plan, rng: random.Random):
+    if plan.brews:
+        visitor.request('brew.details', rng.choice(plan.brews))
+
+
+def note_text(visitor: Visitor, plan: Plan, rng: random.Random):
+    if plan.notes:
+        visitor.request('tastingnote.loadtext', rng.choice(plan.notes))
+
+
+SCENARIOS: Dict[str, Callable[[Visitor, Plan, random.Random], None]] = {
+    'home': home,
+    'brew_list': brew_list,
+    'typeahead': typeahead,
+    'brew_details': brew_details,
+    'note_text': note_text,
+}
+
+# application object of worker process, created once per process
+_process_app = None
+
+
+def _client_factory(settings: Settings, app=None, app_factory=None):
+    global _process_app
+    if settings.base_url:
+        return lambda: HTTPClient(settings.base_url)
+    if app is None:
+        if _process_app is None:
+            _process_app = app_factory()
+        app = _process_app
+    return lambda: WSGIClient(app)
+
+
+def run_worker(
+            plan: Plan, settings: Settings, worker_num: int, app=None,
+            app_factory: Optional[Callable] = None,
+        ) -> List[Sample]:
+    """Replay traffic mix until test duration elapses.
+
+    :param plan: load test plan
+    :type plan: Plan
+    :param settings: load test parameters
+    :type settings: Settings
+    :param worker_num: worker number, makes random choices differ
+    :type worker_num: int
+    :param app: application object requests are made to, for in-process
+                test in threads
+    :type app: Optional[Brewlog]
+    :param app_factory: function creating application object, for in-process
+                        test in worker processes
+    :type app_factory: Optional[Callable]
+    :return: list of samples
+    :rtype: List[Sample]
+    """
+    rng = random.Random(settings.seed * 1000 + worker_num)
+    samples = []
+    make_client = _client_factory(settings, app, app_factory)
+    anonymous = Visitor(make_client(), samples)
+    user = None
+    if settings.auth_ratio > 0 and plan.credentials:
+        user = Visitor(make_client(), samples)
+        if not user.login(plan, rng.choice(plan.credentials), settings.password):
+            user = None
+    names = list(settings.mix)
+    weights = [settings.mix[name] for name in names]
+    deadline = time.perf_counter() + settings.duration
+    while time.perf_counter() < deadline:
+        visitor = anonymous
+        if user is not None and rng.random() < settings.auth_ratio:
+            visitor = user
+        scenario = rng.choices(names, weights)[0]
+        SCENARIOS[scenario](visitor, plan, rng)
+    return samples
+
+
+def run(
+            plan: Plan, settings: Settings, workers: int = 4, processes: bool = False,
+            app=None, app_factory: Optional[Callable] = None,
+        ) -> Tuple[List[Sample], float]:
+    """Run load test in pool of workers.
+
+    :param plan: load test plan
+    :type plan: Plan
+    :param settings: load test parameters
+    :type settings: Settings
+    :param workers: number of concurrent workers
+    :type workers: int
+    :param processes: use process pool instead of thread pool
+    :type processes: bool
+    :param app: application object, for in-process test in threads
+    :type app: Optional[Brewlog]
+    :param app_factory: picklable function creating application object, for
+                        in-process test in processes
+    :type app_factory: Optional[Callable]
+    :return: samples of all workers and wall time in seconds
+    :rtype: Tuple[List[Sample], float]
+    """
+    kwargs = {}
+    if settings.base_url is None:
+        if processes:
+            kwargs['app_factory'] = app_factory
+        else:
+            kwargs['app'] = app
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    started = time.perf_counter()
+    with pool_class(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_worker, plan, settings, num, **kwargs)
+            for num in range(workers)
+        ]
+        samples = []
+        for future in futures:
+            samples.extend(future.result())
+    return samples, time.perf_counter() - started
+
+
+def percentile(values: List[float], pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _stats(samples: List[Sample], wall_time: float) -> dict:
+    latencies = sorted(elapsed for _, _, elapsed in samples)
+    statuses = Counter(status for _, status, _ in samples)
+    errors = sum(count for status, count in statuses.items() if not 0 < status < 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4),
+        'throughput': round(len(samples) / wall_time, 2),
+        'mean_ms': round(statistics.mean(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def summarize(samples: List[Sample], wall_time: float) -> Dict[str, dict]:
+    """Calculate throughput, latency percentiles and error rate of each kind
+    of request and of all requests.
+
+    :param samples: list of samples
+    :type samples: List[Sample]
+    :param wall_time: test duration in seconds
+    :type wall_time: float
+    :return: mapping of request label (``total`` for all requests) to stats
+    :rtype: Dict[str, dict]
+    """
+    by_label = {}
+    for sample in samples:
+        by_label.setdefault(sample[0], []).append(sample)
+    summary = {
+        label: _stats(label_samples, wall_time)
+        for label, label_samples in sorted(by_label.items())
+    }
+    if samples:
+        summary['total'] = _stats(samples, wall_time)
+    return summary
+
+
+def parse_mix(items) -> Dict[str, float]:
+    """Build traffic mix from default one and overrides.
+
+    :param items: iterable of ``scenario=weight`` strings
+    :raises ValueError: if item is malformed or scenario is not known
+    :return: mapping of scenario name to its weight
+    :rtype: Dict[str, float]
+    """
+    mix = dict(DEFAULT_MIX)
+    for item in items:
+        name, sep, weight = item.partition('=')
+        if not sep or name not in SCENARIOS:
+            raise ValueError(
+                f'expected scenario=weight, scenarios: {", ".join(SCENARIOS)}'
+            )
+        mix[name] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise ValueError('at least one scenario has to have positive weight')
+    return mix
+
+
+def format_report(summary: Dict[str, dict]) -> List[str]:
+    lines = [
+        f'{"request":24} {"count":>7} {"req/s":>8} {"errors":>7} '
+        f'{"p50":>8} {"p95":>8} {"p99":>8} {"max":>8}'
+    ]
+    for label, stats in summary.items():
+        lines.append(
+            f'{label:24} {stats["requests"]:7d} {stats["throughput"]:8.1f} '
+            f'{stats["error_rate"]:7.1%} {stats["p50_ms"]:8.1f} '
+            f'{stats["p95_ms"]:8.1f} {stats["p99_ms"]:8.1f} {stats["max_ms"]:8.1f}'
+        )
+    return lines
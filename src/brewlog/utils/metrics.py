@@ -0,0 +1,263 @@
+import atexit
+import functools
+import os
+import time
+from typing import Optional
+
+from flask import Response, abort, current_app, has_app_context, request
+from redis import Redis
+from rq import Queue
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+from ..ext import db
+from .app import Brewlog
+from .instrumentation import current_stats
+
+# environment variable that points to directory shared by worker processes,
+# its presence switches prometheus client to multi-process mode
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+def multiproc_dir() -> Optional[str]:
+    return os.environ.get(MULTIPROC_DIR_ENV) or os.environ.get(
+        MULTIPROC_DIR_ENV.lower()
+    )
+
+
+class QueueCollector:
+    """Collector of job queue state, values are read from Redis at scrape
+    time so they are the same in every process and are not aggregated.
+
+    :param queue: job queue
+    :type queue: Queue
+    """
+
+    def __init__(self, queue: Queue):
+        self.queue = queue
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+        depth = GaugeMetricFamily(
+            'brewlog_queue_jobs', 'Number of jobs waiting in queue', labels=['queue']
+        )
+        depth.add_metric([self.queue.name], self.queue.count)
+        failed = GaugeMetricFamily(
+            'brewlog_queue_failed_jobs', 'Number of failed jobs', labels=['queue']
+        )
+        failed.add_metric([self.queue.name], self.queue.failed_job_registry.count)
+        return [depth, failed]
+
+
+class Metrics:
+    """Prometheus metrics of application process. With multi-process
+    directory configured values are written to files there and export
+    aggregates values of all processes.
+
+    :param queue: job queue which state is exported, defaults to None
+    :type queue: Optional[Queue]
+    """
+
+    def __init__(self, queue: Optional[Queue] = None):
+        from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+        self.registry = CollectorRegistry()
+        self.live_registry = CollectorRegistry()
+        if queue is not None:
+            self.live_registry.register(QueueCollector(queue))
+        self.request_latency = Histogram(
+            'brewlog_request_duration_seconds', 'Request processing time',
+            ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.db_statements = Counter(
+            'brewlog_db_statements', 'Database statements executed',
+            ['endpoint'], registry=self.registry,
+        )
+        self.db_time = Counter(
+            'brewlog_db_statement_seconds', 'Time spent executing statements',
+            ['endpoint'], registry=self.registry,
+        )
+        self.db_statements_per_request = Histogram(
+            'brewlog_request_db_statements', 'Database statements per request',
+            ['endpoint'], buckets=STATEMENT_COUNT_BUCKETS, registry=self.registry,
+        )
+        self.pool_wait = Histogram(
+            'brewlog_db_pool_checkout_seconds',
+            'Time waiting for connection from pool', buckets=WAIT_BUCKETS,
+            registry=self.registry,
+        )
+        self.pool_size = Gauge(
+            'brewlog_db_pool_size', 'Configured connection pool size',
+            registry=self.registry, multiprocess_mode='livesum',
+        )
+        self.pool_checked_out = Gauge(
+            'brewlog_db_pool_checked_out', 'Connections checked out from pool',
+            registry=self.registry, multiprocess_mode='livesum',
+        )
+        self.redis_latency = Histogram(
+            'brewlog_redis_command_duration_seconds', 'Redis command round trip',
+            ['command'], buckets=WAIT_BUCKETS, registry=self.registry,
+        )
+        self.cache_lookups = Counter(
+            'brewlog_cache_lookups', 'Cache lookups by result',
+            ['cache', 'result'], registry=self.registry,
+        )
+
+    def observe_request(self, response: Response):
+        stats = current_stats()
+        if stats is None:
+            return
+        endpoint = request.endpoint or 'none'
+        self.request_latency.labels(
+            endpoint, request.method, str(response.status_code)
+        ).observe(stats.elapsed)
+        self.db_statements.labels(endpoint).inc(stats.query_count)
+        self.db_time.labels(endpoint).inc(stats.query_time)
+        self.db_statements_per_request.labels(endpoint).observe(stats.query_count)
+
+    def instrument_engine(self, engine):
+        """Track connection pool usage of database engine.
+
+        :param engine: database engine
+        :type engine: Engine
+        """
+        size = getattr(engine.pool, 'size', None)
+        if callable(size):
+            self.pool_size.set(size())
+
+        def checkout(dbapi_connection, connection_record, connection_proxy):
+            self.pool_checked_out.inc()
+
+        def checkin(dbapi_connection, connection_record):
+            self.pool_checked_out.dec()
+
+        db.event.listen(engine, 'checkout', checkout)
+        db.event.listen(engine, 'checkin', checkin)
+
+    def instrument_redis(self, redis: Redis):
+        """Time commands sent with Redis connection. Commands executed in
+        pipelines are not timed.
+
+        :param redis: Redis connection
+        :type redis: Redis
+        """
+        execute_command = redis.execute_command
+
+        @functools.wraps(execute_command)
+        def timed_execute_command(*args, **options):
+            start = time.perf_counter()
+            try:
+                return execute_command(*args, **options)
+            finally:
+                self.redis_latency.labels(str(args[0]).upper()).observe(
+                    time.perf_counter() - start
+                )
+
+        redis.execute_command = timed_execute_command
+
+    def export(self) -> bytes:
+        """Render metrics in Prometheus text format.
+
+        :return: exposition document
+        :rtype: bytes
+        """
+        from prometheus_client import CollectorRegistry, generate_latest
+        from prometheus_client.multiprocess import MultiProcessCollector
+        registry = self.registry
+        path = multiproc_dir()
+        if path:
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry, path=path)
+        return generate_latest(registry) + generate_latest(self.live_registry)
+
+
+def get_metrics() -> Optional[Metrics]:
+    if has_app_context():
+        return getattr(current_app, 'metrics', None)
+    return None
+
+
+def cache_lookup(cache: str, hit: bool):
+    """Count cache lookup, does nothing if metrics are disabled.
+
+    :param cache: cache name
+    :type cache: str
+    :param hit: True if value has been found in cache
+    :type hit: bool
+    """
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.cache_lookups.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+class TimedQueuePool(QueuePool):
+    """Connection pool that reports time spent waiting for connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics = get_metrics()
+            if metrics is not None:
+                metrics.pool_wait.observe(time.perf_counter() - start)
+
+
+def _scrape_allowed() -> bool:
+    allowed_addrs = current_app.config.get('METRICS_ALLOWED_ADDRS')
+    if allowed_addrs and request.remote_addr not in allowed_addrs:
+        return False
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        auth = request.headers.get('Authorization', '')
+        return auth == f'Bearer {token}'
+    return True
+
+
+def metrics_view():
+    if not _scrape_allowed():
+        abort(403)
+    from prometheus_client import CONTENT_TYPE_LATEST
+    return Response(current_app.metrics.export(), content_type=CONTENT_TYPE_LATEST)
+
+
+def _observe_request(response: Response) -> Response:
+    current_app.metrics.observe_request(response)
+    return response
+
+
+def _mark_process_dead():
+    from prometheus_client import multiprocess
+    path = multiproc_dir()
+    if path:
+        multiprocess.mark_process_dead(os.getpid(), path)
+
+
+def setup_metrics(application: Brewlog):
+    """Create metrics and register ``/metrics`` endpoint if enabled in
+    configuration. Needs to be called in application context after Redis
+    connection and job queue are set up.
+
+    :param application: application object
+    :type application: Brewlog
+    """
+    if not application.config.get('METRICS_ENABLED'):
+        return
+    url = make_url(application.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite':
+        application.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).setdefault(
+            'poolclass', TimedQueuePool
+        )
+    metrics = Metrics(application.queue)
+    metrics.instrument_engine(db.get_engine(application))
+    metrics.instrument_redis(application.redis)
+    application.metrics = metrics
+    application.after_request(_observe_request)
+    application.add_url_rule('/metrics', 'metrics', metrics_view)
+    if multiproc_dir():
+        # livesum gauges of exited worker have to be removed
+        atexit.register(_mark_process_dead)
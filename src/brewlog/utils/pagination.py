@@ -1,9 +1,24 @@
-from flask import request, url_for
+import datetime
+from typing import Any, List, Optional, Sequence, Tuple, Union
 
+from flask import current_app, request, url_for
+from flask_sqlalchemy import BaseQuery
+from itsdangerous.exc import BadSignature
+from itsdangerous.url_safe import URLSafeSerializer
 
-def url_for_other_page(page):
+from ..ext import db
+from .query import fetch_ordered
+
+DIRECTION_NEXT = 'n'
+DIRECTION_PREV = 'p'
+
+
+def url_for_other_page(page=None, cursor=None):
     args = request.view_args.copy()
-    args['p'] = page
+    if cursor is not None:
+        args['c'] = cursor
+    else:
+        args['p'] = page
     return url_for(request.endpoint, **args)
 
 
@@ -12,3 +27,119 @@ def get_page(request, arg_name='p'):
         return int(request.args.get(arg_name, '1'))
     except ValueError:
         return 1
+
+
+def get_cursor(request, arg_name='c'):
+    return request.args.get(arg_name) or None
+
+
+class KeysetPagination:
+    """Cursor based pagination over query ordered by set of columns. The last
+    ordering column has to be unique (usually primary key) and none of
+    ordering columns may contain NULL values. Cursors are opaque signed tokens
+    carrying ordering key of boundary item and direction.
+
+    Query may be given as sequence of disjoint queries (see
+    :func:`~brewlog.utils.query.public_and_owned`), pages are then merged
+    from separately limited results of each.
+
+    :param query: query or sequence of queries to paginate, their ordering
+                  is replaced
+    :type query: Union[BaseQuery, Sequence[BaseQuery]]
+    :param ordering: sequence of (column, descending) pairs
+    :type ordering: Sequence[Tuple[Any, bool]]
+    :param cursor: cursor token, None for first page
+    :type cursor: Optional[str]
+    :param per_page: page size
+    :type per_page: int
+    """
+
+    keyset = True
+
+    def __init__(
+                self, query: Union[BaseQuery, Sequence[BaseQuery]],
+                ordering: Sequence[Tuple[Any, bool]],
+                cursor: Optional[str] = None, per_page: int = 20,
+            ):
+        self.query = query
+        self.ordering = ordering
+        self.per_page = per_page
+        self.has_prev = self.has_next = False
+        key, direction = self._decode(cursor)
+        reverse = direction == DIRECTION_PREV
+        queries = query if isinstance(query, (list, tuple)) else [query]
+        if key is not None:
+            seek = self._seek_clause(key, reverse)
+            queries = [q.filter(seek) for q in queries]
+        items = fetch_ordered(queries, ordering, per_page + 1, reverse)
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        if reverse:
+            items.reverse()
+            self.has_prev = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_prev = key is not None
+        self.items = items
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        if self.has_next and self.items:
+            return self._encode(self.items[-1], DIRECTION_NEXT)
+
+    @property
+    def prev_cursor(self) -> Optional[str]:
+        if self.has_prev and self.items:
+            return self._encode(self.items[0], DIRECTION_PREV)
+
+    @staticmethod
+    def _serializer() -> URLSafeSerializer:
+        return URLSafeSerializer(
+            current_app.config['SECRET_KEY'], salt='keyset-pagination'
+        )
+
+    def _seek_clause(self, key: Sequence, reverse: bool):
+        alternatives = []
+        for num, (column, descending) in enumerate(self.ordering):
+            equal = [
+                prev_column == key[pos]
+                for pos, (prev_column, _) in enumerate(self.ordering[:num])
+            ]
+            if descending != reverse:
+                alternatives.append(db.and_(*equal, column < key[num]))
+            else:
+                alternatives.append(db.and_(*equal, column > key[num]))
+        return db.or_(*alternatives)
+
+    def _encode(self, item, direction: str) -> str:
+        key = []
+        for column, _ in self.ordering:
+            value = getattr(item, column.key)
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            key.append(value)
+        return self._serializer().dumps({'k': key, 'd': direction})
+
+    def _decode(self, cursor: Optional[str]) -> Tuple[Optional[List], str]:
+        if not cursor:
+            return None, DIRECTION_NEXT
+        try:
+            payload = self._serializer().loads(cursor)
+            raw_key = payload['k']
+            direction = payload['d']
+            if len(raw_key) != len(self.ordering):
+                raise ValueError('key length mismatch')
+            key = []
+            for (column, _), value in zip(self.ordering, raw_key):
+                python_type = column.type.python_type
+                if python_type is datetime.datetime:
+                    value = datetime.datetime.fromisoformat(value)
+                elif python_type is datetime.date:
+                    value = datetime.date.fromisoformat(value)
+                key.append(value)
+        except (BadSignature, KeyError, TypeError, ValueError):
+            return None, DIRECTION_NEXT
+        if direction not in (DIRECTION_NEXT, DIRECTION_PREV):
+            direction = DIRECTION_NEXT
+        return key, direction
@@ -1,34 +1,141 @@
-from typing import Optional
+from functools import cmp_to_key
+from itertools import chain
+from typing import Any, List, Optional, Sequence, Tuple, Type, Union
 
 from flask import url_for
 from flask_sqlalchemy import BaseQuery
 
 from ..ext import db
-from ..models import Brew, BrewerProfile
+from ..models import Brew, BrewerProfile, Brewery, TastingNote
 
 
-def public_or_owner(query: BaseQuery, user: Optional[BrewerProfile]) -> BaseQuery:
-    """Filter Brew query of all non-accessible objects.
+def public_or_owner(
+            query: BaseQuery, user: Optional[BrewerProfile],
+            model: Type[Union[Brew, TastingNote]] = Brew,
+        ) -> BaseQuery:
+    """Filter Brew or TastingNote query of all non-accessible objects. Uses
+    denormalized visibility flag so query does not need any joins.
 
-    :param query: query over Brew objects
+    :param query: query over Brew or TastingNote objects
     :type query: BaseQuery
     :param user: actor object, may be None
     :type user: Optional[BrewerProfile]
+    :param model: queried model, defaults to Brew
+    :type model: Type[Union[Brew, TastingNote]]
     :return: filtered query
     :rtype: BaseQuery
     """
+    public = model.effectively_public.is_(True)
+    if user is None:
+        return query.filter(public)
+    return query.filter(db.or_(public, _owned(user, model)))
+
+
+def _owned(user: BrewerProfile, model: Type[Union[Brew, TastingNote]]):
+    owned_breweries = db.select([Brewery.id]).where(Brewery.brewer_id == user.id)
+    if model is Brew:
+        return Brew.brewery_id.in_(owned_breweries)
+    return model.brew_id.in_(
+        db.select([Brew.id]).where(Brew.brewery_id.in_(owned_breweries))
+    )
+
+
+def public_and_owned(
+            query: BaseQuery, user: Optional[BrewerProfile],
+            model: Type[Union[Brew, TastingNote]] = Brew,
+        ) -> List[BaseQuery]:
+    """Split Brew or TastingNote query into disjoint queries of public
+    objects and of non-public objects owned by user. Unlike single query with
+    alternative of both conditions each of them can be ordered and limited
+    using index, so results should be fetched with :func:`fetch_ordered`.
+
+    :param query: query over Brew or TastingNote objects
+    :type query: BaseQuery
+    :param user: actor object, may be None
+    :type user: Optional[BrewerProfile]
+    :param model: queried model, defaults to Brew
+    :type model: Type[Union[Brew, TastingNote]]
+    :return: list of queries
+    :rtype: List[BaseQuery]
+    """
+    queries = [query.filter(model.effectively_public.is_(True))]
     if user is not None:
-        query = query.filter(
-            db.or_(
-                BrewerProfile.id == user.id,
-                db.and_(BrewerProfile.is_public.is_(True), Brew.is_public.is_(True))
-            )
-        )
-    else:
-        query = query.filter(
-            BrewerProfile.is_public.is_(True), Brew.is_public.is_(True)
-        )
-    return query
+        queries.append(query.filter(
+            model.effectively_public.isnot(True), _owned(user, model)
+        ))
+    return queries
+
+
+def order_clauses(ordering: Sequence[Tuple[Any, bool]], reverse: bool = False):
+    """ORDER BY clauses for sequence of (column, descending) pairs.
+
+    :param ordering: sequence of (column, descending) pairs
+    :type ordering: Sequence[Tuple[Any, bool]]
+    :param reverse: reverse direction of all columns, defaults to False
+    :type reverse: bool
+    :return: list of clauses
+    :rtype: list
+    """
+    clauses = []
+    for column, descending in ordering:
+        if descending != reverse:
+            clauses.append(db.desc(column))
+        else:
+            clauses.append(column)
+    return clauses
+
+
+def _sort_key(ordering: Sequence[Tuple[Any, bool]], reverse: bool):
+
+    def compare(left, right) -> int:
+        for column, descending in ordering:
+            left_value = getattr(left, column.key)
+            right_value = getattr(right, column.key)
+            if left_value == right_value:
+                continue
+            # NULL sorts first, same as in SQLite
+            if left_value is None or (
+                right_value is not None and left_value < right_value
+            ):
+                result = -1
+            else:
+                result = 1
+            if descending != reverse:
+                result = -result
+            return result
+        return 0
+
+    return cmp_to_key(compare)
+
+
+def fetch_ordered(
+            queries: Sequence[BaseQuery], ordering: Sequence[Tuple[Any, bool]],
+            limit: int, reverse: bool = False,
+        ) -> List:
+    """Fetch first objects of union of disjoint queries. Each query is
+    ordered and limited separately and results are merged, so cost depends
+    on limit and not on number of rows matched by queries.
+
+    :param queries: queries over the same model
+    :type queries: Sequence[BaseQuery]
+    :param ordering: sequence of (column, descending) pairs, replaces
+                     ordering of queries
+    :type ordering: Sequence[Tuple[Any, bool]]
+    :param limit: max number of objects
+    :type limit: int
+    :param reverse: reverse direction of all columns, defaults to False
+    :type reverse: bool
+    :return: list of objects
+    :rtype: List
+    """
+    clauses = order_clauses(ordering, reverse)
+    results = [
+        query.order_by(None).order_by(*clauses).limit(limit).all()
+        for query in queries
+    ]
+    if len(results) == 1:
+        return results[0]
+    return sorted(chain(*results), key=_sort_key(ordering, reverse))[:limit]
 
 
 def search_result(query, endpoint, attr_name):
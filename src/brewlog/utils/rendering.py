@@ -0,0 +1,318 @@
+import datetime
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import markdown
+from flask import current_app, has_app_context
+from markupsafe import escape
+from redis import Redis
+
+from ..ext import db
+from .events import after_commit
+from .metrics import cache_lookup
+
+_TARGETS_KEY = 'markdown_targets'
+_JOBS_KEY = 'markdown_jobs'
+
+_paragraph_re = re.compile(r'\n\s*\n')
+
+# table without modification time -> (parent table, foreign key column) which
+# modification time is changed when html is rendered in background, so
+# conditional requests of pages that display it do not return stale html
+_TIMESTAMP_PARENTS = {
+    'tasting_note': ('brew', 'brew_id'),
+}
+
+
+def _python_markdown() -> Callable[[str], str]:
+    # converter instances are expensive to create but not thread safe
+    local = threading.local()
+
+    def render(text: str) -> str:
+        converter = getattr(local, 'converter', None)
+        if converter is None:
+            converter = local.converter = markdown.Markdown()
+        return converter.reset().convert(text)
+
+    return render
+
+
+def _markdown_it() -> Callable[[str], str]:
+    from markdown_it import MarkdownIt
+    return MarkdownIt('commonmark').render
+
+
+def _mistune() -> Callable[[str], str]:
+    import mistune
+    return mistune.create_markdown(escape=False)
+
+
+# name -> factory of rendering function, engines other than the default one
+# need optional packages installed
+ENGINES = {
+    'markdown': _python_markdown,
+    'markdown-it': _markdown_it,
+    'mistune': _mistune,
+}
+
+DEFAULT_ENGINE = 'markdown'
+
+
+def make_engine(name: str) -> Callable[[str], str]:
+    """Create rendering function of markdown engine.
+
+    :param name: engine name, one of :data:`ENGINES` keys
+    :type name: str
+    :raises ValueError: if engine is not known
+    :raises ImportError: if package engine needs is not installed
+    :return: function that converts markdown text to html
+    :rtype: Callable[[str], str]
+    """
+    try:
+        factory = ENGINES[name]
+    except KeyError:
+        raise ValueError(f'unknown markdown engine: {name}')
+    return factory()
+
+
+class MarkdownRenderer:
+    """Markdown rendering service with results cached under hash of source
+    text, first in per-process LRU and then in Redis (if provided).
+
+    :param redis: Redis connection, None for in-process cache only
+    :type redis: Optional[Redis]
+    :param ttl: Redis entry lifetime in seconds
+    :type ttl: int
+    :param local_size: max number of entries kept in process memory
+    :type local_size: int
+    :param async_threshold: min length of text rendered in background job,
+                            0 disables background rendering
+    :type async_threshold: int
+    :param engine: engine name
+    :type engine: str
+    :param engine_func: function that converts markdown text to html, by
+                        default created from engine name
+    :type engine_func: Optional[Callable[[str], str]]
+    """
+
+    def __init__(
+                self, redis: Optional[Redis] = None, ttl: int = 60 * 60 * 24 * 7,
+                local_size: int = 512, async_threshold: int = 0,
+                engine: str = DEFAULT_ENGINE,
+                engine_func: Optional[Callable[[str], str]] = None,
+            ):
+        self.redis = redis
+        self.ttl = ttl
+        self.local_size = local_size
+        self.async_threshold = async_threshold
+        self.engine_name = engine
+        self.engine = engine_func or make_engine(engine)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, text: str) -> str:
+        # engines differ in details of output so they do not share results
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return f'markdown:{self.engine_name}:{digest}'
+
+    def _local_set(self, key: str, html: str):
+        with self._lock:
+            self._local[key] = html
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def cached(self, text: str) -> Optional[str]:
+        """Get rendered text from cache.
+
+        :param text: markdown source
+        :type text: str
+        :return: html or None if text has not been rendered yet
+        :rtype: Optional[str]
+        """
+        html = self._lookup(text)
+        cache_lookup('markdown', html is not None)
+        return html
+
+    def _lookup(self, text: str) -> Optional[str]:
+        key = self.key(text)
+        with self._lock:
+            html = self._local.get(key)
+            if html is not None:
+                self._local.move_to_end(key)
+                return html
+        if self.redis is None:
+            return None
+        html = self.redis.get(key)
+        if html is None:
+            return None
+        html = html.decode('utf-8')
+        self._local_set(key, html)
+        return html
+
+    def render(self, text: str) -> str:
+        """Render text, using cached result if available.
+
+        :param text: markdown source
+        :type text: str
+        :return: html
+        :rtype: str
+        """
+        html = self.cached(text)
+        if html is None:
+            html = self.convert(text)
+        return html
+
+    def convert(self, text: str) -> str:
+        """Render text without cache lookup and store result in cache.
+
+        :param text: markdown source
+        :type text: str
+        :return: html
+        :rtype: str
+        """
+        html = self.engine(text)
+        key = self.key(text)
+        self._local_set(key, html)
+        if self.redis is not None:
+            self.redis.set(key, html, ex=self.ttl)
+        return html
+
+    def is_deferred(self, text: str) -> bool:
+        """Check if text should be rendered in background job.
+
+        :param text: markdown source
+        :type text: str
+        :return: True if text is over size threshold
+        :rtype: bool
+        """
+        return 0 < self.async_threshold <= len(text)
+
+
+_default_renderer = MarkdownRenderer()
+
+
+def get_renderer() -> MarkdownRenderer:
+    if has_app_context():
+        renderer = getattr(current_app, 'markdown', None)
+        if renderer is not None:
+            return renderer
+    return _default_renderer
+
+
+def render_markdown(text: str) -> str:
+    return get_renderer().render(text)
+
+
+def plain_html(text: str) -> str:
+    """Render text as escaped paragraphs, displayed until background job
+    renders markdown.
+
+    :param text: source text
+    :type text: str
+    :return: html
+    :rtype: str
+    """
+    return ''.join(
+        f'<p>{escape(para.strip())}</p>' for para in _paragraph_re.split(text.strip())
+    )
+
+
+def render_field(target, source_attr: str, html_attr: str):
+    """Set html attribute of object from its markdown source attribute, to be
+    called from model pre-save event handlers. Rendering is skipped if source
+    did not change, texts over threshold of renderer are rendered in
+    background after commit.
+
+    :param target: model object
+    :param source_attr: name of source attribute
+    :type source_attr: str
+    :param html_attr: name of html attribute
+    :type html_attr: str
+    """
+    state = db.inspect(target)
+    text = getattr(target, source_attr)
+    if not text:
+        setattr(target, html_attr, None)
+        return
+    source_changed = state.attrs[source_attr].history.has_changes()
+    if not source_changed and getattr(target, html_attr) is not None:
+        return
+    renderer = get_renderer()
+    html = renderer.cached(text)
+    if html is None:
+        if renderer.is_deferred(text) and state.session is not None:
+            html = plain_html(text)
+            state.session.info.setdefault(_TARGETS_KEY, []).append(
+                (target, source_attr, html_attr)
+            )
+        else:
+            html = renderer.convert(text)
+    setattr(target, html_attr, html)
+
+
+def rerender_field(table_name: str, obj_id: int, source_col: str, html_col: str):
+    """Render markdown stored in database row and store result, unless source
+    changed in the meantime. Modification time of row (or its parent, if row
+    does not have one) is changed in the same transaction.
+
+    :param table_name: table name
+    :type table_name: str
+    :param obj_id: row id
+    :type obj_id: int
+    :param source_col: source column name
+    :type source_col: str
+    :param html_col: html column name
+    :type html_col: str
+    """
+    table = db.metadata.tables[table_name]
+    with db.engine.begin() as connection:
+        text = connection.execute(
+            db.select([table.c[source_col]]).where(table.c.id == obj_id)
+        ).scalar()
+        if not text:
+            return
+        html = get_renderer().render(text)
+        now = datetime.datetime.utcnow()
+        values = {html_col: html}
+        if 'updated' in table.c:
+            values['updated'] = now
+        result = connection.execute(
+            table.update()
+            .where(db.and_(table.c.id == obj_id, table.c[source_col] == text))
+            .values(values)
+        )
+        if result.rowcount and table_name in _TIMESTAMP_PARENTS:
+            parent_name, fk_col = _TIMESTAMP_PARENTS[table_name]
+            parent = db.metadata.tables[parent_name]
+            connection.execute(
+                parent.update().where(parent.c.id == db.select(
+                    [table.c[fk_col]]
+                ).where(table.c.id == obj_id).as_scalar()).values(updated=now)
+            )
+
+
+# events: session (background markdown rendering)
+def session_post_flush(session, flush_context):
+    targets = session.info.pop(_TARGETS_KEY, None)
+    if targets:
+        jobs = session.info.setdefault(_JOBS_KEY, set())
+        for target, source_attr, html_attr in targets:
+            jobs.add((target.__tablename__, target.id, source_attr, html_attr))
+
+
+def session_post_rollback(session):
+    session.info.pop(_TARGETS_KEY, None)
+
+
+def _enqueue_jobs(jobs):
+    for args in sorted(jobs):
+        current_app.queue.enqueue('brewlog.tasks.render_markdown_field', *args)
+
+
+db.event.listen(db.session, 'after_flush', session_post_flush)
+db.event.listen(db.session, 'after_rollback', session_post_rollback)
+after_commit(_JOBS_KEY, _enqueue_jobs)
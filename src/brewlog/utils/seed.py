@@ -0,0 +1,509 @@
+"""Synthetic dataset generator for load testing and benchmarks.
+
+Rows are written with batched Core inserts, values that model events
+maintain (html of markdown fields, brew state and fermentation summary,
+visibility flags, search documents) are calculated here and counters are
+recalculated with bulk updates once all rows are written. Primary keys are
+assigned up front so database should not be written by anything else while
+data is generated.
+"""
+import datetime
+import math
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from werkzeug.security import generate_password_hash
+
+from ..ext import db
+from ..models import (
+    Brew, BrewerProfile, Brewery, FermentationStep, SearchDocument, TastingNote,
+)
+from ..models.brewing import calculate_abv, compute_state
+from ..models.choices import CARB_LEVEL_KEYS, CARBONATION_KEYS
+from ..models.counters import refresh_counters
+from ..models.search import KIND_BREW, KIND_BREWERY, KIND_NOTE
+from .rendering import render_markdown
+from .text import fold_text, stars2deg
+
+FIRST_NAMES = (
+    'Adam', 'Anna', 'Bartosz', 'Ewa', 'Grzegorz', 'Jan', 'Joanna', 'Kasia',
+    'Krzysztof', 'Łukasz', 'Magda', 'Marek', 'Michał', 'Ola', 'Paweł', 'Piotr',
+    'Tomasz', 'Zofia', 'John', 'Mary', 'Peter', 'Susan', 'Hans', 'Greta',
+)
+LAST_NAMES = (
+    'Nowak', 'Kowalski', 'Wiśniewski', 'Wójcik', 'Kamiński', 'Lewandowski',
+    'Zieliński', 'Szymański', 'Woźniak', 'Dąbrowski', 'Smith', 'Brown',
+    'Miller', 'Müller', 'Schmidt', 'Fischer', 'Weber', 'Jansen',
+)
+LOCATIONS = (
+    'Warszawa', 'Kraków', 'Łódź', 'Wrocław', 'Poznań', 'Gdańsk', 'Berlin',
+    'Praha', 'London', 'Portland', None,
+)
+BREWERY_WORDS = (
+    'Attic', 'Basement', 'Garage', 'Kitchen', 'Backyard', 'Old Mill', 'Hop',
+    'Barrel', 'Copper', 'Wild', 'Black Cat', 'Rusty', 'Happy Yeast', 'Oak',
+)
+BREWERY_SUFFIXES = ('Brewery', 'Brewing', 'Ales', 'Browar', 'Brauhaus', 'Beerworks')
+BREW_ADJECTIVES = (
+    'Hoppy', 'Dark', 'Golden', 'Smoky', 'Crisp', 'Hazy', 'Bitter', 'Sour',
+    'Roasty', 'Mellow', 'Wild', 'Imperial', 'Lazy', 'Stubborn', 'Midnight',
+)
+BREW_NOUNS = (
+    'Badger', 'Monk', 'Harvest', 'Comet', 'Anchor', 'Raven', 'Meadow',
+    'Lighthouse', 'Fox', 'Dragon', 'Owl', 'River', 'Summit', 'Forest', 'Storm',
+)
+# BJCP code, name, OG range and FG range in degrees Plato
+STYLES = (
+    ('1A', 'American Light Lager', (7.0, 10.0), (0.5, 2.0)),
+    ('3A', 'Czech Pale Lager', (7.5, 10.0), (1.8, 3.5)),
+    ('4A', 'Munich Helles', (11.0, 12.5), (2.0, 3.0)),
+    ('5D', 'German Pils', (11.0, 12.5), (2.0, 3.0)),
+    ('10A', 'Weissbier', (11.5, 13.5), (2.5, 3.5)),
+    ('11C', 'Strong Bitter', (11.5, 15.0), (2.5, 4.0)),
+    ('13C', 'English Porter', (10.5, 13.0), (2.0, 3.5)),
+    ('15B', 'Irish Stout', (9.5, 12.0), (2.0, 3.0)),
+    ('18B', 'American Pale Ale', (11.0, 15.0), (2.5, 4.0)),
+    ('20C', 'Imperial Stout', (18.5, 30.0), (4.5, 9.0)),
+    ('21A', 'American IPA', (14.0, 17.0), (2.5, 3.5)),
+    ('25B', 'Saison', (11.5, 15.0), (0.5, 2.5)),
+    ('26D', 'Belgian Dark Strong Ale', (18.0, 24.0), (2.5, 6.0)),
+    ('27', 'Grodziskie', (7.0, 8.5), (1.8, 2.8)),
+)
+FERMENTABLES = (
+    'Pilsner malt', 'Pale ale malt', 'Munich malt', 'Vienna malt', 'Wheat malt',
+    'Crystal 60', 'Chocolate malt', 'Roasted barley', 'Oak smoked wheat malt',
+    'Flaked oats', 'Cane sugar',
+)
+HOPS = (
+    'Saaz', 'Hallertauer Mittelfrüh', 'Tettnanger', 'Lubelski', 'Marynka',
+    'East Kent Goldings', 'Fuggles', 'Cascade', 'Centennial', 'Citra', 'Mosaic',
+    'Simcoe', 'Magnum',
+)
+YEASTS = (
+    'US-05', 'S-04', 'W-34/70', 'WB-06', 'BE-256', 'WLP001', 'WLP300',
+    'Wyeast 1968', 'Wyeast 3724',
+)
+STEP_NAMES = ('primary', 'secondary', 'dry hopping', 'cold crash', 'lagering')
+NOTE_SENTENCES = (
+    'Pours clear with a *thick* white head.',
+    'Aroma of bread crust and a hint of honey.',
+    'Citrus and pine dominate, bitterness is **firm** but clean.',
+    'Roasty, dry finish with notes of coffee and dark chocolate.',
+    'Carbonation a bit too high for the style.',
+    'Served at 8*C it opens up nicely after a few minutes.',
+    'Slight diacetyl, next time longer rest at 18*C.',
+    'Very drinkable, the keg was gone in a week.',
+    'Phenols are subdued, banana esters come through.',
+    'Smoke is delicate and blends well with the grain.',
+)
+BREW_NOTE_SENTENCES = (
+    'Mash at 66*C for 60 minutes, mash out at 78*C.',
+    'Pitched at 12*C and let it rise to 15*C over 3 days.',
+    'Missed OG by one degree, boiled 15 minutes longer.',
+    'Dry hopped for 4 days in secondary.',
+    'Water: RO with gypsum and calcium chloride, 1:1.',
+    'Lost about 2 litres to trub, more whirlpool time next batch.',
+)
+BREWERY_SENTENCES = (
+    'Small batch homebrewery, mostly **lagers** and sours.',
+    'Brewing since forever on a 20 litre kettle.',
+    'We like our beers *hoppy* and our lagers cold.',
+    'Three vessel system built from old kegs.',
+    'Experimental batches and competition entries.',
+)
+
+LAGER_STYLES = ('1A', '3A', '4A', '5D')
+
+# number of distinct texts of each kind, rendered once per run
+TEXT_POOL_SIZE = 200
+
+_user = BrewerProfile.__table__
+_brewery = Brewery.__table__
+_brew = Brew.__table__
+_step = FermentationStep.__table__
+_note = TastingNote.__table__
+_search = SearchDocument.__table__
+
+# in order of foreign key dependencies
+TABLES = (_user, _brewery, _brew, _step, _note, _search)
+
+
+@dataclass
+class SeedOptions:
+    """Scale and shape of generated dataset.
+
+    :param brews: number of brews, all other counts are derived from it
+    :type brews: int
+    :param brews_per_brewery: mean number of brews in brewery
+    :type brews_per_brewery: float
+    :param breweries_per_user: mean number of breweries of brewer
+    :type breweries_per_user: float
+    :param steps_per_brew: mean length of fermentation step chain of brew
+                           that has been brewed already
+    :type steps_per_brew: float
+    :param notes_per_brew: mean number of tasting notes of tapped brew
+    :type notes_per_brew: float
+    :param private_users: fraction of brewers with non-public profile
+    :type private_users: float
+    :param private_brews: fraction of non-public brews
+    :type private_brews: float
+    :param password: password set for all brewers, None to leave it unset
+    :type password: Optional[str]
+    :param batch_size: number of buffered rows written in one batch
+    :type batch_size: int
+    :param seed: random generator seed
+    :type seed: int
+    """
+    brews: int = 1000
+    brews_per_brewery: float = 10
+    breweries_per_user: float = 2
+    steps_per_brew: float = 2.5
+    notes_per_brew: float = 2
+    private_users: float = 0.1
+    private_brews: float = 0.15
+    password: Optional[str] = None
+    batch_size: int = 5000
+    seed: int = 42
+
+
+class _Writer:
+    """Buffers rows and writes them with executemany in table dependency
+    order, so rows referenced by foreign keys are always written first.
+    """
+
+    def __init__(self, connection, tables, batch_size: int):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in tables}
+        self.pending = 0
+        self.counts = {table.name: 0 for table in tables}
+
+    def add(self, table, row: dict):
+        self.buffers[table].append(row)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for table, rows in self.buffers.items():
+            if rows:
+                self.connection.execute(table.insert(), rows)
+                self.counts[table.name] += len(rows)
+                rows.clear()
+        self.pending = 0
+
+
+class _TextPool:
+    """Fixed set of markdown texts with their html and folded forms, so
+    each distinct text is processed only once.
+    """
+
+    def __init__(self, rng: random.Random, sentences, min_len: int, max_len: int):
+        self.rng = rng
+        self.items = []
+        for _ in range(TEXT_POOL_SIZE):
+            count = rng.randint(min_len, max_len)
+            paragraphs = [
+                ' '.join(rng.sample(sentences, min(2, len(sentences))))
+                for _ in range(count)
+            ]
+            text = stars2deg('\n\n'.join(paragraphs))
+            self.items.append((text, render_markdown(text), fold_text(text)))
+
+    def pick(self):
+        return self.rng.choice(self.items)
+
+
+def _count(rng: random.Random, mean: float) -> int:
+    # integer part always, fractional part with its probability
+    return int(mean) + (rng.random() < mean % 1)
+
+
+def _first_id(connection, table) -> int:
+    return (connection.execute(db.select([db.func.max(table.c.id)])).scalar() or 0) + 1
+
+
+def _reset_sequences(connection, tables):
+    # explicit primary keys do not advance PostgreSQL serial sequences
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        connection.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT max(id) FROM {table.name}))"
+        ))
+
+
+class _Generator:
+
+    def __init__(self, connection, options: SeedOptions, today: datetime.date):
+        self.connection = connection
+        self.options = options
+        self.today = today
+        self.now = datetime.datetime.combine(today, datetime.time())
+        self.rng = random.Random(options.seed)
+        self.writer = _Writer(connection, TABLES, options.batch_size)
+        self.num_breweries = max(
+            math.ceil(options.brews / options.brews_per_brewery), 1
+        )
+        self.num_users = max(
+            math.ceil(self.num_breweries / options.breweries_per_user), 1
+        )
+        self.first_user_id = _first_id(connection, _user)
+        self.first_brewery_id = _first_id(connection, _brewery)
+        self.next_brew_id = _first_id(connection, _brew)
+        self.next_note_id = _first_id(connection, _note)
+        # visibility of users and owner of breweries, by position
+        self.user_public = []
+        self.brewery_owners = []
+        self.brewery_brews = []
+
+    def timestamp(self, day: datetime.date) -> datetime.datetime:
+        return datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(
+            seconds=self.rng.randint(6 * 3600, 23 * 3600)
+        )
+
+    def days_ago(self, low: int, high: int) -> datetime.date:
+        return self.today - datetime.timedelta(days=self.rng.randint(low, high))
+
+    def search_document(
+                self, kind, object_id, owner_id, is_public, title, content,
+                parent_id=None,
+            ):
+        self.writer.add(_search, {
+            'kind': kind, 'object_id': object_id, 'parent_id': parent_id,
+            'owner_id': owner_id, 'is_public': is_public, 'title': title[:250],
+            'keywords': fold_text(title), 'content': content, 'updated': self.now,
+        })
+
+    def users(self):
+        rng = self.rng
+        password = 'unset'
+        if self.options.password is not None:
+            password = generate_password_hash(self.options.password)
+        for num in range(self.num_users):
+            user_id = self.first_user_id + num
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            is_public = rng.random() >= self.options.private_users
+            created = self.timestamp(self.days_ago(0, 1500))
+            self.user_public.append(is_public)
+            self.writer.add(_user, {
+                'id': user_id,
+                'first_name': first_name,
+                'last_name': last_name,
+                'full_name': f'{first_name} {last_name}',
+                'nick': f'{last_name.lower()}{num}' if rng.random() < 0.5 else None,
+                'email': f'brewer{user_id}@example.com',
+                'location': rng.choice(LOCATIONS),
+                'is_public': is_public,
+                'created': created,
+                'updated': created,
+                'password': password,
+                'email_confirmed': True,
+                'confirmed_dt': created,
+            })
+
+    def breweries(self):
+        rng = self.rng
+        texts = _TextPool(rng, BREWERY_SENTENCES, 1, 2)
+        for num in range(self.num_breweries):
+            brewery_id = self.first_brewery_id + num
+            owner_id = self.first_user_id + rng.randrange(self.num_users)
+            name = f'{rng.choice(BREWERY_WORDS)} {rng.choice(BREWERY_SUFFIXES)} {num}'
+            text, html, folded = texts.pick()
+            established = self.days_ago(30, 5000)
+            created = self.timestamp(self.days_ago(0, 1500))
+            self.brewery_owners.append(owner_id)
+            self.brewery_brews.append(0)
+            self.writer.add(_brewery, {
+                'id': brewery_id,
+                'name': name,
+                'description': text,
+                'description_html': html,
+                'established_date': established,
+                'est_year': established.year,
+                'est_month': established.month,
+                'est_day': established.day,
+                'created': created,
+                'updated': created,
+                'brewer_id': owner_id,
+            })
+            self.search_document(
+                KIND_BREWERY, brewery_id, owner_id, True, name, folded,
+            )
+
+    def fermentation_steps(self, style, brewed: datetime.date) -> List[dict]:
+        # chain of steps where each one starts with gravity previous one ended
+        # with, steps that would start in the future are not there yet
+        rng = self.rng
+        og = round(rng.uniform(*style[2]), 1)
+        fg = round(rng.uniform(*style[3]), 1)
+        volume = round(rng.uniform(18, 25), 1)
+        num_steps = max(_count(rng, self.options.steps_per_brew), 1)
+        if style[0] in LAGER_STYLES:
+            temperatures = (8, 12)
+        else:
+            temperatures = (16, 21)
+        steps = []
+        start = brewed
+        for num in range(num_steps):
+            if start > self.today:
+                break
+            step_fg = round(og - (og - fg) * (num + 1) / num_steps, 1)
+            steps.append({
+                'date': start,
+                'name': STEP_NAMES[min(num, len(STEP_NAMES) - 1)],
+                'og': og,
+                'fg': step_fg,
+                'volume': volume,
+                'temperature': rng.randint(*temperatures),
+            })
+            og = step_fg
+            volume = round(volume - rng.uniform(0, 1), 1)
+            start += datetime.timedelta(days=rng.randint(5, 14))
+        return steps
+
+    def lifecycle(self, steps: List[dict]) -> List[Optional[datetime.date]]:
+        # bottling, tapping and finishing dates, each one only if in the past
+        dates = []
+        if steps:
+            day = steps[-1]['date']
+            for low, high in ((7, 21), (14, 42), (30, 200)):
+                day += datetime.timedelta(days=self.rng.randint(low, high))
+                if day > self.today:
+                    break
+                dates.append(day)
+        return dates + [None] * (3 - len(dates))
+
+    def brews(self):
+        rng = self.rng
+        brew_texts = _TextPool(rng, BREW_NOTE_SENTENCES, 1, 3)
+        note_texts = _TextPool(rng, NOTE_SENTENCES, 1, 3)
+        for _ in range(self.options.brews):
+            brew_id = self.next_brew_id
+            self.next_brew_id += 1
+            brewery = rng.randrange(self.num_breweries)
+            owner_id = self.brewery_owners[brewery]
+            self.brewery_brews[brewery] += 1
+            code = str(self.brewery_brews[brewery])
+            name = f'{rng.choice(BREW_ADJECTIVES)} {rng.choice(BREW_NOUNS)}'
+            style = rng.choice(STYLES)
+            bjcp_style = f'{style[0]} {style[1]}'
+            # some brews are planned for the future
+            brewed = self.days_ago(-30, 1000)
+            steps = self.fermentation_steps(style, brewed)
+            bottled, tapped, finished = self.lifecycle(steps)
+            og = fg = brew_length = fermentation_start = None
+            if steps:
+                og = steps[0]['og']
+                brew_length = steps[0]['volume']
+                fermentation_start = steps[0]['date']
+                fg = steps[-1]['fg']
+            carbonation_type = rng.choice(CARBONATION_KEYS)
+            carbonation_level = rng.choice(CARB_LEVEL_KEYS)
+            is_public = rng.random() >= self.options.private_brews
+            effectively_public = (
+                is_public and self.user_public[owner_id - self.first_user_id]
+            )
+            hops = ', '.join(rng.sample(HOPS, rng.randint(1, 3)))
+            fermentables = ', '.join(rng.sample(FERMENTABLES, rng.randint(1, 4)))
+            notes, notes_html, _ = brew_texts.pick()
+            created = self.timestamp(min(brewed, self.today))
+            self.writer.add(_brew, {
+                'id': brew_id,
+                'created': created,
+                'updated': created,
+                'name': name,
+                'code': code,
+                'style': style[1],
+                'bjcp_style_code': style[0],
+                'bjcp_style_name': style[1],
+                'bjcp_style': bjcp_style,
+                'date_brewed': brewed,
+                'notes': notes,
+                'notes_html': notes_html,
+                'fermentables': fermentables,
+                'hops': hops,
+                'yeast': rng.choice(YEASTS),
+                'boil_time': rng.choice((60, 60, 75, 90)),
+                'final_amount': brew_length,
+                'bottling_date': bottled,
+                'carbonation_type': carbonation_type,
+                'carbonation_level': carbonation_level,
+                'is_public': is_public,
+                'is_draft': False,
+                'brewery_id': self.first_brewery_id + brewery,
+                'tapped': tapped,
+                'finished': finished,
+                'og': og,
+                'fg': fg,
+                'abv': calculate_abv(og, fg, carbonation_type, carbonation_level),
+                'brew_length': brew_length,
+                'fermentation_start_date': fermentation_start,
+                'state': compute_state(brewed, bottled, tapped, finished, self.today),
+                'effectively_public': effectively_public,
+            })
+            full_name = f'#{code} {name}'
+            self.search_document(
+                KIND_BREW, brew_id, owner_id, is_public, full_name,
+                fold_text('\n'.join((style[1], bjcp_style, hops, fermentables))),
+            )
+            for step in steps:
+                step['brew_id'] = brew_id
+                self.writer.add(_step, step)
+            if tapped is None:
+                continue
+            for _ in range(_count(rng, self.options.notes_per_brew)):
+                note_id = self.next_note_id
+                self.next_note_id += 1
+                text, html, folded = note_texts.pick()
+                tasted = tapped + datetime.timedelta(days=rng.randint(0, 60))
+                self.writer.add(_note, {
+                    'id': note_id,
+                    'author_id': self.first_user_id + rng.randrange(self.num_users),
+                    'date': min(tasted, self.today),
+                    'text': text,
+                    'text_html': html,
+                    'brew_id': brew_id,
+                    'effectively_public': effectively_public,
+                })
+                self.search_document(
+                    KIND_NOTE, note_id, owner_id, is_public, full_name, folded,
+                    parent_id=brew_id,
+                )
+
+
+def generate(
+            connection, options: SeedOptions,
+            today: Optional[datetime.date] = None,
+            progress: Optional[Callable[[str], None]] = None,
+        ) -> Dict[str, int]:
+    """Generate synthetic dataset. Same options and reference date produce
+    identical data in empty database.
+
+    :param connection: database connection
+    :type connection: Connection
+    :param options: dataset scale and shape
+    :type options: SeedOptions
+    :param today: reference date of brew lifecycles, defaults to current date
+    :type today: Optional[datetime.date]
+    :param progress: function called with progress messages
+    :type progress: Optional[Callable[[str], None]]
+    :return: mapping of table name to number of inserted rows
+    :rtype: Dict[str, int]
+    """
+    progress = progress or (lambda message: None)
+    generator = _Generator(connection, options, today or datetime.date.today())
+    progress(f'generating {generator.num_users} brewers')
+    generator.users()
+    progress(f'generating {generator.num_breweries} breweries')
+    generator.breweries()
+    progress(f'generating {options.brews} brews')
+    generator.brews()
+    generator.writer.flush()
+    progress('updating counters')
+    refresh_counters(connection)
+    _reset_sequences(connection, TABLES[:-1])
+    return generator.writer.counts
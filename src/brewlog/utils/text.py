@@ -2,12 +2,19 @@ import codecs
 import os
 import re
 import unicodedata
+from typing import List
 
-import markdown
+from .rendering import render_markdown
 
 _deg_re = re.compile(r'(?<=\d)\*(?=\w\w?\w?)')
 _deg_char = unicodedata.lookup('DEGREE SIGN')
 
+# characters that do not decompose to base letter + combining mark
+_fold_table = str.maketrans({
+    'ł': 'l', 'Ł': 'L', 'đ': 'd', 'Đ': 'D', 'ø': 'o', 'Ø': 'O', 'ß': 'ss',
+})
+_word_re = re.compile(r'\w+')
+
 
 def stars2deg(text: str) -> str:
     return _deg_re.sub(_deg_char, text)
@@ -16,4 +23,33 @@ def stars2deg(text: str) -> str:
 def get_announcement(file_name: str) -> str:
     if file_name and os.path.isfile(file_name):
         with codecs.open(file_name, encoding='utf-8') as fp:
-            return markdown.markdown(fp.read())
+            return render_markdown(fp.read())
+
+
+def fold_text(text: str) -> str:
+    """Fold text for search purposes: strip diacritics (including Polish
+    characters that do not decompose) and convert to lowercase.
+
+    :param text: text to fold
+    :type text: str
+    :return: folded text
+    :rtype: str
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text.translate(_fold_table))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.lower()
+
+
+def search_terms(text: str, max_terms: int = 8) -> List[str]:
+    """Split folded text into list of words usable as search terms.
+
+    :param text: search phrase
+    :type text: str
+    :param max_terms: maximum number of terms returned, defaults to 8
+    :type max_terms: int
+    :return: list of terms
+    :rtype: List[str]
+    """
+    return _word_re.findall(fold_text(text))[:max_terms]
@@ -1,10 +1,14 @@
+from typing import List, Tuple
+
 import pytest
+from flask import request
 from flask.wrappers import Response
 from pytest_factoryboy import register
 from werkzeug.utils import cached_property
 
 from brewlog import make_app
 from brewlog.ext import db
+from brewlog.utils.instrumentation import current_stats
 
 from .factories import (
     BreweryFactory, BrewFactory, FermentationStepFactory, TastingNoteFactory,
@@ -36,3 +40,67 @@ def app():
         yield app
         db.session.remove()
         db.drop_all()
+
+
+class QueryRecorder:
+    """Records SQL statements issued while processing requests, separately
+    for each request. Statements executed by test code outside of request
+    (eg. by factories) are ignored.
+    """
+
+    def __init__(self):
+        self.requests: List[Tuple[str, List[str]]] = []
+        self._stats = None
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        stats = current_stats()
+        if stats is None:
+            return
+        if stats is not self._stats:
+            self._stats = stats
+            self.requests.append((request.endpoint, []))
+        self.requests[-1][1].append(statement)
+
+    def counts(self, endpoint: str) -> List[int]:
+        return [
+            len(statements) for name, statements in self.requests
+            if name == endpoint
+        ]
+
+    def check(self, endpoint: str, budget: int):
+        """Fail if any recorded request to endpoint issued more statements
+        than budget allows, or there was no request to endpoint at all.
+        """
+        requests = [
+            statements for name, statements in self.requests if name == endpoint
+        ]
+        if not requests:
+            pytest.fail(f'no request to {endpoint} recorded')
+        for statements in requests:
+            if len(statements) > budget:
+                listing = '\n'.join(
+                    f'{num}. {" ".join(stmt.split())[:200]}'
+                    for num, stmt in enumerate(statements, start=1)
+                )
+                pytest.fail(
+                    f'{endpoint} issued {len(statements)} statements, budget is '
+                    f'{budget}:\n{listing}'
+                )
+
+    def reset(self):
+        self.requests.clear()
+        self._stats = None
+
+
+@pytest.fixture
+def query_budget(app):
+    """Statement recorder for checking query budgets of endpoints. Test app
+    context (and session) outlives requests, so identity map is cleared
+    before each request to make it start cold like in production. Objects
+    created by test are detached then, keep their ids and urls instead.
+    """
+    recorder = QueryRecorder()
+    app.before_request_funcs.setdefault(None, []).insert(0, db.session.expunge_all)
+    db.event.listen(db.engine, 'before_cursor_execute', recorder.record)
+    yield recorder
+    db.event.remove(db.engine, 'before_cursor_execute', recorder.record)
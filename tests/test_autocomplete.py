@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+from flask import url_for
+
+from brewlog.ext import db
+from brewlog.models.search import KIND_BREW, KIND_BREWERY
+from brewlog.search.autocomplete import AutocompleteService, PrefixIndex
+
+
+class TestPrefixIndex:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        self.index = PrefixIndex([
+            (1, 'Pale Ale'), (2, 'Palenie'), (3, 'Żytnie'), (4, 'India Pale Ale'),
+        ])
+
+    def test_name_prefix(self):
+        assert self.index.lookup('pal') == [
+            (1, 'Pale Ale'), (4, 'India Pale Ale'), (2, 'Palenie'),
+        ]
+
+    def test_word_prefix(self):
+        assert [obj_id for obj_id, _ in self.index.lookup('ale')] == [1, 4]
+
+    def test_folding(self):
+        assert self.index.lookup('ŻYT') == [(3, 'Żytnie')]
+        assert self.index.lookup('zyt') == [(3, 'Żytnie')]
+
+    def test_limit(self):
+        assert len(self.index.lookup('p', limit=2)) == 2
+
+    @pytest.mark.parametrize('prefix', ['', '  ', 'xyz'])
+    def test_no_match(self, prefix):
+        assert self.index.lookup(prefix) == []
+
+
+@pytest.mark.usefixtures('app')
+class TestAutocompleteService:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, app):
+        self.service = app.autocomplete
+
+    def test_public(self, brew_factory, user_factory):
+        public = brew_factory(name='Porter')
+        brew_factory(name='Porter bałtycki', is_public=False)
+        brew_factory(name='Porter', brewery__brewer=user_factory(is_public=False))
+        result = self.service.suggest(KIND_BREW, 'port')
+        assert result == [
+            {'name': 'Porter', 'url': url_for('brew.details', brew_id=public.id)},
+        ]
+
+    def test_overlay(self, brew_factory):
+        brew = brew_factory(name='Porter', is_public=False)
+        brew_factory(name='Porter')
+        owner = brew.brewery.brewer
+        result = self.service.suggest(KIND_BREW, 'port', owner.id)
+        assert [r['url'] for r in result] == [
+            url_for('brew.details', brew_id=brew.id)
+        ]
+
+    def test_invalidated_on_commit(self, brewery_factory):
+        brewery = brewery_factory(name='Browar Pierwszy')
+        db.session.commit()
+        assert len(self.service.suggest(KIND_BREWERY, 'browar')) == 1
+        brewery.name = 'Pierwszy'
+        db.session.add(brewery)
+        db.session.commit()
+        assert self.service.suggest(KIND_BREWERY, 'browar') == []
+        assert self.service.suggest(KIND_BREWERY, 'browar', brewery.brewer.id) == []
+
+    def test_profile_visibility_change(self, brewery_factory):
+        brewery = brewery_factory(name='Browar')
+        db.session.commit()
+        assert len(self.service.suggest(KIND_BREWERY, 'browar')) == 1
+        brewery.brewer.is_public = False
+        db.session.add(brewery.brewer)
+        db.session.commit()
+        assert self.service.suggest(KIND_BREWERY, 'browar') == []
+
+    def test_overlay_cache_bounded(self, brewery_factory):
+        self.service.overlay_cache_size = 2
+        for _ in range(3):
+            brewery = brewery_factory()
+            self.service.index(KIND_BREWERY, brewery.brewer.id)
+        assert len(self.service._overlays) == 2
+
+    def test_private_brew_keeps_public_index(self, brew_factory):
+        brew = brew_factory(name='Porter', is_public=False)
+        db.session.commit()
+        generation = self.service.generation(KIND_BREW)
+        brew.name = 'Stout'
+        db.session.add(brew)
+        db.session.commit()
+        assert self.service.generation(KIND_BREW) == generation
+        owner_id = brew.brewery.brewer.id
+        assert self.service.suggest(KIND_BREW, 'stout', owner_id) != []
+
+    def test_hidden_brew_invalidates_public_index(self, brew_factory):
+        brew = brew_factory(name='Porter')
+        db.session.commit()
+        assert len(self.service.suggest(KIND_BREW, 'port')) == 1
+        brew.is_public = False
+        db.session.add(brew)
+        db.session.commit()
+        assert self.service.suggest(KIND_BREW, 'port') == []
+
+    def test_single_concurrent_rebuild(self, app, mocker):
+        service = AutocompleteService(app.redis)
+        calls = []
+
+        def loader(user_id):
+            calls.append(user_id)
+            time.sleep(0.05)
+            return [(1, 'Porter')]
+
+        mocker.patch.dict(
+            'brewlog.search.autocomplete._LOADERS', {KIND_BREW: loader}
+        )
+        threads = [
+            threading.Thread(target=service.index, args=(KIND_BREW,))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == [None]
+        assert service._build_locks == {}
@@ -0,0 +1,125 @@
+import pytest
+
+from brewlog.brew import navigation
+from brewlog.brew.navigation import Neighbour
+from brewlog.ext import db
+
+
+@pytest.mark.usefixtures('app')
+class TestNeighbours:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, brewery_factory, brew_factory):
+        self.brewery = brewery_factory()
+        self.brews = [
+            brew_factory(brewery=self.brewery, name=f'brew {num}', is_public=public)
+            for num, public in enumerate([True, False, True, False, True])
+        ]
+        brew_factory(name='other brewery')
+        self.connection = db.session.connection()
+
+    @pytest.fixture(params=[True, False], ids=['window', 'subquery'])
+    def window(self, request, mocker):
+        mocker.patch.object(
+            navigation, 'supports_window_functions', return_value=request.param
+        )
+
+    def neighbours(self, brew, public_only):
+        return navigation.neighbours(
+            self.connection, self.brewery.id, brew.id, public_only
+        )
+
+    @pytest.mark.usefixtures('window')
+    def test_all(self):
+        first, second, third = self.brews[:3]
+        assert self.neighbours(second, False) == (
+            Neighbour(first.id, first.name), Neighbour(third.id, third.name),
+        )
+        assert self.neighbours(first, False) == (
+            None, Neighbour(second.id, second.name),
+        )
+
+    @pytest.mark.usefixtures('window')
+    def test_public_only(self):
+        first, _, third, _, fifth = self.brews
+        assert self.neighbours(third, True) == (
+            Neighbour(first.id, first.name), Neighbour(fifth.id, fifth.name),
+        )
+        assert self.neighbours(fifth, True) == (Neighbour(third.id, third.name), None)
+
+    @pytest.mark.usefixtures('window')
+    def test_single_brew(self, brew_factory):
+        brew = brew_factory()
+        assert navigation.neighbours(
+            self.connection, brew.brewery_id, brew.id, True
+        ) == (None, None)
+
+
+@pytest.mark.usefixtures('app')
+class TestBrewNavigation:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, app, brewery_factory, brew_factory):
+        self.navigation = app.navigation
+        self.brewery = brewery_factory()
+        self.first = brew_factory(brewery=self.brewery, name='first')
+        self.second = brew_factory(brewery=self.brewery, name='second')
+        db.session.commit()
+
+    def test_cached(self, mocker):
+        spy = mocker.spy(navigation, 'neighbours')
+        expected = (Neighbour(self.first.id, 'first'), None)
+        assert self.navigation.get(self.second) == expected
+        assert self.navigation.get(self.second) == expected
+        assert spy.call_count == 1
+        key = self.navigation.key(self.brewery.id, True)
+        assert 0 < self.navigation.redis.ttl(key) <= self.navigation.ttl
+
+    def test_scopes(self):
+        self.first.is_public = False
+        db.session.add(self.first)
+        db.session.commit()
+        assert self.navigation.get(self.second, public_only=True) == (None, None)
+        assert self.navigation.get(self.second, public_only=False) == (
+            Neighbour(self.first.id, 'first'), None,
+        )
+
+    def test_invalidated_on_insert(self, brew_factory):
+        assert self.navigation.get(self.second)[1] is None
+        third = brew_factory(brewery=self.brewery, name='third')
+        db.session.commit()
+        assert self.navigation.get(self.second)[1] == Neighbour(third.id, 'third')
+
+    def test_invalidated_on_delete(self):
+        assert self.navigation.get(self.second)[0] is not None
+        db.session.delete(self.first)
+        db.session.commit()
+        assert self.navigation.get(self.second) == (None, None)
+
+    @pytest.mark.parametrize('attr,value', [
+        ('is_public', False), ('name', 'renamed'),
+    ])
+    def test_invalidated_on_update(self, attr, value):
+        assert self.navigation.get(self.second)[0] is not None
+        setattr(self.first, attr, value)
+        db.session.add(self.first)
+        db.session.commit()
+        previous, _ = self.navigation.get(self.second)
+        assert previous is None or previous.name == 'renamed'
+
+    def test_invalidated_on_move(self, brewery_factory):
+        assert self.navigation.get(self.second)[0] is not None
+        self.first.brewery = brewery_factory()
+        db.session.add(self.first)
+        db.session.commit()
+        assert self.navigation.get(self.second) == (None, None)
+
+    def test_not_invalidated_on_rollback(self, mocker):
+        self.navigation.get(self.second)
+        self.first.is_public = False
+        db.session.add(self.first)
+        db.session.flush()
+        db.session.rollback()
+        spy = mocker.spy(navigation, 'neighbours')
+        self.navigation.get(self.second)
+        assert spy.call_count == 0
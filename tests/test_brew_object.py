@@ -2,7 +2,9 @@ import datetime
 
 import pytest
 
-from brewlog.models import Brew, Brewery
+from brewlog.ext import db
+from brewlog.models import Brew, Brewery, TastingNote
+from brewlog.models.brewing import compute_state, refresh_brew_states
 from brewlog.utils.brewing import apparent_attenuation, real_attenuation
 
 from . import BrewlogTests
@@ -109,6 +111,163 @@ class TestBrewObject(BrewObjectTests):
         assert '%.1f' % brew.abv == '4.0'
 
 
+@pytest.mark.usefixtures('app')
+class TestBrewFermentationSummary(BrewObjectTests):
+
+    def test_summary_from_steps(self, brew_factory, fermentation_step_factory):
+        brew = brew_factory(brewery=self.public_brewery, name='pb1')
+        start = datetime.date(2019, 5, 1)
+        fermentation_step_factory(
+            brew=brew, name='primary', date=start, og=12, fg=4, volume=20,
+        )
+        fermentation_step_factory(
+            brew=brew, name='secondary', date=start + datetime.timedelta(days=7),
+            og=4, fg=2.5,
+        )
+        db.session.commit()
+        stored = db.session.query(
+            Brew.og, Brew.fg, Brew.brew_length, Brew.fermentation_start_date
+        ).filter(Brew.id == brew.id).one()
+        assert stored == (12, 2.5, 20, start)
+        assert brew.og == 12
+        assert brew.fg == 2.5
+
+    def test_summary_step_removed(self, brew_factory, fermentation_step_factory):
+        brew = brew_factory(brewery=self.public_brewery, name='pb1')
+        step = fermentation_step_factory(brew=brew, name='primary', og=12, fg=3)
+        assert brew.abv is not None
+        db.session.delete(step)
+        db.session.commit()
+        assert brew.og is None
+        assert brew.abv is None
+
+    def test_abv_follows_carbonation(self, brew_factory, fermentation_step_factory):
+        brew = brew_factory(brewery=self.public_brewery, name='pb1')
+        fermentation_step_factory(brew=brew, name='primary', og=10, fg=2.5)
+        assert '%.1f' % brew.abv == '3.9'
+        brew.carbonation_type = 'keg with priming'
+        db.session.add(brew)
+        db.session.commit()
+        abv = db.session.query(Brew.abv).filter(Brew.id == brew.id).scalar()
+        assert '%.1f' % abv == '4.2'
+
+
+class TestBrewState:
+
+    TODAY = datetime.date(2020, 6, 15)
+
+    @pytest.mark.parametrize('dates,expected', [
+        ((None, None, None, None), 'planned'),
+        ((datetime.date(2020, 7, 1), None, None, None), 'planned'),
+        ((datetime.date(2020, 6, 1), None, None, None), 'fermenting'),
+        ((datetime.date(2020, 6, 1), datetime.date(2020, 6, 20), None, None),
+            'fermenting'),
+        ((datetime.date(2020, 5, 1), datetime.date(2020, 6, 1), None, None),
+            'maturing'),
+        ((datetime.date(2020, 5, 1), datetime.date(2020, 6, 1),
+            datetime.date(2020, 6, 10), None), 'tapped'),
+        ((datetime.date(2020, 5, 1), datetime.date(2020, 6, 1),
+            datetime.date(2020, 6, 10), datetime.date(2020, 6, 12)), 'finished'),
+    ])
+    def test_compute(self, dates, expected):
+        assert compute_state(*dates, today=self.TODAY) == expected
+
+
+@pytest.mark.usefixtures('app')
+class TestBrewStateStorage(BrewObjectTests):
+
+    def test_set_on_save(self, brew_factory):
+        brew = brew_factory(brewery=self.public_brewery, date_brewed=None)
+        assert brew.state == 'planned'
+        brew.date_brewed = datetime.date.today() - datetime.timedelta(days=3)
+        db.session.add(brew)
+        db.session.commit()
+        assert brew.state == 'fermenting'
+        assert brew.current_state.since == brew.date_brewed
+
+    def test_refresh(self, brew_factory):
+        today = datetime.date.today()
+        brew = brew_factory(
+            brewery=self.public_brewery, date_brewed=today - datetime.timedelta(30),
+            bottling_date=today + datetime.timedelta(days=2),
+        )
+        db.session.commit()
+        assert brew.state == 'fermenting'
+        connection = db.session.connection()
+        assert refresh_brew_states(connection) == 0
+        count = refresh_brew_states(
+            connection, today=today + datetime.timedelta(days=3)
+        )
+        db.session.commit()
+        assert count == 1
+        db.session.refresh(brew)
+        assert brew.state == 'maturing'
+
+
+@pytest.mark.usefixtures('app')
+class TestParentModificationTime(BrewObjectTests):
+
+    def test_note_touches_parents(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        db.session.commit()
+        past = datetime.datetime(2019, 1, 1)
+        for obj in (brew, self.public_brewery, self.public_user):
+            obj.updated = past
+        db.session.commit()
+        tasting_note_factory(brew=brew)
+        db.session.commit()
+        for obj in (brew, self.public_brewery, self.public_user):
+            assert obj.updated > past
+
+    def test_delete_touches_parents(self, brew_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        past = datetime.datetime(2019, 1, 1)
+        self.public_brewery.updated = past
+        db.session.commit()
+        db.session.delete(brew)
+        db.session.commit()
+        assert self.public_brewery.updated > past
+
+    def test_parents_updated_once(
+                self, app, mocker, brew_factory, user_factory, tasting_note_factory,
+            ):
+        # statistics job updates brewery on its own
+        mocker.patch.object(app.queue, 'enqueue')
+        brew = brew_factory(brewery=self.public_brewery)
+        author = user_factory()
+        # objects without modification time get it set on first update
+        past = datetime.datetime(2019, 1, 1)
+        for obj in (brew, self.public_brewery, self.public_brewery.brewer, author):
+            obj.updated = past
+        db.session.commit()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split(None, 2)[:2])
+
+        db.event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            tasting_note_factory(brew=brew, author=author)
+            db.session.commit()
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', record)
+        assert statements.count(['UPDATE', 'brew']) == 1
+        assert statements.count(['UPDATE', 'brewery']) == 1
+        # owner is touched, author counter is changed
+        assert statements.count(['UPDATE', 'brewer_profile']) == 2
+
+    def test_author_name_touches_brews(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        author = tasting_note_factory(brew=brew).author
+        past = datetime.datetime(2019, 1, 1)
+        brew.updated = past
+        db.session.commit()
+        author.nick = 'Other'
+        db.session.add(author)
+        db.session.commit()
+        assert brew.updated > past
+
+
 @pytest.mark.usefixtures('app')
 class TestBrewObjectLists(BrewObjectTests):
 
@@ -170,3 +329,53 @@ class TestBrewObjectLists(BrewObjectTests):
             )
         ]
         assert len(brew_ids) == limit
+
+
+@pytest.mark.usefixtures('app')
+class TestBrewVisibilityFlag(BrewObjectTests):
+
+    @staticmethod
+    def flags(model):
+        return dict(db.session.query(model.id, model.effectively_public))
+
+    @pytest.mark.parametrize('brewer_public,brew_public,expected', [
+        (True, True, True), (True, False, False), (False, True, False),
+    ])
+    def test_insert(
+                self, brewer_public, brew_public, expected, user_factory,
+                brewery_factory, brew_factory, tasting_note_factory,
+            ):
+        brewery = brewery_factory(brewer=user_factory(is_public=brewer_public))
+        brew = brew_factory(brewery=brewery, is_public=brew_public)
+        note = tasting_note_factory(brew=brew)
+        assert brew.effectively_public is expected
+        assert note.effectively_public is expected
+
+    def test_brewer_visibility_change(self, brew_factory, tasting_note_factory):
+        public_brew = brew_factory(brewery=self.public_brewery)
+        hidden_brew = brew_factory(brewery=self.public_brewery, is_public=False)
+        note = tasting_note_factory(brew=public_brew)
+        self.public_user.is_public = False
+        db.session.flush()
+        assert self.flags(Brew) == {public_brew.id: False, hidden_brew.id: False}
+        assert self.flags(TastingNote) == {note.id: False}
+        self.public_user.is_public = True
+        db.session.flush()
+        assert self.flags(Brew) == {public_brew.id: True, hidden_brew.id: False}
+        assert self.flags(TastingNote) == {note.id: True}
+
+    def test_brew_visibility_change(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        note = tasting_note_factory(brew=brew)
+        brew.is_public = False
+        db.session.flush()
+        assert brew.effectively_public is False
+        assert self.flags(TastingNote) == {note.id: False}
+
+    def test_moved_to_hidden_brewer(
+                self, user_factory, brewery_factory, brew_factory,
+            ):
+        brew = brew_factory(brewery=self.public_brewery)
+        brew.brewery = brewery_factory(brewer=user_factory(is_public=False))
+        db.session.flush()
+        assert brew.effectively_public is False
@@ -1,8 +1,9 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 import pytest
 
 from brewlog.brew.utils import BrewUtils
+from brewlog.models import Brew
 
 
 @pytest.mark.usefixtures('app')
@@ -91,6 +92,38 @@ class TestBrewUtilsStateFermenting:
         assert len(ret) == 2
 
 
+@pytest.mark.usefixtures('app')
+class TestBrewUtilsStateLists:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, brew_factory):
+        today = date.today()
+        self.fermenting = brew_factory(date_brewed=today - timedelta(days=7))
+        self.maturing = brew_factory(
+            date_brewed=today - timedelta(days=30),
+            bottling_date=today - timedelta(days=10),
+        )
+        self.on_tap = brew_factory(
+            date_brewed=today - timedelta(days=60),
+            bottling_date=today - timedelta(days=40),
+            tapped=today - timedelta(days=2),
+        )
+        brew_factory(
+            date_brewed=today - timedelta(days=90),
+            bottling_date=today - timedelta(days=70),
+            tapped=today - timedelta(days=40), finished=today - timedelta(days=1),
+        )
+
+    @pytest.mark.parametrize('method,attr', [
+        ('fermenting', 'fermenting'),
+        ('maturing', 'maturing'),
+        ('on_tap', 'on_tap'),
+    ])
+    def test_state_list(self, method, attr):
+        ret = getattr(BrewUtils, method)()
+        assert ret == [getattr(self, attr)]
+
+
 @pytest.mark.usefixtures('app')
 class TestBrewListQuery:
 
@@ -120,3 +153,29 @@ class TestBrewListQuery:
         q = BrewUtils.brew_list_query(extra_user=owner).all()
         assert brew_1 in q
         assert brew_2 in q
+
+    def test_anon_private_brewer(self, user_factory, brewery_factory, brew_factory):
+        brewery = brewery_factory(brewer=user_factory(is_public=False))
+        brew = brew_factory(brewery=brewery, is_public=True)
+        assert brew not in BrewUtils.brew_list_query().all()
+
+    def test_public_query_without_joins(self):
+        query = BrewUtils.brew_list_query(loading=None)
+        assert 'JOIN' not in str(query.statement).upper()
+
+    def test_owner_latest_merged(self, user_factory, brewery_factory, brew_factory):
+        owner = user_factory(is_public=True)
+        brewery = brewery_factory(brewer=owner)
+        start = datetime(2020, 1, 1)
+        brews = [
+            brew_factory(
+                brewery=brewery, is_public=num % 2 == 0,
+                created=start + timedelta(days=num),
+            ) for num in range(4)
+        ]
+        brew_factory(is_public=False, created=start + timedelta(days=10))
+        assert len(BrewUtils.brew_list_queries(extra_user=owner)) == 2
+        latest = BrewUtils.latest(
+            Brew.created, limit=3, public_only=True, extra_user=owner
+        )
+        assert latest == brews[:0:-1]
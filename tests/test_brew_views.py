@@ -1,4 +1,6 @@
 import datetime
+import html
+import re
 
 import pytest
 from flask import url_for
@@ -37,6 +39,38 @@ class TestBrewDetailsView(BrewViewTests):
         rv = self.client.get(url_for('brew.details', brew_id=666))
         assert rv.status_code == 404
 
+    def test_not_modified(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        db.session.commit()
+        rv = self.client.get(self.url(brew))
+        etag = rv.headers['ETag']
+        assert rv.headers['Vary'] == 'Cookie'
+        rv = self.client.get(self.url(brew), headers={'If-None-Match': etag})
+        assert rv.status_code == 304
+        assert rv.data == b''
+        tasting_note_factory(brew=brew)
+        db.session.commit()
+        rv = self.client.get(self.url(brew), headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+
+    def test_not_modified_other_viewer(self, brew_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        db.session.commit()
+        etag = self.client.get(self.url(brew)).headers['ETag']
+        self.login(self.hidden_user.email)
+        rv = self.client.get(self.url(brew), headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+
+    def test_not_modified_skipped_with_flashes(self, brew_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        db.session.commit()
+        etag = self.client.get(self.url(brew)).headers['ETag']
+        with self.client.session_transaction() as sess:
+            sess['_flashes'] = [('info', 'message')]
+        rv = self.client.get(self.url(brew), headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+        assert 'ETag' not in rv.headers
+
     def test_get_no_access_hidden_brewery(self, brew_factory):
         brew = brew_factory(brewery=self.hidden_brewery, name='hb1')
         self.login(self.public_user.email)
@@ -130,6 +164,47 @@ class TestBrewDetailsView(BrewViewTests):
         rv = self.client.get(self.url(brew))
         assert 'apparent' not in rv.text
 
+    @pytest.mark.parametrize('anon', [
+        False, True,
+    ], ids=['authenticated', 'anonymous'])
+    def test_fermentation_steps_nonowner(
+                self, anon, brew_factory, fermentation_step_factory,
+            ):
+        brew = brew_factory(brewery=self.public_brewery, name='pb1')
+        fstep = fermentation_step_factory(brew=brew, name='primary')
+        if not anon:
+            self.login(self.hidden_user.email)
+        rv = self.client.get(self.url(brew))
+        assert 'primary' in rv.text
+        assert url_for('ferm.fermentation_step', fstep_id=fstep.id) not in rv.text
+        assert url_for('ferm.fermentationstep_add', brew_id=brew.id) not in rv.text
+        assert f'action="{self.url(brew)}"' not in rv.text
+
+    def test_tasting_notes_window(self, app, brew_factory, tasting_note_factory):
+        app.config['TASTING_NOTES_PAGE_SIZE'] = 2
+        brew = brew_factory(brewery=self.public_brewery, name='pb1')
+        notes = [
+            tasting_note_factory(
+                brew=brew, date=datetime.date(2020, 1, day), text=f'note no {day}',
+            )
+            for day in range(1, 4)
+        ]
+        rv = self.client.get(self.url(brew))
+        assert notes[2].text in rv.text
+        assert notes[1].text in rv.text
+        assert notes[0].text not in rv.text
+        more_url = html.escape(url_for('tastingnote.brew', brew_id=brew.id))
+        assert more_url in rv.text
+
+    def test_fermentation_steps_owner(self, brew_factory, fermentation_step_factory):
+        brew = brew_factory(brewery=self.public_brewery, name='pb1')
+        fstep = fermentation_step_factory(brew=brew, name='primary')
+        self.login(self.public_user.email)
+        rv = self.client.get(self.url(brew))
+        assert url_for('ferm.fermentation_step', fstep_id=fstep.id) in rv.text
+        assert url_for('ferm.fermentationstep_add', brew_id=brew.id) in rv.text
+        assert f'action="{self.url(brew)}"' in rv.text
+
 
 @pytest.mark.usefixtures('client_class')
 class TestBrewDetailsNavigation(BrewViewTests):
@@ -209,6 +284,18 @@ class TestBrewListView(BrewViewTests):
         assert f'href="{self.details_url(hb3)}"' not in rv.text
         assert f'href="{self.details_url(hb4)}"' not in rv.text
 
+    def test_keyset_pages(self, brew_factory):
+        brews = [brew_factory(brewery=self.public_brewery) for _ in range(25)]
+        rv = self.client.get(self.url)
+        assert f'href="{self.details_url(brews[-1])}"' in rv.text
+        assert f'href="{self.details_url(brews[0])}"' not in rv.text
+        next_link = re.search(r'href="([^"]+c=[^"]+)" aria-label="next"', rv.text)
+        assert next_link is not None
+        rv = self.client.get(html.unescape(next_link.group(1)))
+        assert f'href="{self.details_url(brews[0])}"' in rv.text
+        assert f'href="{self.details_url(brews[-1])}"' not in rv.text
+        assert 'aria-label="previous"' in rv.text
+
 
 @pytest.mark.usefixtures('client_class')
 class TestJsonViews(BrewViewTests):
@@ -242,6 +329,20 @@ class TestJsonViews(BrewViewTests):
         data = rv.get_json()
         assert len(data) == 0
 
+    def test_search_not_modified(self, brew_factory):
+        brew = brew_factory(brewery=self.public_brewery, name='pb1')
+        db.session.commit()
+        url = url_for('brew.search', q='pb')
+        etag = self.client.get(url).headers['ETag']
+        rv = self.client.get(url, headers={'If-None-Match': etag})
+        assert rv.status_code == 304
+        brew.name = 'pb2'
+        db.session.add(brew)
+        db.session.commit()
+        rv = self.client.get(url, headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+        assert rv.get_json()[0]['name'] == 'pb2'
+
     def test_search_auth(self, brew_factory):
         brew_p = brew_factory(brewery=self.public_brewery, name='pb1')
         brew_h = brew_factory(brewery=self.public_brewery, name='hb2', is_public=False)
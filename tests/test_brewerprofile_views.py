@@ -53,6 +53,17 @@ class TestBrewerProfileDetailsView(BrewlogTests):
     def url(self, user):
         return url_for('profile.details', user_id=user.id)
 
+    def test_not_modified(self, user_factory, brewery_factory):
+        user = user_factory(is_public=True)
+        db.session.commit()
+        etag = self.client.get(self.url(user)).headers['ETag']
+        rv = self.client.get(self.url(user), headers={'If-None-Match': etag})
+        assert rv.status_code == 304
+        brewery_factory(brewer=user)
+        db.session.commit()
+        rv = self.client.get(self.url(user), headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+
     @pytest.mark.parametrize('anon', [
         True, False,
     ], ids=['anon', 'authenticated'])
@@ -87,6 +98,22 @@ class TestBrewerProfileDetailsView(BrewlogTests):
         rv = self.client.get(url)
         assert f'action="{url}"' in rv.text
 
+    @pytest.mark.parametrize('owner', [True, False], ids=['owner', 'nonowner'])
+    def test_latest_brews(self, owner, user_factory, brewery_factory, brew_factory):
+        user = user_factory(is_public=True)
+        brewery = brewery_factory(brewer=user, name='brewery no 1')
+        public_brew = brew_factory(brewery=brewery, is_public=True)
+        hidden_brew = brew_factory(brewery=brewery, is_public=False)
+        actor = user if owner else user_factory()
+        self.login(actor.email)
+        rv = self.client.get(self.url(user))
+        public_url = url_for('brew.details', brew_id=public_brew.id)
+        hidden_url = url_for('brew.details', brew_id=hidden_brew.id)
+        assert f'href="{public_url}"' in rv.text
+        assert bool(f'href="{hidden_url}"' in rv.text) is owner
+        num_brews = 2 if owner else 1
+        assert f'({num_brews} brew' in rv.text
+
     @pytest.mark.parametrize('anon', [
         True, False,
     ], ids=['anon', 'authenticated'])
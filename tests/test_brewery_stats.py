@@ -0,0 +1,127 @@
+import datetime
+
+import pytest
+
+from brewlog.brewery.stats import BreweryStats
+from brewlog.cli import refresh_state
+from brewlog.ext import db
+from brewlog.models import Brew, Brewery
+
+
+@pytest.mark.usefixtures('app')
+class TestBreweryStats:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, brewery_factory):
+        self.brewery = brewery_factory()
+
+    def test_compute(self, brew_factory, fermentation_step_factory):
+        for og, fg, volume, public in [(12, 3, 20, True), (16, 4, 10, False)]:
+            brew = brew_factory(
+                brewery=self.brewery, is_public=public,
+                date_brewed=datetime.date(2020, 5, og),
+            )
+            fermentation_step_factory(brew=brew, og=og, fg=fg, volume=volume)
+        brew_factory(brewery=self.brewery, is_draft=True)
+        stats = BreweryStats.compute(db.session.connection(), self.brewery.id)
+        everything, public = stats['scopes']['all'], stats['scopes']['public']
+        assert everything['brews'] == 3
+        assert everything['states'] == {'fermenting': 2, 'planned': 1}
+        assert everything['og'] == {'avg': 14, 'min': 12, 'max': 16}
+        assert everything['volume'] == 30
+        assert everything['first_brewed'] == '2020-05-12'
+        assert everything['last_brewed'] == '2020-05-16'
+        assert public['brews'] == 1
+        assert public['fg'] == {'avg': 3, 'min': 3, 'max': 3}
+        assert public['abv'] is not None
+
+    def test_compute_empty(self):
+        stats = BreweryStats.compute(db.session.connection(), self.brewery.id)
+        assert stats['scopes']['public']['brews'] == 0
+        assert stats['scopes']['public']['og'] is None
+
+    def test_refreshed_after_commit(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.brewery)
+        db.session.commit()
+        assert self.brewery.stats['scopes']['all']['brews'] == 1
+        tasting_note_factory(brew=brew)
+        db.session.commit()
+        assert BreweryStats.get(self.brewery)['tasting_notes'] == 1
+
+    def test_refresh_keeps_timestamp(self):
+        past = datetime.datetime(2019, 1, 1)
+        self.brewery.updated = past
+        db.session.commit()
+        BreweryStats.refresh(self.brewery.id)
+        db.session.expire_all()
+        assert self.brewery.stats['scopes']['all']['brews'] == 0
+        assert self.brewery.updated == past
+
+    def test_step_change(self, brew_factory, fermentation_step_factory):
+        brew = brew_factory(brewery=self.brewery)
+        db.session.commit()
+        fermentation_step_factory(brew=brew, og=11)
+        db.session.commit()
+        assert BreweryStats.get(self.brewery)['og']['max'] == 11
+
+    def test_move(self, brew_factory, brewery_factory):
+        brew = brew_factory(brewery=self.brewery)
+        other = brewery_factory()
+        db.session.commit()
+        brew.brewery = other
+        db.session.commit()
+        assert BreweryStats.get(self.brewery)['brews'] == 0
+        assert BreweryStats.get(other)['brews'] == 1
+
+    def test_debounced(self, app, brew_factory, mocker):
+        db.session.commit()
+        enqueue = mocker.spy(app.queue, 'enqueue')
+        app.redis.set(BreweryStats.pending_key(self.brewery.id), 1)
+        brew_factory(brewery=self.brewery)
+        db.session.commit()
+        enqueue.assert_not_called()
+
+    def test_delayed(self, app, mocker):
+        app.config['BREWERY_STATS_DELAY'] = 30
+        enqueue_in = mocker.patch.object(app.queue, 'enqueue_in')
+        BreweryStats.schedule([self.brewery.id])
+        BreweryStats.schedule([self.brewery.id])
+        enqueue_in.assert_called_once_with(
+            datetime.timedelta(seconds=30), 'brewlog.tasks.refresh_brewery_stats',
+            self.brewery.id,
+        )
+        ttl = app.redis.ttl(BreweryStats.pending_key(self.brewery.id))
+        assert 30 < ttl <= 60
+
+    def test_not_scheduled_on_rollback(self, app, brew_factory, mocker):
+        db.session.commit()
+        schedule = mocker.spy(BreweryStats, 'schedule')
+        brew_factory(brewery=self.brewery)
+        db.session.rollback()
+        schedule.assert_not_called()
+
+    def test_missing_scheduled_on_get(self, app):
+        db.session.commit()
+        app.redis.delete(BreweryStats.pending_key(self.brewery.id))
+        db.session.execute(db.text('UPDATE brewery SET stats = NULL'))
+        db.session.commit()
+        assert BreweryStats.get(self.brewery) is None
+        db.session.expire_all()
+        assert BreweryStats.get(self.brewery)['brews'] == 0
+
+    def test_state_refresh(self, app, brew_factory):
+        brew = brew_factory(brewery=self.brewery, date_brewed=datetime.date.today())
+        db.session.commit()
+        brewery_id = self.brewery.id
+        # brew made stale as if it was saved before brewing date
+        brew_table = Brew.__table__
+        db.session.execute(
+            brew_table.update().where(brew_table.c.id == brew.id)
+            .values(state='planned')
+        )
+        db.session.commit()
+        BreweryStats.refresh(brewery_id)
+        rv = app.test_cli_runner().invoke(refresh_state)
+        assert rv.exit_code == 0, rv.output
+        stats = Brewery.query.get(brewery_id).stats
+        assert stats['scopes']['all']['states'] == {'fermenting': 1}
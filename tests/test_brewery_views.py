@@ -2,6 +2,8 @@ import pytest
 from flask import url_for
 from markdown import markdown
 
+from brewlog.ext import db
+
 from . import BrewlogTests
 
 
@@ -55,6 +57,21 @@ class TestBreweryDetailsView(BrewlogTests):
     def url(self, brewery):
         return url_for('brewery.details', brewery_id=brewery.id)
 
+    def test_not_modified(self, brewery_factory, brew_factory):
+        brewery = brewery_factory(name='brewery no 1')
+        db.session.commit()
+        rv = self.client.get(self.url(brewery))
+        last_modified = rv.headers['Last-Modified']
+        etag = rv.headers['ETag']
+        rv = self.client.get(
+            self.url(brewery), headers={'If-Modified-Since': last_modified}
+        )
+        assert rv.status_code == 304
+        brew_factory(brewery=brewery)
+        db.session.commit()
+        rv = self.client.get(self.url(brewery), headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+
     @pytest.mark.parametrize('anonymous', [True, False], ids=['anon', 'actor'])
     def test_get_nonowner_public(self, anonymous, user_factory, brewery_factory):
         owner = user_factory(is_public=True)
@@ -87,6 +104,37 @@ class TestBreweryDetailsView(BrewlogTests):
         rv = self.client.get(url)
         assert f'action="{url}"' in rv.text
 
+    @pytest.mark.parametrize('owner', [True, False], ids=['owner', 'nonowner'])
+    def test_recent_brews(self, owner, user_factory, brewery_factory, brew_factory):
+        brewer = user_factory(is_public=True)
+        brewery = brewery_factory(brewer=brewer, name='brewery no 1')
+        public_brew = brew_factory(brewery=brewery, is_public=True)
+        hidden_brew = brew_factory(brewery=brewery, is_public=False)
+        actor = brewer if owner else user_factory()
+        self.login(actor.email)
+        rv = self.client.get(self.url(brewery))
+        public_url = url_for('brew.details', brew_id=public_brew.id)
+        hidden_url = url_for('brew.details', brew_id=hidden_brew.id)
+        assert f'href="{public_url}"' in rv.text
+        assert bool(f'href="{hidden_url}"' in rv.text) is owner
+
+    @pytest.mark.parametrize('owner', [True, False], ids=['owner', 'nonowner'])
+    def test_statistics(
+                self, owner, user_factory, brewery_factory, brew_factory,
+                tasting_note_factory,
+            ):
+        brewer = user_factory(is_public=True)
+        brewery = brewery_factory(brewer=brewer, name='brewery no 1')
+        tasting_note_factory(brew=brew_factory(brewery=brewery, is_public=True))
+        brew_factory(brewery=brewery, is_public=False)
+        actor = brewer if owner else user_factory()
+        db.session.commit()
+        self.login(actor.email)
+        rv = self.client.get(self.url(brewery))
+        assert 'Statistics' in rv.text
+        expected = '2 (planned: 2)' if owner else '1 (planned: 1)'
+        assert expected in rv.text
+
     @pytest.mark.parametrize('anonymous', [True, False], ids=['anon', 'actor'])
     def test_post_nonowner_public(self, anonymous, user_factory, brewery_factory):
         owner = user_factory(is_public=True)
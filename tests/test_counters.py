@@ -0,0 +1,93 @@
+import datetime
+
+import pytest
+
+from brewlog.cli import reconcile_counters
+from brewlog.ext import db
+from brewlog.models import Brew, Brewery, BrewerProfile
+from brewlog.models.counters import refresh_counters
+
+
+@pytest.mark.usefixtures('app')
+class TestCounters:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, user_factory, brewery_factory):
+        self.brewer = user_factory()
+        self.brewery = brewery_factory(brewer=self.brewer)
+
+    def test_insert(self, brew_factory, tasting_note_factory, user_factory):
+        brew = brew_factory(brewery=self.brewery)
+        brew_factory(brewery=self.brewery)
+        author = user_factory()
+        tasting_note_factory(brew=brew, author=author)
+        db.session.flush()
+        assert self.brewer.brewery_count == 1
+        assert self.brewery.brew_count == 2
+        assert brew.tasting_note_count == 1
+        assert author.tasting_note_count == 1
+        assert self.brewer.tasting_note_count == 0
+
+    def test_delete(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.brewery)
+        author = tasting_note_factory(brew=brew).author
+        db.session.commit()
+        db.session.delete(brew)
+        db.session.commit()
+        assert self.brewery.brew_count == 0
+        assert author.tasting_note_count == 0
+
+    def test_cascade(self, brew_factory, tasting_note_factory, user_factory):
+        author = user_factory()
+        tasting_note_factory(brew=brew_factory(brewery=self.brewery), author=author)
+        db.session.commit()
+        db.session.delete(self.brewer)
+        db.session.commit()
+        assert author.tasting_note_count == 0
+
+    def test_move(self, brew_factory, brewery_factory):
+        brew = brew_factory(brewery=self.brewery)
+        other = brewery_factory()
+        db.session.commit()
+        brew.brewery = other
+        db.session.commit()
+        assert (self.brewery.brew_count, other.brew_count) == (0, 1)
+        brew.brewery_id = self.brewery.id
+        db.session.commit()
+        assert (self.brewery.brew_count, other.brew_count) == (1, 0)
+
+    def test_author_timestamp_kept(
+                self, brew_factory, tasting_note_factory, user_factory,
+            ):
+        brew = brew_factory(brewery=self.brewery)
+        author = user_factory()
+        past = datetime.datetime(2019, 1, 1)
+        author.updated = past
+        db.session.commit()
+        tasting_note_factory(brew=brew, author=author)
+        db.session.commit()
+        assert author.tasting_note_count == 1
+        assert author.updated == past
+
+    def test_refresh(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.brewery)
+        tasting_note_factory(brew=brew)
+        db.session.commit()
+        assert refresh_counters(db.session.connection()) == 0
+        db.session.execute(Brewery.__table__.update().values(brew_count=5))
+        db.session.execute(Brew.__table__.update().values(tasting_note_count=0))
+        db.session.execute(BrewerProfile.__table__.update().values(brewery_count=3))
+        assert refresh_counters(db.session.connection()) == 4
+        db.session.expire_all()
+        assert self.brewery.brew_count == 1
+        assert brew.tasting_note_count == 1
+        assert self.brewer.brewery_count == 1
+
+    def test_command(self, app):
+        brewery_id = self.brewery.id
+        db.session.execute(Brewery.__table__.update().values(brew_count=2))
+        db.session.commit()
+        rv = app.test_cli_runner().invoke(reconcile_counters)
+        assert rv.exit_code == 0, rv.output
+        assert '1 counter value(s) repaired' in rv.output
+        assert Brewery.query.get(brewery_id).brew_count == 0
@@ -0,0 +1,182 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from brewlog.ext import db
+from brewlog.home.utils import SECTIONS, DashboardUtils, HomeSnapshot
+
+
+@pytest.mark.usefixtures('app')
+class TestDashboardUtils:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, user_factory, brewery_factory, brew_factory):
+        today = date.today()
+        self.user = user_factory()
+        brewery = brewery_factory(brewer=self.user)
+        self.planned = brew_factory(brewery=brewery, name='planned', date_brewed=None)
+        self.fermenting = brew_factory(
+            brewery=brewery, name='fermenting', code='12',
+            date_brewed=today - timedelta(days=5),
+        )
+        self.maturing = brew_factory(
+            brewery=brewery, name='maturing', date_brewed=today - timedelta(days=40),
+            bottling_date=today - timedelta(days=20),
+        )
+        self.on_tap = brew_factory(
+            brewery=brewery, name='on tap', date_brewed=today - timedelta(days=60),
+            bottling_date=today - timedelta(days=40), tapped=today,
+        )
+        brew_factory(name='other user brew', date_brewed=today)
+
+    @pytest.fixture(params=[True, False], ids=['window', 'subquery'])
+    def windows(self, request, mocker):
+        mocker.patch(
+            'brewlog.home.utils._supports_window_functions',
+            return_value=request.param,
+        )
+
+    @pytest.mark.usefixtures('windows')
+    def test_lists(self, tasting_note_factory):
+        tasting_note_factory(brew=self.maturing, author=self.user, date=date.today())
+        tasting_note_factory(brew=self.maturing)
+        lists = DashboardUtils.shortlists(self.user.id)
+        assert set(lists) == set(SECTIONS)
+        ids = {name: [item.id for item in items] for name, items in lists.items()}
+        assert ids['latest_recipes'] == [
+            self.on_tap.id, self.maturing.id, self.fermenting.id, self.planned.id,
+        ]
+        assert ids['recently_brewed'] == [
+            self.fermenting.id, self.maturing.id, self.on_tap.id,
+        ]
+        assert ids['recent_reviews'] == [self.maturing.id]
+        assert lists['recent_reviews'][0].date == date.today()
+        assert ids['fermenting'] == [self.fermenting.id]
+        assert lists['fermenting'][0].full_name == '#12 fermenting'
+        assert ids['maturing'] == [self.maturing.id]
+        assert lists['maturing'][0].date == self.maturing.bottling_date
+        assert ids['on_tap'] == [self.on_tap.id]
+
+    @pytest.mark.usefixtures('windows')
+    def test_limit(self):
+        lists = DashboardUtils.shortlists(self.user.id, limit=2)
+        assert [item.id for item in lists['latest_recipes']] == [
+            self.on_tap.id, self.maturing.id,
+        ]
+        assert len(lists['recently_brewed']) == 2
+
+    @pytest.mark.usefixtures('windows')
+    def test_ties_ordered_by_id(self, brew_factory):
+        same_day = brew_factory(
+            brewery=self.fermenting.brewery, date_brewed=self.fermenting.date_brewed,
+        )
+        lists = DashboardUtils.shortlists(self.user.id)
+        assert [item.id for item in lists['recently_brewed']][:2] == [
+            same_day.id, self.fermenting.id,
+        ]
+
+    def test_subquery_order_explicit(self, mocker):
+        mocker.patch(
+            'brewlog.home.utils._supports_window_functions', return_value=False
+        )
+        execute = mocker.spy(db.session, 'execute')
+        DashboardUtils.shortlists(self.user.id)
+        query = execute.call_args[0][0]
+        assert [str(clause) for clause in query._order_by_clause] == [
+            'dashboard.section', 'dashboard.sort_key DESC', 'dashboard.sort_id DESC',
+        ]
+
+
+@pytest.mark.usefixtures('app')
+class TestHomeSnapshot:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, app):
+        self.redis = app.redis
+
+    def make_stale(self):
+        document = json.loads(self.redis.get(HomeSnapshot.KEY))
+        document['built'] -= 3600
+        self.redis.set(HomeSnapshot.KEY, json.dumps(document))
+
+    def test_built_when_missing(self, brew_factory):
+        brew = brew_factory()
+        context = HomeSnapshot.get()
+        assert [b.id for b in context['latest_brews']] == [brew.id]
+        assert self.redis.get(HomeSnapshot.KEY) is not None
+
+    def test_fresh_served_without_queries(self, brew_factory):
+        brew_factory(name='first')
+        HomeSnapshot.get()
+        brew_factory(name='second')
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        db.event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            context = HomeSnapshot.get()
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', count)
+        assert statements == []
+        assert [b.full_name for b in context['latest_brews']] == ['first']
+
+    def test_stale_served_and_refreshed(self, brew_factory, user_factory):
+        user = user_factory()
+        HomeSnapshot.get()
+        self.make_stale()
+        brew_factory(name='new')
+        context = HomeSnapshot.get()
+        assert context['latest_brews'] == []
+        assert context['latest_brewers'][0].created == user.created
+        context = HomeSnapshot.get()
+        assert [b.full_name for b in context['latest_brews']] == ['new']
+        assert self.redis.get(HomeSnapshot.LOCK_KEY) is None
+
+    def test_single_refresh_enqueued(self, app, mocker):
+        HomeSnapshot.get()
+        self.make_stale()
+        enqueue = mocker.patch.object(app.queue, 'enqueue')
+        HomeSnapshot.get()
+        HomeSnapshot.get()
+        enqueue.assert_called_once_with('brewlog.tasks.refresh_home_snapshot')
+
+    def test_invalid_document_rebuilt(self, brew_factory):
+        self.redis.set(HomeSnapshot.KEY, '{"v": 1}')
+        brew = brew_factory()
+        context = HomeSnapshot.get()
+        assert [b.id for b in context['latest_brews']] == [brew.id]
+
+    def test_missing_built_once(self, app, mocker, brew_factory):
+        brew_factory()
+        self.redis.set(HomeSnapshot.LOCK_KEY, 1)
+        app.config['HOME_SNAPSHOT_WAIT'] = 0.1
+        build = mocker.spy(HomeSnapshot, 'build')
+        context = HomeSnapshot.get()
+        build.assert_not_called()
+        assert context['latest_brews'] == []
+        assert self.redis.get(HomeSnapshot.KEY) is None
+
+    def test_missing_waits_for_build(self, app, mocker, brew_factory):
+        brew = brew_factory()
+        HomeSnapshot.get()
+        document = self.redis.get(HomeSnapshot.KEY)
+        self.redis.delete(HomeSnapshot.KEY)
+        self.redis.set(HomeSnapshot.LOCK_KEY, 1)
+        # another request stores snapshot while this one waits
+        mocker.patch(
+            'brewlog.home.utils.time.sleep',
+            side_effect=lambda _: self.redis.set(HomeSnapshot.KEY, document),
+        )
+        build = mocker.spy(HomeSnapshot, 'build')
+        context = HomeSnapshot.get()
+        build.assert_not_called()
+        assert [b.id for b in context['latest_brews']] == [brew.id]
+
+    def test_failed_build_releases_lock(self, mocker):
+        mocker.patch.object(HomeSnapshot, 'build', side_effect=RuntimeError)
+        with pytest.raises(RuntimeError):
+            HomeSnapshot.get()
+        assert self.redis.get(HomeSnapshot.LOCK_KEY) is None
@@ -0,0 +1,71 @@
+import json
+import re
+
+import pytest
+from flask import url_for
+
+from brewlog.ext import db
+from brewlog.utils import instrumentation
+
+from . import BrewlogTests
+
+_timing_re = re.compile(
+    r'^db;dur=[\d.]+;desc="(?P<count>\d+) queries", '
+    r'tpl;dur=(?P<tpl>[\d.]+), total;dur=[\d.]+$'
+)
+
+
+@pytest.mark.usefixtures('client_class')
+class TestRequestInstrumentation(BrewlogTests):
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, user_factory, brewery_factory):
+        self.user = user_factory(is_public=True)
+        self.brewery = brewery_factory(brewer=self.user, name='instrumented')
+        db.session.commit()
+        self.url = url_for('brewery.details', brewery_id=self.brewery.id)
+
+    def test_server_timing_header(self, config):
+        config['SERVER_TIMING_HEADER'] = True
+        rv = self.client.get(self.url)
+        match = _timing_re.match(rv.headers['Server-Timing'])
+        assert match is not None
+        assert int(match.group('count')) > 0
+        assert float(match.group('tpl')) > 0
+
+    def test_server_timing_header_disabled(self, config):
+        config['SERVER_TIMING_HEADER'] = False
+        rv = self.client.get(self.url)
+        assert 'Server-Timing' not in rv.headers
+
+    def test_server_timing_header_disabled_by_default(self):
+        rv = self.client.get(self.url)
+        assert 'Server-Timing' not in rv.headers
+
+    def test_server_timing_header_debug(self, app, config):
+        config['SERVER_TIMING_HEADER'] = False
+        app.debug = True
+        rv = self.client.get(self.url)
+        assert _timing_re.match(rv.headers['Server-Timing']) is not None
+
+    def test_slow_request_logged(self, app, config, mocker):
+        config['SLOW_REQUEST_QUERY_COUNT'] = 1
+        logger = mocker.patch.object(app, 'logger')
+        self.client.get(self.url)
+        logger.warning.assert_called_once()
+        record = json.loads(logger.warning.call_args[0][0])
+        assert record['event'] == 'slow_request'
+        assert record['endpoint'] == 'brewery.details'
+        assert record['query_count'] > 1
+        assert record['worst_statement'].startswith('SELECT')
+
+    def test_fast_request_not_logged(self, app, config, mocker):
+        config['SLOW_REQUEST_QUERY_COUNT'] = 0
+        config['SLOW_REQUEST_TIME'] = 0
+        logger = mocker.patch.object(app, 'logger')
+        self.client.get(self.url)
+        logger.warning.assert_not_called()
+
+    def test_no_stats_outside_request(self):
+        db.session.query(db.func.count('*')).scalar()
+        assert instrumentation.current_stats() is None
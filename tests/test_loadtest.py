@@ -0,0 +1,79 @@
+import pytest
+
+from brewlog.cli import load_test
+from brewlog.ext import db
+from brewlog.utils import loadtest
+from brewlog.utils.seed import SeedOptions, generate
+
+
+@pytest.fixture
+def plan(app):
+    generate(
+        db.session.connection(),
+        SeedOptions(brews=60, private_users=0, password='secret'),
+    )
+    db.session.commit()
+    return loadtest.build_plan(sample_size=20)
+
+
+@pytest.mark.usefixtures('app')
+class TestLoadTest:
+
+    def test_plan(self, plan):
+        assert len(plan.brews) == 20
+        assert plan.notes
+        assert plan.credentials
+        assert plan.brews[0].startswith('/brew/')
+
+    def test_run_in_process(self, app, plan):
+        settings = loadtest.Settings(
+            duration=0.5, auth_ratio=0.5, password='secret',
+            mix={'brew_list': 1, 'typeahead': 1},
+        )
+        samples, wall_time = loadtest.run(plan, settings, workers=1, app=app)
+        summary = loadtest.summarize(samples, wall_time)
+        assert summary['auth.login']['statuses'] == {'302': 1}
+        assert {'brew.all', 'brew.all (deep)', 'brew.search'} < set(summary)
+        assert summary['total']['errors'] == 0
+        assert summary['total']['requests'] == len(samples)
+
+    def test_failed_login_is_error(self, app, plan):
+        settings = loadtest.Settings(
+            duration=0, auth_ratio=1, password='wrong', mix={'home': 1},
+        )
+        samples, wall_time = loadtest.run(plan, settings, workers=1, app=app)
+        summary = loadtest.summarize(samples, wall_time)
+        assert summary['auth.login']['statuses'] == {'401': 1}
+        assert summary['auth.login']['error_rate'] == 1
+
+    def test_summary(self):
+        samples = [('home', 200, float(ms)) for ms in range(1, 101)]
+        samples.append(('home', 500, 1.0))
+        stats = loadtest.summarize(samples, 2)['home']
+        assert stats['requests'] == 101
+        assert stats['errors'] == 1
+        assert stats['throughput'] == 50.5
+        assert stats['p50_ms'] == 50
+        assert stats['max_ms'] == 100
+
+    @pytest.mark.parametrize('items', [['home'], ['nope=1'], ['home=x']])
+    def test_parse_mix_invalid(self, items):
+        with pytest.raises(ValueError):
+            loadtest.parse_mix(items)
+
+    def test_parse_mix(self):
+        mix = loadtest.parse_mix(['home=0', 'typeahead=50'])
+        assert mix['home'] == 0
+        assert mix['typeahead'] == 50
+        assert mix['brew_details'] == loadtest.DEFAULT_MIX['brew_details']
+
+    def test_command(self, app, plan, tmp_path):
+        output = tmp_path / 'results.json'
+        rv = app.test_cli_runner().invoke(load_test, [
+            '--workers', '1', '--duration', '0.2', '--mix', 'home=1',
+            '--output', str(output),
+        ])
+        assert rv.exit_code == 0, rv.output
+        assert 'skipping authenticated traffic' in rv.output
+        assert 'total' in rv.output
+        assert output.exists()
@@ -3,6 +3,8 @@ import os
 import pytest
 from flask import url_for
 
+from brewlog.ext import db
+
 from . import BrewlogTests
 
 
@@ -145,6 +147,29 @@ class TestMainPageLoggedInRegularUser(BrewlogTests):
         assert regular_brew.name in rv.text
         assert hidden_brew.name in rv.text
 
+    def test_dashboard_query_count(
+                self, brew_factory, brewery_factory, tasting_note_factory,
+            ):
+        brewery = brewery_factory(brewer=self.user)
+        for _ in range(3):
+            brew = brew_factory(brewery=brewery)
+            tasting_note_factory(brew=brew, author=self.user)
+        db.session.commit()
+        self.login(self.user.email)
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        db.event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            rv = self.client.get(self.url)
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', count)
+        assert rv.status_code == 200
+        # dashboard lists only, user is served from principal cache
+        assert len(statements) == 1, statements
+
 
 @pytest.mark.usefixtures('client_class')
 class TestMainPageLoggedInHiddenUser(BrewlogTests):
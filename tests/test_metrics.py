@@ -0,0 +1,101 @@
+import pytest
+import rq
+from flask import url_for
+
+from brewlog import make_app
+from brewlog.ext import db
+from brewlog.utils.metrics import setup_metrics
+
+from . import BrewlogTests
+from .conftest import BrewlogTestResponse
+
+
+def _sample(text, name, **labels):
+    prefix = name
+    if labels:
+        prefix += '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+    for line in text.splitlines():
+        if line.startswith(prefix + ' '):
+            return float(line.split()[-1])
+    return None
+
+
+def test_disabled_by_default(app):
+    assert not hasattr(app, 'metrics')
+    assert 'metrics' not in app.view_functions
+
+
+@pytest.mark.usefixtures('client_class')
+class TestMetricsEndpoint(BrewlogTests):
+
+    @pytest.fixture
+    def app(self):
+        app = make_app('test')
+        app.response_class = BrewlogTestResponse
+        app.config['METRICS_ENABLED'] = True
+        # jobs are kept in queue as there is no worker to run them
+        app.queue = rq.Queue('brewlog', connection=app.redis)
+        with app.app_context():
+            setup_metrics(app)
+            db.create_all()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, user_factory):
+        self.user = user_factory(is_public=True)
+        db.session.commit()
+        self.url = url_for('metrics')
+
+    def test_request_metrics(self):
+        self.client.get(url_for('profile.details', user_id=self.user.id))
+        text = self.client.get(self.url).text
+        assert _sample(
+            text, 'brewlog_request_duration_seconds_count',
+            endpoint='profile.details', method='GET', status='200',
+        ) == 1
+        assert _sample(
+            text, 'brewlog_db_statements_total', endpoint='profile.details'
+        ) > 0
+        assert _sample(
+            text, 'brewlog_request_db_statements_count', endpoint='profile.details'
+        ) == 1
+
+    def test_queue_metrics(self, app):
+        app.queue.enqueue_call('brewlog.tasks.refresh_home_snapshot')
+        job = app.queue.enqueue_call('brewlog.tasks.refresh_home_snapshot')
+        text = self.client.get(self.url).text
+        assert _sample(text, 'brewlog_queue_jobs', queue='brewlog') == 2
+        assert _sample(text, 'brewlog_queue_failed_jobs', queue='brewlog') == 0
+        app.queue.remove(job)
+        app.queue.failed_job_registry.add(job)
+        text = self.client.get(self.url).text
+        assert _sample(text, 'brewlog_queue_jobs', queue='brewlog') == 1
+        assert _sample(text, 'brewlog_queue_failed_jobs', queue='brewlog') == 1
+
+    def test_redis_and_cache_metrics(self):
+        self.login(self.user.email)
+        self.client.get(url_for('home.index'))
+        text = self.client.get(self.url).text
+        assert _sample(
+            text, 'brewlog_redis_command_duration_seconds_count', command='GET'
+        ) > 0
+        assert _sample(
+            text, 'brewlog_cache_lookups_total', cache='principal', result='miss'
+        ) >= 1
+
+    def test_pool_metrics(self):
+        text = self.client.get(self.url).text
+        assert _sample(text, 'brewlog_db_pool_checked_out') is not None
+
+    def test_token_required(self, config):
+        config['METRICS_TOKEN'] = 'secret'
+        assert self.client.get(self.url).status_code == 403
+        rv = self.client.get(self.url, headers={'Authorization': 'Bearer secret'})
+        assert rv.status_code == 200
+        assert rv.headers['Content-Type'].startswith('text/plain')
+
+    def test_address_not_allowed(self, config):
+        config['METRICS_ALLOWED_ADDRS'] = ['10.0.0.1']
+        assert self.client.get(self.url).status_code == 403
@@ -0,0 +1,62 @@
+import pytest
+
+from brewlog.auth import principal
+from brewlog.auth.principal import CachedPrincipal, full_profile
+from brewlog.ext import db
+
+
+@pytest.mark.usefixtures('app')
+class TestPrincipalCache:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, app, user_factory):
+        self.cache = app.principals
+        self.user = user_factory(nick='Brewer')
+        db.session.commit()
+
+    def test_get(self):
+        obj = self.cache.get(self.user.id)
+        assert isinstance(obj, CachedPrincipal)
+        assert obj == self.user
+        assert self.user == obj
+        assert obj.name == 'Brewer'
+        assert obj.updated == self.user.updated
+        assert obj.has_valid_password is True
+
+    def test_missing(self):
+        assert self.cache.get(self.user.id + 1) is None
+
+    def test_cached(self, mocker):
+        self.cache.get(self.user.id)
+        loader = mocker.patch.object(principal, '_load_data')
+        self.cache.get(self.user.id)
+        self.cache._local.clear()
+        assert self.cache.get(self.user.id).id == self.user.id
+        loader.assert_not_called()
+
+    def test_local_cache_bounded(self, user_factory):
+        self.cache.local_size = 2
+        for user in user_factory.create_batch(3):
+            self.cache.get(user.id)
+        assert len(self.cache._local) == 2
+
+    def test_invalidated_on_commit(self):
+        self.cache.get(self.user.id)
+        self.user.nick = 'Other'
+        db.session.add(self.user)
+        db.session.commit()
+        assert self.cache.redis.get(self.cache.key(self.user.id)) is None
+        assert self.cache.get(self.user.id).name == 'Other'
+
+    def test_not_invalidated_on_touch(self):
+        self.cache.get(self.user.id)
+        self.user.location = 'Warszawa'
+        db.session.add(self.user)
+        db.session.commit()
+        assert self.cache.redis.get(self.cache.key(self.user.id)) is not None
+
+    def test_full_profile(self):
+        obj = self.cache.get(self.user.id)
+        assert full_profile(obj) is self.user
+        assert full_profile(self.user) is self.user
+        assert obj.location == self.user.location
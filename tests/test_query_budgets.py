@@ -0,0 +1,96 @@
+import pytest
+from flask import url_for
+
+from brewlog.ext import db
+
+from . import BrewlogTests
+
+# max number of statements single request to endpoint may issue, these do
+# not depend on number of rows displayed so any lazy load in list or detail
+# page makes test fail
+BUDGETS = {
+    'brew.all': 1,
+    'brew.details': 4,
+    'brewery.all': 1,
+    'brewery.details': 2,
+    'home.index': 4,
+    'profile.brews': 2,
+    'profile.details': 4,
+    'tastingnote.all': 1,
+    'tastingnote.brew': 2,
+}
+
+# authenticated user gets dashboard instead of public snapshot, brew owner
+# gets edit form with choice of own breweries and profile owner gets brew
+# counters without counting query; lists of brews and notes are fetched with
+# separate queries for public and own non-public objects
+USER_BUDGETS = dict(BUDGETS, **{
+    'brew.all': 2,
+    'brew.details': 5,
+    'home.index': 1,
+    'profile.details': 3,
+    'tastingnote.all': 2,
+})
+
+
+@pytest.mark.usefixtures('client_class')
+class TestQueryBudgets(BrewlogTests):
+
+    # enough brews to fill more than one page of every list
+    NUM_BREWERS = 5
+    BREWS_PER_BREWER = 6
+    NOTES_PER_BREW = 3
+
+    @pytest.fixture(autouse=True)
+    def set_up(
+                self, user_factory, brewery_factory, brew_factory,
+                fermentation_step_factory, tasting_note_factory,
+            ):
+        users = user_factory.create_batch(self.NUM_BREWERS)
+        brews = []
+        for user in users:
+            brewery = brewery_factory(brewer=user)
+            for _ in range(self.BREWS_PER_BREWER):
+                brew = brew_factory(brewery=brewery)
+                fermentation_step_factory(brew=brew)
+                for author in users[:self.NOTES_PER_BREW]:
+                    tasting_note_factory(brew=brew, author=author)
+                brews.append(brew)
+        db.session.commit()
+        self.user_email = users[0].email
+        self.urls = {
+            'brew.all': url_for('brew.all'),
+            'brew.details': url_for('brew.details', brew_id=brews[0].id),
+            'brewery.all': url_for('brewery.all'),
+            'brewery.details': url_for(
+                'brewery.details', brewery_id=brews[0].brewery_id,
+            ),
+            'home.index': url_for('home.index'),
+            'profile.brews': url_for('profile.brews', user_id=users[0].id),
+            'profile.details': url_for('profile.details', user_id=users[0].id),
+            'tastingnote.all': url_for('tastingnote.all'),
+            'tastingnote.brew': url_for('tastingnote.brew', brew_id=brews[0].id),
+        }
+
+    @pytest.mark.parametrize('endpoint', list(BUDGETS))
+    def test_anon(self, endpoint, query_budget):
+        rv = self.client.get(self.urls[endpoint])
+        assert rv.status_code == 200
+        query_budget.check(endpoint, BUDGETS[endpoint])
+
+    @pytest.mark.parametrize('endpoint', list(USER_BUDGETS))
+    def test_authenticated(self, endpoint, query_budget):
+        self.login(self.user_email)
+        query_budget.reset()
+        rv = self.client.get(self.urls[endpoint])
+        assert rv.status_code == 200
+        query_budget.check(endpoint, USER_BUDGETS[endpoint])
+
+    def test_budget_exceeded(self, query_budget):
+        self.client.get(self.urls['brew.all'])
+        with pytest.raises(pytest.fail.Exception, match='budget is 0'):
+            query_budget.check('brew.all', 0)
+
+    def test_endpoint_not_requested(self, query_budget):
+        with pytest.raises(pytest.fail.Exception, match='no request'):
+            query_budget.check('brew.all', 1)
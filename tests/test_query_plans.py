@@ -0,0 +1,208 @@
+import datetime
+import random
+import re
+
+import pytest
+
+from brewlog.brew import navigation
+from brewlog.brew.utils import BrewUtils, list_query_for_user
+from brewlog.brewery.utils import BreweryUtils
+from brewlog.ext import db
+from brewlog.models import Brew, BrewerProfile, Brewery, TastingNote
+from brewlog.tasting.utils import TastingUtils
+from brewlog.utils.pagination import KeysetPagination
+from brewlog.utils.query import public_or_owner
+
+# full table scan, as opposed to "SCAN t USING INDEX ..." which walks index
+# in requested order and stops at limit
+_full_scan_re = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)(?: AS \w+)?$')
+
+# sorting is acceptable only for rows of single owner found by index
+# lookup, otherwise it means reading and sorting whole filtered set
+_temp_sort = 'USE TEMP B-TREE FOR ORDER BY'
+_owner_search_re = re.compile(
+    r'^SEARCH \w+ USING (?:COVERING )?INDEX \w+ '
+    r'\((?:brewery_id|brew_id|brewer_id|author_id)=\?\)$'
+)
+
+NUM_USERS = 200
+NUM_BREWERIES = 400
+NUM_BREWS = 4000
+NUM_NOTES = 8000
+
+STATES = ['planned', 'fermenting', 'maturing', 'tapped', 'finished']
+
+
+def _seed(connection):
+    rng = random.Random(1)
+    start = datetime.datetime(2020, 1, 1)
+    day = datetime.date(2019, 1, 1)
+    connection.execute(BrewerProfile.__table__.insert(), [
+        {
+            'id': i, 'email': f'user{i}@example.com', 'full_name': '',
+            # user checked in tests is hidden so all visibility branches run
+            'password': 'unset', 'is_public': rng.random() > 0.1 and i != 5,
+            'created': start + datetime.timedelta(hours=i), 'updated': start,
+        } for i in range(1, NUM_USERS + 1)
+    ])
+    connection.execute(Brewery.__table__.insert(), [
+        {
+            'id': i, 'name': f'brewery {i}',
+            'brewer_id': rng.randint(1, NUM_USERS),
+            'created': start + datetime.timedelta(hours=i),
+        } for i in range(1, NUM_BREWERIES + 1)
+    ])
+    brews = []
+    for i in range(1, NUM_BREWS + 1):
+        is_public = rng.random() > 0.2
+        brews.append({
+            'id': i, 'name': f'brew {i}', 'brewery_id': rng.randint(1, NUM_BREWERIES),
+            'is_public': is_public, 'effectively_public': is_public,
+            'is_draft': False, 'state': rng.choice(STATES),
+            'created': start + datetime.timedelta(hours=i),
+            'date_brewed': day + datetime.timedelta(days=i % 700),
+        })
+    connection.execute(Brew.__table__.insert(), brews)
+    connection.execute(TastingNote.__table__.insert(), [
+        {
+            'id': i, 'brew_id': rng.randint(1, NUM_BREWS),
+            'author_id': rng.randint(1, NUM_USERS), 'text': 'note',
+            'date': day + datetime.timedelta(days=i % 700),
+            'effectively_public': rng.random() > 0.2,
+        } for i in range(1, NUM_NOTES + 1)
+    ])
+    connection.execute('ANALYZE')
+
+
+def _user_brew_list(user, brewery):
+    return (
+        list_query_for_user(user)
+        .order_by(db.desc(Brew.created), db.desc(Brew.id)).limit(20).all()
+    )
+
+
+CASES = {
+    'fermenting_public': lambda user, brewery: BrewUtils.fermenting(),
+    'fermenting_user': lambda user, brewery: BrewUtils.fermenting(
+        user=user, public_only=False
+    ),
+    'latest_brews_public': lambda user, brewery: BrewUtils.latest(
+        Brew.created, public_only=True
+    ),
+    'latest_brews_user': lambda user, brewery: BrewUtils.latest(
+        Brew.created, user=user
+    ),
+    'latest_brews_extra_user': lambda user, brewery: BrewUtils.latest(
+        Brew.created, public_only=True, extra_user=user
+    ),
+    'brew_list_user': _user_brew_list,
+    'brew_list_public': lambda user, brewery: (
+        BrewUtils.brew_list_query()
+        .order_by(db.desc(Brew.created), db.desc(Brew.id)).limit(20).all()
+    ),
+    'brew_list_extra_user': lambda user, brewery: KeysetPagination(
+        BrewUtils.brew_list_queries(extra_user=user),
+        ((Brew.created, True), (Brew.id, True)), None, 20,
+    ).items,
+    'breweries_public': lambda user, brewery: (
+        BreweryUtils.breweries().order_by(Brewery.name, Brewery.id).limit(20).all()
+    ),
+    'breweries_extra_user': lambda user, brewery: KeysetPagination(
+        BreweryUtils.brewery_queries(extra_user=user),
+        ((Brewery.name, False), (Brewery.id, False)), None, 20,
+    ).items,
+    'latest_breweries': lambda user, brewery: BreweryUtils.latest_breweries(
+        Brewery.created, public_only=True
+    ),
+    'brewery_recent_brews': lambda user, brewery: (
+        BreweryUtils(brewery).recent_brews().all()
+    ),
+    'navigation_window': lambda user, brewery: db.session.execute(
+        navigation.window_query(brewery.id, NUM_BREWS // 2, True)
+    ).fetchall(),
+    'navigation_subquery': lambda user, brewery: db.session.execute(
+        navigation.subquery_query(brewery.id, NUM_BREWS // 2, True)
+    ).fetchall(),
+    'latest_notes_public': lambda user, brewery: TastingUtils.latest_notes(
+        TastingNote.date, public_only=True
+    ),
+    'latest_notes_user': lambda user, brewery: TastingUtils.latest_notes(
+        TastingNote.date, user=user
+    ),
+    'latest_notes_extra_user': lambda user, brewery: TastingUtils.latest_notes(
+        TastingNote.date, public_only=True, extra_user=user
+    ),
+    'notes_list_extra_user': lambda user, brewery: KeysetPagination(
+        TastingUtils.note_queries(extra_user=user),
+        ((TastingNote.date, True), (TastingNote.id, True)), None, 20,
+    ).items,
+    'profiles_last_created': lambda user, brewery: BrewerProfile.last_created(
+        public_only=True
+    ),
+    'profiles_last_updated': lambda user, brewery: BrewerProfile.last_updated(
+        public_only=True
+    ),
+}
+
+
+@pytest.mark.usefixtures('app')
+class TestQueryPlans:
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('query plans are checked with SQLite EXPLAIN QUERY PLAN')
+        self.connection = db.session.connection()
+        _seed(self.connection)
+        self.user = BrewerProfile.query.get(5)
+        self.brewery = Brewery.query.get(5)
+
+    def capture(self, func):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        db.event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            func(self.user, self.brewery)
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', record)
+        return statements
+
+    def plan_problems(self, statement, parameters):
+        cursor = self.connection.connection.cursor()
+        try:
+            rows = cursor.execute(
+                f'EXPLAIN QUERY PLAN {statement}', parameters
+            ).fetchall()
+        finally:
+            cursor.close()
+        details = [row[-1] for row in rows]
+        tables = db.metadata.tables
+        problems = []
+        for detail in details:
+            match = _full_scan_re.match(detail)
+            if match and match.group('table') in tables:
+                problems.append(detail)
+        if (
+                'LIMIT' in statement and _temp_sort in details
+                and not _owner_search_re.match(details[0])
+                ):
+            problems.append(f'{details[0]} ... {_temp_sort}')
+        return problems
+
+    @pytest.mark.parametrize('name', list(CASES))
+    def test_no_full_scan(self, name):
+        statements = self.capture(CASES[name])
+        assert statements
+        for statement, parameters in statements:
+            assert self.plan_problems(statement, parameters) == [], statement
+
+    def test_sorted_alternative_detected(self):
+        statements = self.capture(lambda user, brewery: (
+            public_or_owner(Brew.query, user)
+            .order_by(db.desc(Brew.created), db.desc(Brew.id)).limit(20).all()
+        ))
+        [(statement, parameters)] = statements
+        assert self.plan_problems(statement, parameters)
@@ -0,0 +1,108 @@
+import pytest
+from flask import url_for
+
+from brewlog.ext import db
+from brewlog.models import Brew, SearchDocument
+from brewlog.models.search import KIND_BREW, KIND_BREWERY, KIND_NOTE, rebuild_index
+from brewlog.search.utils import SearchUtils
+
+from . import BrewlogTests
+
+
+@pytest.mark.usefixtures('app')
+class TestSearchIndex:
+
+    def test_documents_follow_objects(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(name='Grodziskie')
+        note = tasting_note_factory(brew=brew, text='dymne i wytrawne')
+        kinds = {d.kind for d in SearchDocument.query.all()}
+        assert kinds == {KIND_BREW, KIND_BREWERY, KIND_NOTE}
+        db.session.delete(note)
+        db.session.commit()
+        assert SearchDocument.query.filter_by(kind=KIND_NOTE).count() == 0
+
+    def test_rename_updates_index(self, brew_factory):
+        brew = brew_factory(name='Porter')
+        brew.name = 'Koźlak'
+        db.session.add(brew)
+        db.session.commit()
+        assert SearchUtils.search('kozlak').items[0].object_id == brew.id
+        assert SearchUtils.search('porter').items == []
+
+    def test_folding(self, brew_factory):
+        brew = brew_factory(name='Żytnie Łąkowe')
+        for term in ('zytnie', 'łąk', 'ŻYT'):
+            items = SearchUtils.search(term, kinds=[KIND_BREW]).items
+            assert [r.object_id for r in items] == [brew.id]
+
+    def test_title_ranked_first(self, brew_factory):
+        in_hops = brew_factory(name='Pale Ale', hops='Citra')
+        in_name = brew_factory(name='Citra Pale Ale')
+        items = SearchUtils.search('citra', kinds=[KIND_BREW]).items
+        assert [r.object_id for r in items] == [in_name.id, in_hops.id]
+
+    def test_visibility(self, user_factory, brew_factory):
+        hidden_user = user_factory(is_public=False)
+        hidden_brew = brew_factory(name='Stout', brewery__brewer=hidden_user)
+        private_brew = brew_factory(name='Stout', is_public=False)
+        public_brew = brew_factory(name='Stout')
+        items = SearchUtils.search('stout', kinds=[KIND_BREW]).items
+        ids = {r.object_id for r in items}
+        assert ids == {public_brew.id}
+        owner = private_brew.brewery.brewer
+        ids = {
+            r.object_id
+            for r in SearchUtils.search('stout', owner, kinds=[KIND_BREW]).items
+        }
+        assert ids == {public_brew.id, private_brew.id}
+        assert hidden_brew.id not in ids
+
+    def test_visibility_change(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(name='Witbier')
+        tasting_note_factory(brew=brew, text='kolendra')
+        brew.is_public = False
+        db.session.add(brew)
+        db.session.commit()
+        assert SearchUtils.search('kolendra').items == []
+
+    def test_rebuild(self, brew_factory):
+        brew_factory(name='Altbier')
+        db.session.query(SearchDocument).delete()
+        db.session.commit()
+        rebuild_index(db.session)
+        db.session.commit()
+        assert SearchDocument.query.filter_by(kind=KIND_BREW).count() == 1
+        assert Brew.query.count() == 1
+
+    def test_suggest_limit(self, brewery_factory):
+        for num in range(5):
+            brewery_factory(name=f'Browar {num}')
+        result = SearchUtils.suggest('brow', KIND_BREWERY, limit=3)
+        assert len(result) == 3
+        assert all(set(r) == {'name', 'url'} for r in result)
+
+
+@pytest.mark.usefixtures('client_class')
+class TestSearchView(BrewlogTests):
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        self.url = url_for('search.results')
+
+    def test_results(self, brew_factory):
+        brew = brew_factory(name='Grodziskie')
+        rv = self.client.get(self.url, query_string={'q': 'grodz'})
+        assert rv.status_code == 200
+        assert url_for('brew.details', brew_id=brew.id) in rv.text
+
+    def test_empty(self):
+        rv = self.client.get(self.url)
+        assert rv.status_code == 200
+
+    def test_pages(self, app, brewery_factory):
+        for num in range(app.config['LIST_DEFAULT_LIMIT'] + 1):
+            brewery_factory(name=f'Browar {num}')
+        rv = self.client.get(self.url, query_string={'q': 'browar'})
+        assert 'p=2' in rv.text
+        rv = self.client.get(self.url, query_string={'q': 'browar', 'p': 2})
+        assert 'p=1' in rv.text
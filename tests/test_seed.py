@@ -0,0 +1,92 @@
+import datetime
+
+import pytest
+from flask import url_for
+
+from brewlog.cli import seed
+from brewlog.ext import db
+from brewlog.models import (
+    Brew, Brewery, BrewerProfile, SearchDocument, TastingNote,
+)
+from brewlog.models.brewing import refresh_brew_states, update_fermentation_summary
+from brewlog.models.search import rebuild_index
+from brewlog.models.visibility import refresh_visibility
+from brewlog.utils.seed import SeedOptions, generate
+
+from . import BrewlogTests
+
+TODAY = datetime.date(2020, 6, 1)
+
+
+def _rows(table, *exclude):
+    columns = [c for c in table.c if c.name not in exclude]
+    return [
+        tuple(row) for row in db.session.execute(
+            db.select(columns).order_by(*columns)
+        )
+    ]
+
+
+@pytest.mark.usefixtures('app')
+class TestGenerate:
+
+    def test_counts(self):
+        counts = generate(db.session.connection(), SeedOptions(brews=40), TODAY)
+        assert counts['brew'] == Brew.query.count() == 40
+        assert counts['brewer_profile'] == BrewerProfile.query.count() == 2
+        assert counts['tasting_note'] == TastingNote.query.count()
+        assert counts['search_document'] == SearchDocument.query.count()
+        assert db.session.query(db.func.sum(Brewery.brew_count)).scalar() == 40
+        assert db.session.query(
+            db.func.sum(BrewerProfile.tasting_note_count)
+        ).scalar() == counts['tasting_note']
+
+    def test_deterministic(self):
+        options = SeedOptions(brews=30, seed=7)
+        generate(db.session.connection(), options, TODAY)
+        first = _rows(Brew.__table__), _rows(TastingNote.__table__)
+        db.drop_all()
+        db.create_all()
+        generate(db.session.connection(), options, TODAY)
+        assert (_rows(Brew.__table__), _rows(TastingNote.__table__)) == first
+
+    def test_derived_values_match_events(self):
+        connection = db.session.connection()
+        generate(connection, SeedOptions(brews=60, private_users=0.5), TODAY)
+        # core updates below bump modification time
+        brews = _rows(Brew.__table__, 'updated')
+        notes = _rows(TastingNote.__table__)
+        documents = _rows(SearchDocument.__table__, 'id', 'updated')
+        assert refresh_brew_states(connection, TODAY) == 0
+        for (brew_id,) in db.session.query(Brew.id):
+            update_fermentation_summary(connection, brew_id)
+        refresh_visibility(connection)
+        rebuild_index(db.session)
+        assert _rows(Brew.__table__, 'updated') == brews
+        assert _rows(TastingNote.__table__) == notes
+        assert _rows(SearchDocument.__table__, 'id', 'updated') == documents
+
+    def test_next_objects_get_following_ids(self, brew_factory):
+        existing = brew_factory()
+        generate(db.session.connection(), SeedOptions(brews=5), TODAY)
+        brew = brew_factory()
+        assert Brew.query.filter(Brew.id > existing.id).count() == 6
+        assert brew.id == existing.id + 6
+
+
+@pytest.mark.usefixtures('client_class')
+class TestSeedCommand(BrewlogTests):
+
+    def test_seed(self, app):
+        rv = app.test_cli_runner().invoke(
+            seed, ['--brews', '20', '--private-users', '0', '--password', 'secret'],
+        )
+        assert rv.exit_code == 0, rv.output
+        assert 'brew: 20 row(s)' in rv.output
+        user = BrewerProfile.query.first()
+        assert user.check_password('secret')
+        brew = Brew.query.filter_by(effectively_public=True).first()
+        rv = self.client.get(url_for('home.index'))
+        assert brew.brewery.name in rv.text or brew.full_name in rv.text
+        rv = self.client.get(url_for('brew.details', brew_id=brew.id))
+        assert rv.status_code == 200
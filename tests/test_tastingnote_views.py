@@ -3,6 +3,7 @@ import datetime
 import pytest
 from flask import url_for
 
+from brewlog.ext import db
 from brewlog.models import TastingNote
 
 from . import BrewlogTests
@@ -417,6 +418,23 @@ class TestTastingNoteLoadView(BrewlogTests):
         rv = self.client.get(self.url, query_string={'id': 666})
         assert rv.status_code == 404
 
+    def test_not_modified(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        note = tasting_note_factory(brew=brew, author=self.author, text='Good')
+        rv = self.client.get(self.url, query_string={'id': note.id})
+        etag = rv.headers['ETag']
+        rv = self.client.get(
+            self.url, query_string={'id': note.id}, headers={'If-None-Match': etag}
+        )
+        assert rv.status_code == 304
+        note.text = 'Bad'
+        db.session.add(note)
+        db.session.commit()
+        rv = self.client.get(
+            self.url, query_string={'id': note.id}, headers={'If-None-Match': etag}
+        )
+        assert rv.text == 'Bad'
+
     @pytest.mark.parametrize('public_brewery,public_brew', [
         (True, True),
         (True, False),
@@ -433,8 +451,11 @@ class TestTastingNoteLoadView(BrewlogTests):
         brew = brew_factory(brewery=brewery, is_public=public_brew)
         note = tasting_note_factory(brew=brew, author=self.author, text='Good stuff')
         rv = self.client.get(self.url, query_string={'id': note.id})
-        assert rv.status_code == 200
-        assert note.text in rv.text
+        if public_brewery and public_brew:
+            assert rv.status_code == 200
+            assert note.text in rv.text
+        else:
+            assert rv.status_code == 404
 
     @pytest.mark.parametrize('public_brewery,public_brew', [
         (True, True),
@@ -455,8 +476,11 @@ class TestTastingNoteLoadView(BrewlogTests):
         actor = user_factory()
         self.login(actor.email)
         rv = self.client.get(self.url, query_string={'id': note.id})
-        assert rv.status_code == 200
-        assert note.text in rv.text
+        if public_brewery and public_brew:
+            assert rv.status_code == 200
+            assert note.text in rv.text
+        else:
+            assert rv.status_code == 404
 
     @pytest.mark.parametrize('public_brewery,public_brew', [
         (True, True),
@@ -475,8 +499,11 @@ class TestTastingNoteLoadView(BrewlogTests):
         note = tasting_note_factory(brew=brew, author=self.author, text='Good stuff')
         self.login(self.author.email)
         rv = self.client.get(self.url, query_string={'id': note.id})
-        assert rv.status_code == 200
-        assert note.text in rv.text
+        if public_brewery and public_brew:
+            assert rv.status_code == 200
+            assert note.text in rv.text
+        else:
+            assert rv.status_code == 404
 
     @pytest.mark.parametrize('public_brewery,public_brew', [
         (True, True),
@@ -498,6 +525,146 @@ class TestTastingNoteLoadView(BrewlogTests):
         assert rv.status_code == 200
         assert note.text in rv.text
 
+    def test_batch(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        notes = tasting_note_factory.create_batch(3, brew=brew, author=self.author)
+        ids = ','.join(f'note_text_{note.id}' for note in notes[:2])
+        rv = self.client.get(self.url, query_string={'ids': f'{ids},note_text_666'})
+        assert rv.status_code == 200
+        assert rv.json == {
+            f'note_text_{note.id}': note.text for note in notes[:2]
+        }
+
+    def test_batch_not_modified(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        note = tasting_note_factory(brew=brew, author=self.author, text='Good')
+        query_string = {'ids': f'note_text_{note.id}'}
+        etag = self.client.get(self.url, query_string=query_string).headers['ETag']
+        rv = self.client.get(
+            self.url, query_string=query_string, headers={'If-None-Match': etag}
+        )
+        assert rv.status_code == 304
+        note.text = 'Bad'
+        db.session.add(note)
+        db.session.commit()
+        rv = self.client.get(
+            self.url, query_string=query_string, headers={'If-None-Match': etag}
+        )
+        assert rv.json == {f'note_text_{note.id}': 'Bad'}
+
+    @pytest.mark.parametrize('ids', ['', 'note_text_x', ','.join(['1'] * 51)])
+    def test_batch_invalid(self, ids):
+        rv = self.client.get(self.url, query_string={'ids': ids})
+        assert rv.status_code == 400
+
+    def test_batch_not_found(self):
+        rv = self.client.get(self.url, query_string={'ids': 'note_text_666'})
+        assert rv.status_code == 404
+
+    @pytest.mark.parametrize('public_brewery,public_brew', [
+        (True, False),
+        (False, True),
+    ])
+    def test_batch_hidden_anon(
+                self, public_brewery, public_brew, brew_factory, tasting_note_factory,
+            ):
+        brewery = self.public_brewery if public_brewery else self.hidden_brewery
+        brew = brew_factory(brewery=brewery, is_public=public_brew)
+        note = tasting_note_factory(brew=brew, author=self.author, text='secret')
+        rv = self.client.get(self.url, query_string={'ids': f'note_text_{note.id}'})
+        assert rv.status_code == 404
+        assert 'secret' not in rv.text
+
+    def test_batch_hidden_skipped(self, brew_factory, tasting_note_factory):
+        public_note = tasting_note_factory(
+            brew=brew_factory(brewery=self.public_brewery), author=self.author,
+        )
+        hidden_note = tasting_note_factory(
+            brew=brew_factory(brewery=self.hidden_brewery), author=self.author,
+            text='secret',
+        )
+        self.login(self.author.email)
+        ids = f'note_text_{public_note.id},note_text_{hidden_note.id}'
+        rv = self.client.get(self.url, query_string={'ids': ids})
+        assert rv.json == {f'note_text_{public_note.id}': public_note.text}
+
+    def test_batch_hidden_owner(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.hidden_brewery, is_public=False)
+        note = tasting_note_factory(brew=brew, author=self.author, text='secret')
+        self.login(self.hidden_user.email)
+        rv = self.client.get(self.url, query_string={'ids': f'note_text_{note.id}'})
+        assert rv.json == {f'note_text_{note.id}': 'secret'}
+
+
+@pytest.mark.usefixtures('client_class')
+class TestBrewTastingNotesView(BrewlogTests):
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, user_factory, brewery_factory):
+        self.public_user = user_factory()
+        self.public_brewery = brewery_factory(brewer=self.public_user)
+        self.hidden_user = user_factory(is_public=False)
+        self.hidden_brewery = brewery_factory(brewer=self.hidden_user)
+        self.author = user_factory()
+
+    def url(self, brew, **kwargs):
+        return url_for('tastingnote.brew', brew_id=brew.id, **kwargs)
+
+    def test_windows(self, app, brew_factory, tasting_note_factory):
+        app.config['TASTING_NOTES_PAGE_SIZE'] = 2
+        brew = brew_factory(brewery=self.public_brewery)
+        notes = [
+            tasting_note_factory(
+                brew=brew, author=self.author, date=datetime.date(2020, 1, day),
+                text=f'note no {day}',
+            )
+            for day in range(1, 6)
+        ]
+        seen = []
+        url = self.url(brew)
+        while url:
+            rv = self.client.get(url)
+            assert rv.status_code == 200
+            html = rv.json['html']
+            window = [note for note in notes if note.text in html]
+            assert len(window) <= 2
+            window.sort(key=lambda note: html.index(note.text))
+            seen.extend(note.id for note in window)
+            url = rv.json['next']
+        assert seen == [note.id for note in reversed(notes)]
+
+    def test_editable_for_author(self, brew_factory, tasting_note_factory):
+        brew = brew_factory(brewery=self.public_brewery)
+        note = tasting_note_factory(brew=brew, author=self.author)
+        rv = self.client.get(self.url(brew))
+        assert f'id="note_text_{note.id}"' not in rv.json['html']
+        self.login(self.author.email)
+        rv = self.client.get(self.url(brew))
+        assert f'id="note_text_{note.id}"' in rv.json['html']
+
+    @pytest.mark.parametrize('public_brewery,public_brew', [
+        (True, False),
+        (False, True),
+    ], ids=['hidden-brew', 'hidden-brewery'])
+    def test_hidden_brew(
+                self, public_brewery, public_brew, brew_factory, tasting_note_factory
+            ):
+        if public_brewery:
+            brewery = self.public_brewery
+        else:
+            brewery = self.hidden_brewery
+        brew = brew_factory(brewery=brewery, is_public=public_brew)
+        tasting_note_factory(brew=brew, author=self.author)
+        rv = self.client.get(self.url(brew))
+        assert rv.status_code == 404
+        self.login(brewery.brewer.email)
+        rv = self.client.get(self.url(brew))
+        assert rv.status_code == 200
+
+    def test_not_found(self):
+        rv = self.client.get(url_for('tastingnote.brew', brew_id=666))
+        assert rv.status_code == 404
+
 
 @pytest.mark.usefixtures('client_class')
 class TestTastingNoteUpdateView(BrewlogTests):
@@ -1,11 +1,23 @@
+import datetime
+import os
+import re
 import unicodedata
 
 import pytest
 from flask import session, url_for
 
+from brewlog.ext import db
+from brewlog.models import Brew, TastingNote
+from brewlog.tasks import render_markdown_field
 from brewlog.utils.brewing import abv, sg2plato
-from brewlog.utils.pagination import get_page, url_for_other_page
-from brewlog.utils.text import get_announcement, stars2deg
+from brewlog.utils.loading import (
+    LOADER_PROFILES, load_relationships, loader_options, with_loading,
+)
+from brewlog.utils.pagination import (
+    KeysetPagination, get_cursor, get_page, url_for_other_page,
+)
+from brewlog.utils.rendering import ENGINES, MarkdownRenderer, make_engine, plain_html
+from brewlog.utils.text import fold_text, get_announcement, search_terms, stars2deg
 from brewlog.utils.views import is_redirect_safe, next_redirect
 
 
@@ -19,6 +31,18 @@ class TestTextUtils:
         ret = stars2deg(text)
         assert ret == expected
 
+    @pytest.mark.parametrize('text,expected', [
+        ('Żytnie Łąkowe', 'zytnie lakowe'),
+        ('ŹRÓDŁO', 'zrodlo'),
+        ('Weißbier', 'weissbier'),
+    ])
+    def test_fold_text(self, text, expected):
+        assert fold_text(text) == expected
+
+    def test_search_terms(self):
+        assert search_terms('  Piwo "grodziskie"  ') == ['piwo', 'grodziskie']
+        assert search_terms('***') == []
+
     def test_announcement_not_found(self):
         announcement = get_announcement(None)
         assert announcement is None
@@ -55,6 +79,278 @@ class TestPaginationUtils:
             ret = url_for_other_page(page)
             assert 'p=666' in ret
 
+    def test_url_for_other_page_cursor(self, mocker, app):
+        with app.app_context():
+            fake_request = mocker.MagicMock(
+                view_args={'a1': 'v1'},
+                endpoint='home.index',
+            )
+            mocker.patch('brewlog.utils.pagination.request', fake_request)
+            ret = url_for_other_page(cursor='token')
+            assert 'c=token' in ret
+            assert 'p=' not in ret
+
+    def test_get_cursor(self, mocker):
+        request = mocker.Mock(args={'c': 'token'})
+        assert get_cursor(request) == 'token'
+        request = mocker.Mock(args={})
+        assert get_cursor(request) is None
+
+
+@pytest.mark.usefixtures('app')
+class TestKeysetPagination:
+
+    ORDERING = ((Brew.created, True), (Brew.id, True))
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, brewery_factory, brew_factory):
+        brewery = brewery_factory()
+        created = datetime.datetime(2019, 1, 1)
+        self.brews = [
+            brew_factory(brewery=brewery, created=created) for _ in range(5)
+        ]
+        self.brews.sort(key=lambda x: x.id, reverse=True)
+
+    def test_first_page(self):
+        pagination = KeysetPagination(Brew.query, self.ORDERING, None, 2)
+        assert pagination.items == self.brews[:2]
+        assert pagination.has_next is True
+        assert pagination.has_prev is False
+        assert pagination.prev_cursor is None
+
+    def test_walk_forward_and_back(self):
+        pagination = KeysetPagination(Brew.query, self.ORDERING, None, 2)
+        pagination = KeysetPagination(
+            Brew.query, self.ORDERING, pagination.next_cursor, 2
+        )
+        assert pagination.items == self.brews[2:4]
+        pagination = KeysetPagination(
+            Brew.query, self.ORDERING, pagination.next_cursor, 2
+        )
+        assert pagination.items == self.brews[4:]
+        assert pagination.has_next is False
+        assert pagination.next_cursor is None
+        pagination = KeysetPagination(
+            Brew.query, self.ORDERING, pagination.prev_cursor, 2
+        )
+        assert pagination.items == self.brews[2:4]
+        assert pagination.has_prev is True
+        pagination = KeysetPagination(
+            Brew.query, self.ORDERING, pagination.prev_cursor, 2
+        )
+        assert pagination.items == self.brews[:2]
+        assert pagination.has_prev is False
+
+    def test_invalid_cursor(self):
+        pagination = KeysetPagination(Brew.query, self.ORDERING, 'garbage', 2)
+        assert pagination.items == self.brews[:2]
+
+    def test_merged_queries(self):
+        queries = [
+            Brew.query.filter(Brew.id % 2 == 0), Brew.query.filter(Brew.id % 2 == 1)
+        ]
+        pagination = KeysetPagination(queries, self.ORDERING, None, 2)
+        assert pagination.items == self.brews[:2]
+        pagination = KeysetPagination(queries, self.ORDERING, pagination.next_cursor, 2)
+        assert pagination.items == self.brews[2:4]
+        assert pagination.has_next is True
+        pagination = KeysetPagination(queries, self.ORDERING, pagination.prev_cursor, 2)
+        assert pagination.items == self.brews[:2]
+        assert pagination.has_prev is False
+
+
+@pytest.mark.usefixtures('app')
+class TestLoadingUtils:
+
+    def test_unknown_profile(self):
+        with pytest.raises(KeyError):
+            loader_options(Brew, 'nonexisting')
+
+    def test_no_profile(self):
+        query = Brew.query
+        assert with_loading(query, None) is query
+
+    def test_brew_list_profile(self, brew_factory):
+        brew_factory()
+        db.session.expunge_all()
+        brew = with_loading(Brew.query, 'brew.list').first()
+        assert 'brewery' in brew.__dict__
+        assert 'brewer' in brew.brewery.__dict__
+
+    @pytest.fixture
+    def nested_profile(self, mocker):
+        mocker.patch.dict(LOADER_PROFILES, {
+            'test': (
+                ('joined', 'brewery.brewer'),
+                ('selectin', 'fermentation_step_list'),
+                ('selectin', 'tasting_note_list'),
+                ('joined', 'tasting_note_list.author'),
+            ),
+        })
+
+    @pytest.mark.usefixtures('nested_profile')
+    def test_nested_profile_strategies(self, tasting_note_factory):
+        note = tasting_note_factory()
+        brew_id = note.brew.id
+        db.session.expunge_all()
+        brew = with_loading(Brew.query, 'test').get(brew_id)
+        assert 'tasting_note_list' in brew.__dict__
+        loaded_note = brew.__dict__['tasting_note_list'][0]
+        assert isinstance(loaded_note, TastingNote)
+        assert 'author' in loaded_note.__dict__
+
+    @pytest.mark.usefixtures('nested_profile')
+    def test_load_relationships(self, tasting_note_factory, fermentation_step_factory):
+        note = tasting_note_factory()
+        brew_id = note.brew.id
+        fermentation_step_factory(brew=note.brew, date=datetime.date(2020, 2, 1))
+        fermentation_step_factory(brew=note.brew, date=datetime.date(2020, 1, 1))
+        db.session.expunge_all()
+        brew = with_loading(Brew.query, 'brew.list').get(brew_id)
+        brewery = brew.__dict__['brewery']
+        load_relationships(brew, 'test')
+        assert brew.__dict__['brewery'] is brewery
+        steps = brew.__dict__['fermentation_step_list']
+        assert [step.date.month for step in steps] == [1, 2]
+        assert 'author' in brew.__dict__['tasting_note_list'][0].__dict__
+
+
+class TestMarkdownRenderer:
+
+    def test_render_cached(self, mocker):
+        engine = mocker.Mock(return_value='<p>x</p>')
+        renderer = MarkdownRenderer(engine_func=engine)
+        assert renderer.render('x') == '<p>x</p>'
+        assert renderer.render('x') == '<p>x</p>'
+        engine.assert_called_once_with('x')
+
+    def test_local_cache_bounded(self):
+        renderer = MarkdownRenderer(local_size=2)
+        for text in ['a', 'b', 'c']:
+            renderer.render(text)
+        assert len(renderer._local) == 2
+        assert renderer.cached('a') is None
+
+    def test_redis_tier(self, app, mocker):
+        renderer = MarkdownRenderer(app.redis)
+        renderer.render('**x**')
+        other = MarkdownRenderer(app.redis, engine_func=mocker.Mock())
+        assert other.render('**x**') == '<p><strong>x</strong></p>'
+        other.engine.assert_not_called()
+
+    @pytest.mark.parametrize('threshold,expected', [
+        (0, False), (4, True), (5, False),
+    ])
+    def test_is_deferred(self, threshold, expected):
+        renderer = MarkdownRenderer(async_threshold=threshold)
+        assert renderer.is_deferred('text') is expected
+
+    def test_plain_html(self):
+        assert plain_html('a <b>\n\n c ') == '<p>a &lt;b&gt;</p><p>c</p>'
+
+
+MARKDOWN_CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'data', 'markdown')
+
+
+def _markdown_corpus():
+    return sorted(
+        name[:-3] for name in os.listdir(MARKDOWN_CORPUS_DIR) if name.endswith('.md')
+    )
+
+
+_BLOCK_TAG_RE = re.compile(r'\s*(</?(?:p|ul|ol|li|h\d|pre|blockquote|hr)\b[^>]*>)\s*')
+
+
+def _normalize_html(html):
+    # differences that do not change the way html is displayed: whitespace
+    # around block tags, trailing newline of code block and xhtml syntax
+    html = re.sub(r'\s*/>', '>', html.strip())
+    html = _BLOCK_TAG_RE.sub(r'\1', html)
+    html = html.replace('\n</code></pre>', '</code></pre>')
+    return html.replace('&quot;', '"')
+
+
+class TestMarkdownEngines:
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            make_engine('nonexisting')
+
+    @pytest.mark.parametrize('name', _markdown_corpus())
+    @pytest.mark.parametrize('engine', sorted(ENGINES))
+    def test_output_compatible(self, engine, name):
+        try:
+            render = make_engine(engine)
+        except ImportError:
+            pytest.skip(f'{engine} engine not installed')
+        path = os.path.join(MARKDOWN_CORPUS_DIR, name)
+        with open(f'{path}.md', encoding='utf-8') as fp:
+            source = fp.read()
+        with open(f'{path}.html', encoding='utf-8') as fp:
+            expected = fp.read()
+        assert _normalize_html(render(source)) == _normalize_html(expected)
+
+    def test_converter_reused(self):
+        render = make_engine('markdown')
+        assert render('*a*') == '<p><em>a</em></p>'
+        assert render('b') == '<p>b</p>'
+
+
+@pytest.mark.usefixtures('app')
+class TestMarkdownFields:
+
+    def test_not_rendered_if_unchanged(self, app, brew_factory, mocker):
+        brew = brew_factory(notes='*notes*')
+        db.session.commit()
+        lookup = mocker.spy(app.markdown, 'cached')
+        brew.name = 'changed'
+        db.session.commit()
+        lookup.assert_not_called()
+        assert brew.notes_html == '<p><em>notes</em></p>'
+
+    def test_cleared(self, brew_factory):
+        brew = brew_factory(notes='*notes*')
+        db.session.commit()
+        brew.notes = None
+        db.session.commit()
+        assert brew.notes_html is None
+
+    def test_background_rendering(self, app, tasting_note_factory, mocker):
+        app.markdown.async_threshold = 5
+        enqueue = mocker.spy(app.queue, 'enqueue')
+        note = tasting_note_factory(text='**very good**')
+        assert note.text_html == '<p>**very good**</p>'
+        db.session.commit()
+        enqueue.assert_any_call(
+            'brewlog.tasks.render_markdown_field', 'tasting_note', note.id, 'text',
+            'text_html',
+        )
+        assert note.text_html == '<p><strong>very good</strong></p>'
+
+    def test_background_rendering_invalidates_page(
+                self, app, tasting_note_factory, mocker,
+            ):
+        app.markdown.async_threshold = 5
+        enqueue = mocker.patch.object(app.queue, 'enqueue')
+        note = tasting_note_factory(text='**very good**')
+        db.session.commit()
+        url = url_for('brew.details', brew_id=note.brew_id)
+        client = app.test_client()
+        rv = client.get(url)
+        assert '**very good**' in rv.text
+        etag = rv.headers['ETag']
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+        enqueue.assert_any_call(
+            'brewlog.tasks.render_markdown_field', 'tasting_note', note.id, 'text',
+            'text_html',
+        )
+        render_markdown_field('tasting_note', note.id, 'text', 'text_html')
+        # requests share session with test, each would start with new one
+        db.session.expire_all()
+        rv = client.get(url, headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+        assert '<strong>very good</strong>' in rv.text
+
 
 class TestBrewingFormulas:
 